@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,11 +45,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,9 +87,94 @@ DATABASES = {
         "USER": "root",
         "HOST": "127.0.0.1",
         "PORT": "3306",
+        # Conexiones persistentes (WSGI): se reutilizan entre peticiones del
+        # mismo hilo y se comprueban antes de reutilizarlas tras un error.
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Con ASGI las conexiones persistentes no se reutilizan (cada petición va en
+# su hilo): DB_POOL=1 usa el backend core.mysqlpool, que las presta de un pool
+# por proceso y las recupera al terminar cada petición.
+if os.environ.get("DB_POOL") == "1":
+    DATABASES["default"].update({
+        "ENGINE": "core.mysqlpool",
+        "CONN_MAX_AGE": 0,
+        "POOL": {
+            "SIZE": int(os.environ.get("DB_POOL_SIZE", "10")),
+            "TIMEOUT": int(os.environ.get("DB_POOL_TIMEOUT", "5")),
+        },
+    })
+
+# Réplicas de lectura (core.replicas), p. ej.
+# DB_REPLICAS="127.0.0.1:3307,127.0.0.1:3308". Sin réplicas todo va a default.
+REPLICAS = {
+    "ALIASES": [],
+    # Segundos que quien acaba de escribir sigue leyendo de la primaria
+    "STICKY_SECONDS": int(os.environ.get("DB_REPLICA_STICKY_SECONDS", "10")),
+    "HEALTH_INTERVAL": 5,
+    "MAX_LAG": 30,
+}
+for number, address in enumerate(filter(None, os.environ.get("DB_REPLICAS", "").split(",")), 1):
+    host, _, port = address.strip().partition(":")
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or "3306",
+        "OPTIONS": {"connect_timeout": 2},
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICAS["ALIASES"].append(f"replica{number}")
+
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+
+# Caché (core.caching). Se elige con la variable de entorno CERVEZAS_CACHE:
+# "locmem" (por defecto), "file" o "redis" (cualquier servidor compatible con
+# Redis, p. ej. uno local, indicado en REDIS_URL).
+CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "crisol",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CACHE_DIR", str(BASE_DIR / ".cache")),
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+    },
+}
+
+
+def _require_redis(option):
+    # El paquete redis no va en requirements.txt: solo lo necesitan estas opciones
+    if importlib.util.find_spec("redis") is None:
+        raise ImproperlyConfigured(
+            f"{option}=redis necesita el paquete redis: pip install redis")
+
+
+CERVEZAS_CACHE = os.environ.get("CERVEZAS_CACHE", "locmem")
+if CERVEZAS_CACHE not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f"CERVEZAS_CACHE={CERVEZAS_CACHE} no es válido: {', '.join(CACHE_BACKENDS)}")
+if CERVEZAS_CACHE == "redis":
+    _require_redis("CERVEZAS_CACHE")
+
+CACHES = {
+    "default": {
+        **CACHE_BACKENDS[CERVEZAS_CACHE],
+        "TIMEOUT": 300,
+        "KEY_PREFIX": "crisol",
+    }
+}
+
+
+# Búsqueda de texto completo (core.search). Si no se define, se elige según
+# el motor: FULLTEXT en MySQL, FTS5 en SQLite y LIKE en cualquier otro.
+# SEARCH_BACKEND = "core.search.backends.mysql.MySQLFullTextBackend"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -133,6 +225,40 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Límites de frecuencia (core.ratelimit). Se pueden sobrescribir por ámbito,
+# p. ej. RATE_LIMITS = {"post": [("3/m", "user")]}, o desactivar del todo.
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+# Detrás de un proxy de confianza: RATE_LIMIT_IP_HEADER = "HTTP_X_FORWARDED_FOR"
+
+# Respuestas en directo en los hilos (core.live): "memory" para un solo
+# proceso, "redis" para repartirlas entre varios workers.
+LIVE_UPDATES = {
+    "BROKER": os.environ.get("LIVE_BROKER", "memory"),
+    "REDIS_URL": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+}
+if LIVE_UPDATES["BROKER"] == "redis":
+    _require_redis("LIVE_BROKER")
+
+# Perfilado de peticiones (core.profiling). Desactivado no añade coste: el
+# middleware se descarta al arrancar. SAMPLE_RATE es la fracción de
+# peticiones que se perfila con cProfile.
+PROFILING = {
+    "ENABLED": os.environ.get("PROFILING_ENABLED", "0") == "1",
+    "SAMPLE_RATE": float(os.environ.get("PROFILING_SAMPLE_RATE", "0")),
+    "SLOW_QUERY_MS": int(os.environ.get("PROFILING_SLOW_QUERY_MS", "200")),
+    "PROFILE_DIR": os.environ.get("PROFILING_DIR") or None,
+    # Permite a Prometheus leer /profiling/metrics/ sin sesión de staff
+    "METRICS_TOKEN": os.environ.get("PROFILING_METRICS_TOKEN") or None,
+}
+
+# Procesado de fotos de reseñas (core.photos): "thread" usa un pool de hilos
+# en el propio proceso, "worker" deja el trabajo a `manage.py process_photos`
+# e "inline" lo hace al confirmar la petición.
+PHOTO_PIPELINE = {
+    "MODE": os.environ.get("PHOTO_PIPELINE_MODE", "thread"),
+    "WORKERS": 2,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -6,7 +6,8 @@ from .models import Brewery, Beer
 class ReviewPhotoInline(admin.TabularInline):
     model = ReviewPhoto
     extra = 0
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'status', 'width', 'height')
+    exclude = ('thumb_small', 'thumb_medium')
 
 
 @admin.register(Review)
@@ -18,14 +19,28 @@ class ReviewAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
 
 
+@admin.register(Beer)
+class BeerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'brewery', 'style', 'review_count', 'avg_rating')
+    search_fields = ('name',)
+    # Los agregados solo los mantienen las reseñas (ver core.models)
+    readonly_fields = ('review_count', 'avg_rating', 'bayes_rating')
+
+
+@admin.register(Thread)
+class ThreadAdmin(admin.ModelAdmin):
+    list_display = ('title', 'user_name', 'created_at', 'post_count', 'last_post_at')
+    search_fields = ('title', 'user_name')
+    # Los mantienen las señales de Post
+    readonly_fields = ('created_at', 'post_count', 'last_post_at')
+
+
 # Personalización del sitio admin
 admin.site.site_header = "🍺 Crisol del Cervecero - Administración"
 admin.site.site_title = "Crisol del Cervecero"
 admin.site.index_title = "Panel de Administración"
 
 admin.site.register(Brewery)
-admin.site.register(Beer)
-admin.site.register(Thread)
 admin.site.register(Post)
 admin.site.register(Report)
 admin.site.register(ReviewPhoto)
@@ -0,0 +1,147 @@
+"""
+API JSON de solo lectura (v1) para clientes móviles e integraciones.
+
+Se serializa directamente desde `.values()` (sin instanciar modelos), se
+pagina con cursores (core.pagination), `?fields=` limita las columnas y las
+respuestas llevan ETag (hash del cuerpo) para que un recurso sin cambios se
+conteste con 304. No se envía Last-Modified: borrar, ocultar o editar una
+fila no cambia ninguna fecha de las demás y daría 304 falsos.
+"""
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+
+from .models import Beer, Brewery, Post, Review, Thread
+from .pagination import KeysetPaginator
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class Resource:
+    def __init__(self, model, fields, filters=None, base_filter=None):
+        self.model = model
+        self.fields = fields
+        # parámetro GET -> campo del modelo
+        self.filters = filters or {}
+        self.base_filter = base_filter or {}
+
+    def queryset(self):
+        return self.model.objects.filter(**self.base_filter).order_by()
+
+
+RESOURCES = {
+    "beers": Resource(
+        Beer,
+        ("id", "name", "style", "abv", "avg_rating", "review_count", "brewery_id"),
+        filters={"style": "style", "brewery": "brewery_id"},
+    ),
+    "breweries": Resource(Brewery, ("id", "name", "country")),
+    "reviews": Resource(
+        Review,
+        ("id", "beer_id", "user_name", "aroma", "sabor", "cuerpo", "apariencia",
+         "comment", "brand", "brewery_name", "created_at"),
+        filters={"beer": "beer_id"},
+    ),
+    "threads": Resource(
+        Thread,
+        ("id", "title", "beer_id", "beer_name", "user_name", "created_at",
+         "post_count", "last_post_at"),
+        filters={"beer": "beer_id"},
+    ),
+    "posts": Resource(
+        Post,
+        ("id", "thread_id", "user_name", "body", "created_at"),
+        filters={"thread": "thread_id"},
+        base_filter={"is_hidden": False},
+    ),
+}
+
+
+def _error(status, message):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _selected_fields(request, resource):
+    """Campos pedidos en `?fields=`; "id" siempre se incluye (lo usa el cursor)."""
+    requested = request.GET.get("fields", "").strip()
+    if not requested:
+        return list(resource.fields), None
+    names = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        return None, f"Campos desconocidos: {', '.join(unknown)}"
+    return ["id", *[name for name in names if name != "id"]], None
+
+
+def _conditional_json(request, payload):
+    """Respuesta JSON con ETag (hash del cuerpo) y 304 si el cliente ya la tiene."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type="application/json")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@require_safe
+def api_list(request, resource_name):
+    resource = RESOURCES.get(resource_name)
+    if resource is None:
+        return _error(404, "Recurso desconocido")
+    fields, error = _selected_fields(request, resource)
+    if error:
+        return _error(400, error)
+    try:
+        limit = min(max(int(request.GET.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        return _error(400, "limit debe ser un entero")
+
+    queryset = resource.queryset()
+    for param, field in resource.filters.items():
+        value = request.GET.get(param)
+        if value:
+            try:
+                value = resource.model._meta.get_field(field).to_python(value)
+            except ValidationError:
+                return _error(400, f"Valor no válido para {param}")
+            queryset = queryset.filter(**{field: value})
+
+    paginator = KeysetPaginator(queryset.values(*fields), ("id",), per_page=limit)
+    page = paginator.get_page(request.GET.get("cursor"))
+    rows = page.object_list
+
+    def page_url(cursor):
+        if cursor is None:
+            return None
+        params = request.GET.copy()
+        params["cursor"] = cursor
+        return f"{request.path}?{urlencode(sorted(params.items()))}"
+
+    return _conditional_json(request, {
+        "data": rows,
+        "next": page_url(page.next_cursor),
+        "previous": page_url(page.previous_cursor),
+    })
+
+
+@require_safe
+def api_detail(request, resource_name, object_id):
+    resource = RESOURCES.get(resource_name)
+    if resource is None:
+        return _error(404, "Recurso desconocido")
+    fields, error = _selected_fields(request, resource)
+    if error:
+        return _error(400, error)
+    row = resource.queryset().filter(id=object_id).values(*fields).first()
+    if row is None:
+        return _error(404, "No encontrado")
+    return _conditional_json(request, {"data": row})
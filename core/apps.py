@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import autocomplete, caching, facets, live, photos, trending
+        from .search import signals as search_signals
+        autocomplete.connect()
+        caching.connect()
+        facets.connect()
+        live.connect()
+        photos.connect()
+        trending.connect()
+        search_signals.connect()
@@ -0,0 +1,269 @@
+"""
+Autocompletado de nombres de cervezas y cervecerías en memoria.
+
+Índice por proceso sobre los nombres normalizados (core.text): una lista
+ordenada de claves en la que se busca el prefijo con `bisect`. Cada nombre
+aporta una clave por palabra ("5 estrellas" encuentra "mahou 5 estrellas").
+Los resultados se ordenan por número de reseñas. Los prefijos que abarcan
+muchas claves ("ma", "mahou") tienen el top ya calculado, de modo que ninguna
+consulta recorre más de HEAVY_PREFIX claves.
+
+El índice se carga la primera vez que se usa y se actualiza al guardar o
+borrar una cerveza o cervecería en este proceso. Cada REFRESH_SECONDS se
+reconstruye en segundo plano, para recoger los cambios de otros procesos y
+los contadores de reseñas. Las consultas no tocan la base de datos.
+"""
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.db.models.signals import post_delete, post_save
+
+from .text import normalize_name
+
+logger = logging.getLogger(__name__)
+
+LIMIT = 8
+TOP = 20
+# Prefijos que abarcan más claves que esto guardan ya calculado su top: así
+# ninguna consulta recorre más de HEAVY_PREFIX claves.
+HEAVY_PREFIX = 1000
+REFRESH_SECONDS = 300
+KINDS = ("beer", "brewery")
+# Mayor que cualquier carácter de un nombre normalizado (core.text)
+_END = "\x7f"
+
+
+def name_keys(name):
+    """Claves de un nombre: el normalizado desde el principio de cada palabra."""
+    words = normalize_name(name).split()
+    return {" ".join(words[i:]) for i in range(len(words))}
+
+
+class Entry:
+    __slots__ = ("kind", "pk", "name", "weight", "brewery")
+
+    def __init__(self, kind, pk, name, weight, brewery=None):
+        self.kind = kind
+        self.pk = pk
+        self.name = name
+        self.weight = weight
+        self.brewery = brewery
+
+    @property
+    def ref(self):
+        return (self.kind, self.pk)
+
+    def rank(self):
+        # Más reseñas primero y, a igualdad, el nombre más corto (más exacto)
+        return (self.weight, -len(self.name))
+
+    def as_dict(self):
+        result = {"type": self.kind, "id": self.pk, "name": self.name}
+        if self.brewery is not None:
+            result["brewery"] = self.brewery
+        return result
+
+
+class PrefixIndex:
+    def __init__(self):
+        # (clave, tipo, id) ordenadas; tipo es "beer" o "brewery"
+        self.keys = []
+        self.entries = {}
+        # (tipo, prefijo) -> [(tipo, id)] de más a menos reseñas
+        self.top = {}
+        self.lock = threading.Lock()
+
+    def _range(self, prefix, lo=0, hi=None):
+        hi = len(self.keys) if hi is None else hi
+        return (bisect_left(self.keys, (prefix,), lo, hi),
+                bisect_left(self.keys, (prefix + _END,), lo, hi))
+
+    def _best(self, refs, limit=TOP):
+        return [e.ref for e in heapq.nlargest(
+            limit, (self.entries[ref] for ref in refs), key=Entry.rank)]
+
+    def load(self, entry):
+        """Alta sin mantener el orden; hay que llamar a `finish` al acabar."""
+        keys = name_keys(entry.name)
+        if keys:
+            self.entries[entry.ref] = entry
+            self.keys.extend((key, *entry.ref) for key in keys)
+
+    def finish(self):
+        """Ordena las claves y calcula el top de los prefijos pesados, nivel a nivel."""
+        self.keys.sort()
+        self.top = {}
+        spans, length = [(0, len(self.keys))], 1
+        while spans:
+            heavy = []
+            for lo, hi in spans:
+                i = lo
+                while i < hi:
+                    key = self.keys[i][0]
+                    if len(key) < length:
+                        i += 1
+                        continue
+                    prefix = key[:length]
+                    start, end = self._range(prefix, i, hi)
+                    if end - start > HEAVY_PREFIX:
+                        refs = {k[1:] for k in self.keys[start:end]}
+                        for kind in KINDS:
+                            self.top[(kind, prefix)] = self._best(r for r in refs if r[0] == kind)
+                        heavy.append((start, end))
+                    i = end
+            spans, length = heavy, length + 1
+
+    def add(self, entry):
+        keys = name_keys(entry.name)
+        with self.lock:
+            self._remove(*entry.ref)
+            if not keys:
+                return
+            self.entries[entry.ref] = entry
+            for key in keys:
+                insort(self.keys, (key, *entry.ref))
+                # Entra en el top de sus prefijos pesados si le corresponde
+                for n in range(1, len(key) + 1):
+                    top = self.top.get((entry.kind, key[:n]))
+                    if top is None:
+                        continue
+                    self.top[(entry.kind, key[:n])] = self._best(
+                        {*(ref for ref in top if ref != entry.ref), entry.ref})
+
+    def remove(self, kind, pk):
+        with self.lock:
+            self._remove(kind, pk)
+
+    def _remove(self, kind, pk):
+        entry = self.entries.pop((kind, pk), None)
+        if entry is None:
+            return
+        for key in name_keys(entry.name):
+            i = bisect_left(self.keys, (key, kind, pk))
+            if i < len(self.keys) and self.keys[i] == (key, kind, pk):
+                del self.keys[i]
+            # Su hueco en los tops se rellena en la siguiente reconstrucción
+            for n in range(1, len(key) + 1):
+                top = self.top.get((kind, key[:n]))
+                if top is not None and (kind, pk) in top:
+                    top.remove((kind, pk))
+
+    def search(self, query, kinds=KINDS, limit=LIMIT):
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        with self.lock:
+            if (kinds[0], prefix) in self.top:
+                refs = [ref for kind in kinds for ref in self.top[(kind, prefix)]]
+            else:
+                start, end = self._range(prefix)
+                refs = {key[1:] for key in self.keys[start:end] if key[1] in kinds}
+            best = [self.entries[ref] for ref in self._best(refs, limit)]
+        return [entry.as_dict() for entry in best]
+
+
+def build_index():
+    from .models import Beer, Brewery
+
+    index = PrefixIndex()
+    weights = dict(Beer.objects.order_by().values("brewery_id")
+                   .annotate(n=Sum("review_count")).values_list("brewery_id", "n"))
+    for pk, name in Brewery.objects.values_list("id", "name").iterator():
+        index.load(Entry("brewery", pk, name, weights.get(pk) or 0))
+    beers = Beer.objects.values_list("id", "name", "review_count", "brewery__name")
+    for pk, name, review_count, brewery in beers.iterator():
+        index.load(Entry("beer", pk, name, review_count, brewery))
+    index.finish()
+    return index
+
+
+_index = None
+_built_at = 0.0
+_refreshing = False
+_state_lock = threading.Lock()
+
+
+def _refresh():
+    global _index, _built_at, _refreshing
+    try:
+        index = build_index()
+        with _state_lock:
+            _index, _built_at = index, time.monotonic()
+    except Exception:
+        logger.exception("No se pudo reconstruir el índice de autocompletado")
+    finally:
+        connections.close_all()
+        _refreshing = False
+
+
+def current_index():
+    """El índice ya cargado (o None); si es viejo, lanza su reconstrucción."""
+    global _refreshing
+    with _state_lock:
+        if (_index is not None and not _refreshing
+                and time.monotonic() - _built_at > REFRESH_SECONDS):
+            _refreshing = True
+            threading.Thread(target=_refresh, name="autocomplete-refresh", daemon=True).start()
+        return _index
+
+
+def get_index():
+    """El índice del proceso; se construye la primera vez (esa sí consulta la BD)."""
+    global _index, _built_at
+    index = current_index()
+    if index is None:
+        with _state_lock:
+            if _index is None:
+                _index, _built_at = build_index(), time.monotonic()
+            index = _index
+    return index
+
+
+def reset():
+    global _index
+    with _state_lock:
+        _index = None
+
+
+def suggest(query, kinds=KINDS, limit=LIMIT):
+    return get_index().search(query, kinds, limit)
+
+
+def _on_commit(method, *args):
+    # Si el índice aún no se ha cargado, ya leerá el cambio de la base de datos
+    def apply():
+        if _index is not None:
+            getattr(_index, method)(*args)
+    if _index is not None:
+        transaction.on_commit(apply)
+
+
+def _beer_saved(sender, instance, **kwargs):
+    if _index is not None:
+        _on_commit("add", Entry("beer", instance.pk, instance.name,
+                                instance.review_count, instance.brewery.name))
+
+
+def _brewery_saved(sender, instance, **kwargs):
+    if _index is not None:
+        current = _index.entries.get(("brewery", instance.pk))
+        _on_commit("add", Entry("brewery", instance.pk, instance.name,
+                                current.weight if current else 0))
+
+
+def _removed(sender, instance, **kwargs):
+    _on_commit("remove", sender._meta.model_name, instance.pk)
+
+
+def connect():
+    from .models import Beer, Brewery
+
+    post_save.connect(_beer_saved, sender=Beer, dispatch_uid="autocomplete_beer_saved")
+    post_save.connect(_brewery_saved, sender=Brewery, dispatch_uid="autocomplete_brewery_saved")
+    post_delete.connect(_removed, sender=Beer, dispatch_uid="autocomplete_beer_removed")
+    post_delete.connect(_removed, sender=Brewery, dispatch_uid="autocomplete_brewery_removed")
@@ -0,0 +1,206 @@
+"""
+Generador de carga HTTP mínimo (asyncio, HTTP/1.1 con keep-alive), medición
+de vistas con el cliente de pruebas y utilidades de percentiles para los
+comandos de benchmark.
+
+No depende de nada externo: cada "usuario virtual" es una corrutina con su
+propia conexión que repite peticiones hasta agotar el tiempo o el número de
+peticiones pedido.
+"""
+import asyncio
+import math
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, p):
+    """Percentil `p` (0-100) por el método del rango más cercano."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(latencies, errors=0, elapsed=None):
+    """Resumen de una serie de latencias en segundos (resultado en ms)."""
+    values = sorted(latencies)
+    summary = {
+        "requests": len(values),
+        "errors": errors,
+        "p50_ms": None, "p95_ms": None, "p99_ms": None,
+        "mean_ms": None, "max_ms": None,
+    }
+    if values:
+        summary.update({
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        })
+    if elapsed:
+        summary["rps"] = round(len(values) / elapsed, 1)
+    return summary
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("conexión cerrada por el servidor")
+    status = int(status_line.split()[1])
+    length, chunked, close = None, False, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+        elif name == "connection" and value == "close":
+            close = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()
+        close = True
+    return status, close
+
+
+async def _virtual_user(url, paths, deadline, budget, results, headers):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    base = parts.path.rstrip("/")
+    reader = writer = None
+    i = 0
+    while time.monotonic() < deadline and budget[0] > 0:
+        budget[0] -= 1
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            request = (f"GET {base}{path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                       f"{headers}Connection: keep-alive\r\n\r\n")
+            writer.write(request.encode())
+            await writer.drain()
+            status, close = await _read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            results[path]["errors"] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        elapsed = time.perf_counter() - started
+        if status >= 400:
+            results[path]["errors"] += 1
+        else:
+            results[path]["latencies"].append(elapsed)
+        if close:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _run(url, paths, concurrency, duration, max_requests, headers):
+    results = {path: {"latencies": [], "errors": 0} for path in paths}
+    deadline = time.monotonic() + duration
+    budget = [max_requests or float("inf")]
+    started = time.monotonic()
+    await asyncio.gather(*[
+        _virtual_user(url, paths, deadline, budget, results, headers)
+        for _ in range(concurrency)
+    ])
+    return results, time.monotonic() - started
+
+
+def run_load(url, paths, concurrency=10, duration=10.0, max_requests=None, headers=None):
+    """
+    Lanza `concurrency` usuarios contra `url` repartidos entre `paths` y
+    devuelve {"total": resumen, "paths": {ruta: resumen}}.
+    """
+    header_lines = "".join(f"{k}: {v}\r\n" for k, v in (headers or {}).items())
+    results, elapsed = asyncio.run(
+        _run(url, list(paths), concurrency, duration, max_requests, header_lines))
+    all_latencies = [lat for r in results.values() for lat in r["latencies"]]
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "total": summarize(all_latencies, sum(r["errors"] for r in results.values()), elapsed),
+        "paths": {path: summarize(r["latencies"], r["errors"], elapsed)
+                  for path, r in results.items()},
+    }
+
+
+def profile_path(client, path, repeat=20, warmup=2):
+    """
+    Pide `path` con el cliente de pruebas `repeat` veces y mide latencia,
+    consultas SQL y pico de memoria (este último en una pasada aparte, porque
+    tracemalloc ralentiza mucho).
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        client.get(path)
+    latencies, queries, status = [], [], None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(captured.captured_queries))
+        status = response.status_code
+
+    tracemalloc.start()
+    client.get(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = summarize(latencies)
+    result.update({
+        "path": path,
+        "status": status,
+        "queries": max(queries),
+        "peak_kb": round(peak / 1024, 1),
+    })
+    return result
+
+
+def compare_reports(baseline, current, threshold=0.2):
+    """
+    [(vista, métrica, antes, después, ¿regresión?)] entre dos informes de
+    `manage.py benchmark`. Es regresión si p95 empeora más de `threshold`
+    (fracción) o si aumentan las consultas.
+    """
+    rows = []
+    for name, now in current.get("views", {}).items():
+        before = baseline.get("views", {}).get(name)
+        if not before:
+            continue
+        for metric in ("p50_ms", "p95_ms", "queries", "peak_kb"):
+            old, new = before.get(metric), now.get(metric)
+            if old is None or new is None:
+                continue
+            if metric == "queries":
+                regression = new > old
+            elif metric == "p95_ms":
+                regression = old > 0 and (new - old) / old > threshold
+            else:
+                regression = False
+            rows.append((name, metric, old, new, regression))
+    return rows
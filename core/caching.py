@@ -0,0 +1,154 @@
+"""
+Caché de datos y fragmentos de plantilla con invalidación por señales.
+
+Cada bloque cacheado tiene una clave propia (por objeto cuando aplica) y se
+borra solo cuando cambia algo que muestra. Los contadores de aciertos y fallos
+son por proceso y se muestran en el panel de métricas. Los bloques se
+construyen leyendo de la primaria (ver core.replicas).
+"""
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from . import replicas
+
+HOME_TOP_BEERS = "home:top_beers"
+HOME_RECENT_THREADS = "home:recent_threads"
+HOME_TRENDING_BEERS = "home:trending_beers"
+BEER_LIST_FILTERS = "beer_list:filters"
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def beer_reviews_key(beer_id):
+    return f"beer:{beer_id}:reviews"
+
+
+def _namespace(key):
+    return key.split(":", 1)[0]
+
+
+def _record(key, outcome):
+    with _stats_lock:
+        _stats[(_namespace(key), outcome)] += 1
+
+
+def get_or_build(key, builder, timeout=None):
+    """Devuelve el valor cacheado o lo construye con `builder()` y lo guarda."""
+    value = cache.get(key)
+    if value is not None:
+        _record(key, "hit")
+        return value
+    _record(key, "miss")
+    with replicas.primary():
+        value = builder()
+    if timeout is None:
+        cache.set(key, value)
+    else:
+        cache.set(key, value, timeout)
+    return value
+
+
+async def aget_or_build(key, builder, timeout=None):
+    """Versión asíncrona de `get_or_build`; `builder` es una corrutina."""
+    value = await cache.aget(key)
+    if value is not None:
+        _record(key, "hit")
+        return value
+    _record(key, "miss")
+    with replicas.primary():
+        value = await builder()
+    if timeout is None:
+        await cache.aset(key, value)
+    else:
+        await cache.aset(key, value, timeout)
+    return value
+
+
+def invalidate(*keys):
+    """Borra las claves cuando la transacción en curso se confirme."""
+    keys = [key for key in keys if key]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def stats():
+    """{namespace: {"hits", "misses", "hit_ratio"}} acumulado en este proceso."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    result = {}
+    for (namespace, outcome), count in snapshot.items():
+        entry = result.setdefault(namespace, {"hits": 0, "misses": 0})
+        entry["hits" if outcome == "hit" else "misses"] += count
+    for entry in result.values():
+        total = entry["hits"] + entry["misses"]
+        entry["hit_ratio"] = round(entry["hits"] / total, 3) if total else 0
+    return dict(sorted(result.items()))
+
+
+# --- Invalidación ---------------------------------------------------------
+
+def _review_changed(sender, instance, **kwargs):
+    # BEER_LIST_FILTERS: las facetas muestran reseñas y rating por estilo y cervecería
+    invalidate(beer_reviews_key(instance.beer_id), HOME_TOP_BEERS, HOME_TRENDING_BEERS,
+               BEER_LIST_FILTERS)
+
+
+def _review_photo_changed(sender, instance, **kwargs):
+    from core.models import Review
+
+    beer_id = Review.objects.filter(
+        pk=instance.review_id).values_list("beer_id", flat=True).first()
+    if beer_id:
+        invalidate(beer_reviews_key(beer_id))
+
+
+def _beer_changed(sender, instance, **kwargs):
+    invalidate(beer_reviews_key(instance.pk), HOME_TOP_BEERS, HOME_TRENDING_BEERS,
+               BEER_LIST_FILTERS)
+
+
+def _brewery_changed(sender, instance, **kwargs):
+    invalidate(HOME_TOP_BEERS, HOME_TRENDING_BEERS, BEER_LIST_FILTERS)
+
+
+def _remember_thread_beer(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Si el hilo cambia de cerveza también cambia el recuento de la anterior
+    instance._cache_previous_beer_id = None
+    if raw or instance._state.adding or (update_fields is not None and "beer" not in update_fields):
+        return
+    instance._cache_previous_beer_id = sender.objects.filter(
+        pk=instance.pk).values_list("beer_id", flat=True).first()
+
+
+def _thread_changed(sender, instance, **kwargs):
+    # beer_detail muestra cuántos hilos tiene la cerveza
+    beer_ids = {instance.beer_id, getattr(instance, "_cache_previous_beer_id", None)}
+    invalidate(HOME_RECENT_THREADS, *(beer_reviews_key(pk) for pk in beer_ids if pk))
+
+
+def _post_changed(sender, instance, **kwargs):
+    # Los hilos recientes de la portada muestran su número de respuestas
+    invalidate(HOME_RECENT_THREADS)
+
+
+def connect():
+    from core.models import Beer, Brewery, Post, Review, ReviewPhoto, Thread
+
+    handlers = {
+        Review: _review_changed,
+        ReviewPhoto: _review_photo_changed,
+        Beer: _beer_changed,
+        Brewery: _brewery_changed,
+        Thread: _thread_changed,
+        Post: _post_changed,
+    }
+    for model, handler in handlers.items():
+        for signal in (post_save, post_delete):
+            signal.connect(handler, sender=model,
+                           dispatch_uid=f"cache_{model.__name__}_{signal is post_save}")
+    pre_save.connect(_remember_thread_beer, sender=Thread, dispatch_uid="cache_Thread_pre_save")
@@ -0,0 +1,320 @@
+"""
+Detección y fusión de cervezas y cervecerías duplicadas.
+
+Cada nombre se reduce a sus palabras (core.text, números escritos en cifras,
+sin plurales ni palabras vacías): "Mahou Cinco Estrellas" y "mahou 5★" dan
+("mahou", "5", "estrella"). Para no comparar todos contra todos, cada nombre
+cae en unos pocos bloques (sus palabras y el comienzo del nombre sin
+espacios) y solo se comparan los nombres de un mismo bloque. Los bloques de
+más de MAX_BLOCK nombres ("ipa", "lager") se descartan: sus nombres ya
+coinciden en algún bloque más pequeño si se parecen.
+
+Los pares que superan el umbral se agrupan (union-find) y cada grupo se
+fusiona en el nombre con más reseñas. Dos cervezas solo se agrupan si son
+de la misma cervecería (tras deduplicar cervecerías) o si una es de la
+cervecería desconocida.
+"""
+import sys
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Sum, Value, When
+
+from . import caching, facets, trending
+from .text import normalize_name
+
+THRESHOLD = 0.85
+MAX_BLOCK = 200
+# Caracteres del nombre sin espacios que forman su bloque de prefijo
+PREFIX = 6
+# Grupos que se fusionan en cada transacción
+BATCH = 500
+UNKNOWN_BREWERY = "Desconocida"
+
+SYMBOLS = {"★": " estrellas ", "☆": " estrellas ", "&": " y ", "+": " y "}
+NUMBERS = {
+    "cero": "0", "un": "1", "uno": "1", "una": "1", "dos": "2", "tres": "3",
+    "cuatro": "4", "cinco": "5", "seis": "6", "siete": "7", "ocho": "8",
+    "nueve": "9", "diez": "10", "once": "11", "doce": "12", "trece": "13",
+    "catorce": "14", "quince": "15", "veinte": "20",
+}
+STOPWORDS = {
+    "de", "del", "el", "la", "los", "las", "y", "the", "and", "of",
+    "cerveza", "cervecera", "cerveceria", "brewery", "brewing", "beer",
+    "co", "company", "sa", "sl",
+}
+
+
+def name_tokens(name):
+    """Palabras significativas de un nombre, en el orden en que aparecen."""
+    for symbol, word in SYMBOLS.items():
+        name = name.replace(symbol, word)
+    words = normalize_name(name).split()
+    tokens = []
+    for word in words:
+        word = NUMBERS.get(word, word)
+        if len(word) > 3 and word.endswith("s") and not word[0].isdigit():
+            word = word[:-1]
+        if word not in STOPWORDS:
+            tokens.append(sys.intern(word))
+    # Un nombre hecho solo de palabras vacías se compara tal cual
+    return tuple(tokens) if tokens else tuple(sys.intern(w) for w in words)
+
+
+@lru_cache(maxsize=65536)
+def _trigrams(word):
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def word_similarity(a, b):
+    """1 si son iguales; para erratas, trigramas en común (Dice) de palabras largas."""
+    if a == b:
+        return 1.0
+    # Los números y las palabras cortas ("ipa", "apa") han de coincidir
+    if a[0].isdigit() or b[0].isdigit() or min(len(a), len(b)) < 4:
+        return 0.0
+    ta, tb = _trigrams(a), _trigrams(b)
+    return 2 * len(ta & tb) / (len(ta) + len(tb))
+
+
+def similarity(a, b):
+    """
+    Parecido entre dos nombres ya reducidos con `name_tokens`, de 0 a 1: cada
+    palabra del más corto se empareja con la más parecida del otro y se
+    promedia sobre las palabras del más largo (así sobrar una palabra cuenta).
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return 0.0
+    remaining = list(b)
+    total = 0.0
+    for word in a:
+        best, best_index = 0.0, None
+        for i, other in enumerate(remaining):
+            score = word_similarity(word, other)
+            if score > best:
+                best, best_index = score, i
+                if score == 1.0:
+                    break
+        if best_index is not None:
+            del remaining[best_index]
+        total += best
+    return total / len(b)
+
+
+class Record:
+    __slots__ = ("pk", "name", "tokens", "weight", "group")
+
+    def __init__(self, pk, name, weight=0, group=None):
+        self.pk = pk
+        self.name = name
+        self.tokens = name_tokens(name)
+        self.weight = weight
+        # Cervecería (ya deduplicada) de una cerveza; None = desconocida
+        self.group = group
+
+    def rank(self):
+        return (-self.weight, self.pk)
+
+
+def _blocks(records):
+    frequency = Counter(token for record in records for token in set(record.tokens))
+    blocks = defaultdict(list)
+    for i, record in enumerate(records):
+        keys = {"k:" + "".join(record.tokens)[:PREFIX]}
+        keys.update("t:" + token for token in record.tokens
+                    if len(token) >= 3 and frequency[token] <= MAX_BLOCK)
+        for key in keys:
+            blocks[key].append(i)
+    return [block for block in blocks.values() if 1 < len(block) <= MAX_BLOCK]
+
+
+def _exact_pairs(records):
+    # Los nombres idénticos se unen sin compararlos, por grandes que sean sus bloques
+    buckets = defaultdict(list)
+    for i, record in enumerate(records):
+        buckets[tuple(sorted(record.tokens))].append(i)
+    for bucket in buckets.values():
+        first = {}
+        for i in bucket:
+            group = records[i].group
+            if group in first:
+                yield first[group], i, 1.0
+            else:
+                first[group] = i
+        if None in first and len(first) > 1:
+            yield next(i for group, i in first.items() if group is not None), first[None], 1.0
+
+
+def candidate_pairs(records, threshold=THRESHOLD):
+    """Pares (i, j, parecido) de índices de `records` que superan el umbral."""
+    yield from _exact_pairs(records)
+    seen = set()
+    for block in _blocks(records):
+        for n, i in enumerate(block):
+            a = records[i]
+            for j in block[n + 1:]:
+                b = records[j]
+                pair = (i, j) if i < j else (j, i)
+                if pair in seen:
+                    continue
+                # Con distinto número de palabras el parecido no pasa de corto/largo
+                short, long_ = sorted((len(a.tokens), len(b.tokens)))
+                if not long_ or short / long_ < threshold:
+                    continue
+                if a.group is not None and b.group is not None and a.group != b.group:
+                    continue
+                seen.add(pair)
+                score = similarity(a.tokens, b.tokens)
+                if score >= threshold:
+                    yield pair[0], pair[1], score
+
+
+def find_clusters(records, threshold=THRESHOLD):
+    """
+    Grupos de duplicados: listas de registros con el canónico (más reseñas)
+    primero, más el parecido mínimo de los pares que los unieron.
+    """
+    parent = list(range(len(records)))
+    group = [record.group for record in records]
+    score = {}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j, pair_score in sorted(candidate_pairs(records, threshold), key=lambda p: -p[2]):
+        ri, rj = find(i), find(j)
+        if ri == rj:
+            continue
+        # Una cerveza desconocida no puede unir dos cervecerías distintas
+        if group[ri] is not None and group[rj] is not None and group[ri] != group[rj]:
+            continue
+        parent[rj] = ri
+        group[ri] = group[ri] if group[ri] is not None else group[rj]
+        score[ri] = min(score.get(ri, 1.0), score.pop(rj, 1.0), pair_score)
+
+    members = defaultdict(list)
+    for i in range(len(records)):
+        members[find(i)].append(records[i])
+    clusters = []
+    for root, cluster in members.items():
+        if len(cluster) > 1:
+            cluster.sort(key=Record.rank)
+            clusters.append((cluster, group[root], round(score[root], 3)))
+    clusters.sort(key=lambda c: c[0][0].rank())
+    return clusters
+
+
+def unknown_brewery_ids():
+    from .models import Brewery
+
+    return set(Brewery.objects.filter(
+        normalized_name=normalize_name(UNKNOWN_BREWERY)).values_list("id", flat=True))
+
+
+def brewery_clusters(threshold=THRESHOLD):
+    from .models import Beer, Brewery
+
+    unknown = unknown_brewery_ids()
+    weights = dict(Beer.objects.order_by().values("brewery_id")
+                   .annotate(n=Sum("review_count")).values_list("brewery_id", "n"))
+    records = [Record(pk, name, weights.get(pk) or 0)
+               for pk, name in Brewery.objects.exclude(id__in=unknown)
+               .values_list("id", "name").iterator()]
+    return find_clusters(records, threshold)
+
+
+def beer_clusters(threshold=THRESHOLD, brewery_targets=None):
+    """
+    `brewery_targets` ({id: id canónico}) permite agrupar cervezas de
+    cervecerías que aún no se han fusionado (simulación).
+    """
+    from .models import Beer
+
+    unknown = unknown_brewery_ids()
+    brewery_targets = brewery_targets or {}
+    records = []
+    rows = Beer.objects.values_list("id", "name", "review_count", "brewery_id")
+    for pk, name, review_count, brewery_id in rows.iterator():
+        group = None if brewery_id in unknown else brewery_targets.get(brewery_id, brewery_id)
+        records.append(Record(pk, name, review_count, group))
+    return find_clusters(records, threshold)
+
+
+def targets(clusters):
+    """{id duplicado: id canónico}."""
+    return {record.pk: cluster[0].pk
+            for cluster, _, _ in clusters for record in cluster[1:]}
+
+
+def _remap(field, mapping):
+    return Case(*[When(**{field: source}, then=Value(target))
+                  for source, target in mapping.items()],
+                output_field=IntegerField())
+
+
+def _batches(clusters, size=BATCH):
+    for start in range(0, len(clusters), size):
+        yield clusters[start:start + size]
+
+
+def merge_breweries(clusters):
+    """Pasa las cervezas de cada duplicado a su canónica y borra los duplicados."""
+    from .models import Beer, Brewery
+
+    merged = 0
+    for batch in _batches(clusters):
+        mapping = targets(batch)
+        with transaction.atomic():
+            Beer.objects.filter(brewery_id__in=mapping).update(
+                brewery_id=_remap("brewery_id", mapping))
+            Brewery.objects.filter(id__in=mapping).delete()
+            caching.invalidate(caching.HOME_TOP_BEERS, caching.HOME_TRENDING_BEERS,
+                               caching.BEER_LIST_FILTERS)
+        merged += len(mapping)
+    # Las cervezas han cambiado de cervecería con un UPDATE, sin señales
+    if merged:
+        facets.rebuild()
+    return merged
+
+
+def merge_beers(clusters):
+    """
+    Pasa reseñas e hilos de cada duplicado a su canónica, le recalcula los
+    agregados y borra los duplicados. Si la canónica es de la cervecería
+    desconocida, toma la del grupo.
+    """
+    from .models import Beer, Review, Thread, rebuild_beer_aggregates
+
+    unknown = unknown_brewery_ids()
+    merged = 0
+    for batch in _batches(clusters):
+        mapping = targets(batch)
+        canonical = [cluster[0].pk for cluster, _, _ in batch]
+        with transaction.atomic():
+            Review.objects.filter(beer_id__in=mapping).update(beer_id=_remap("beer_id", mapping))
+            Thread.objects.filter(beer_id__in=mapping).update(beer_id=_remap("beer_id", mapping))
+            adopt = {cluster[0].pk: brewery for cluster, brewery, _ in batch if brewery is not None}
+            if adopt and unknown:
+                Beer.objects.filter(id__in=adopt, brewery_id__in=unknown).update(
+                    brewery_id=_remap("id", adopt))
+            # La actividad reciente de los duplicados se suma a la canónica
+            for pk, score in Beer.objects.filter(
+                    id__in=mapping, trending_score__gt=0).values_list("id", "trending_score"):
+                Beer.objects.filter(pk=mapping[pk]).update(
+                    trending_score=trending.add_expression(score))
+            Beer.objects.filter(id__in=mapping).delete()
+            rebuild_beer_aggregates(Beer.objects.filter(id__in=canonical))
+            caching.invalidate(caching.HOME_TOP_BEERS, caching.HOME_TRENDING_BEERS,
+                               caching.BEER_LIST_FILTERS,
+                               *(caching.beer_reviews_key(pk) for pk in canonical))
+        merged += len(mapping)
+    if merged:
+        facets.rebuild()
+    return merged
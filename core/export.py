@@ -0,0 +1,328 @@
+"""
+Exportación de reseñas, hilos y mensajes para análisis (CSV, JSON Lines o
+columnar).
+
+Cada tabla se recorre por cursor (created_at, id) en bloques de CHUNK filas
+con `.values_list()`: la memoria no depende del tamaño de la tabla y cada
+bloque es un rango del índice (created_at, id) de la tabla, sin OFFSET ni
+ordenación aparte.
+
+Las exportaciones incrementales parten de una marca de agua (created_at, id):
+la de la última fila exportada. Así no se pierden las filas con el mismo
+created_at que la marca. Además solo se exporta hasta hace SETTLE: created_at
+se fija al insertar, y una transacción lenta puede confirmar una fila con una
+fecha anterior a otras ya visibles; esas filas recientes salen en la
+siguiente exportación. Las ediciones y ocultaciones posteriores no se
+vuelven a exportar.
+
+`export` genera los bytes para el comando y para la descarga de staff bajo
+WSGI; `aexport` hace lo mismo de forma asíncrona para ASGI (allí
+StreamingHttpResponse solo va enviando los bloques si el iterador es
+asíncrono, y bajo WSGI volcaría uno asíncrono entero en memoria).
+
+El formato columnar ("col") es binario y comprimido, pensado para cargarlo
+en pandas o similares sin parsear texto. `read_columnar` lo lee.
+
+    "CRSLCOL1"  esquema: uint32 longitud + JSON [[columna, tipo], ...]
+    por bloque: uint32 filas (0 = fin) y por columna
+                uint32 longitud + zlib(nulos (1 byte/fila) + valores)
+
+Valores por tipo: "int" y "datetime" (microsegundos UTC) int64, "float"
+float64, "bool" un byte, "str" uint32 longitudes + UTF-8. Todo little-endian.
+"""
+import csv
+import io
+import json
+import struct
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Post, Review, Thread
+
+CHUNK = 5000
+# Margen para que confirmen las transacciones en curso (ver arriba)
+SETTLE = timedelta(minutes=1)
+MAGIC = b"CRSLCOL1"
+
+# tabla -> (modelo, [(columna, campo de values_list, tipo)])
+TABLES = {
+    "reviews": (Review, [
+        ("id", "id", "int"),
+        ("beer_id", "beer_id", "int"),
+        ("beer_name", "beer__name", "str"),
+        ("user_name", "user_name", "str"),
+        ("aroma", "aroma", "int"),
+        ("sabor", "sabor", "int"),
+        ("cuerpo", "cuerpo", "int"),
+        ("apariencia", "apariencia", "int"),
+        ("brand", "brand", "str"),
+        ("brewery_name", "brewery_name", "str"),
+        ("comment", "comment", "str"),
+        ("created_at", "created_at", "datetime"),
+    ]),
+    "threads": (Thread, [
+        ("id", "id", "int"),
+        ("beer_id", "beer_id", "int"),
+        ("beer_name", "beer_name", "str"),
+        ("title", "title", "str"),
+        ("user_id", "user_id", "int"),
+        ("user_name", "user_name", "str"),
+        ("post_count", "post_count", "int"),
+        ("last_post_at", "last_post_at", "datetime"),
+        ("created_at", "created_at", "datetime"),
+    ]),
+    "posts": (Post, [
+        ("id", "id", "int"),
+        ("thread_id", "thread_id", "int"),
+        ("user_id", "user_id", "int"),
+        ("user_name", "user_name", "str"),
+        ("body", "body", "str"),
+        ("is_hidden", "is_hidden", "bool"),
+        ("created_at", "created_at", "datetime"),
+    ]),
+}
+
+
+def fetch_chunk(table, after=None, until=None, size=CHUNK, using=None):
+    """
+    Siguiente bloque de filas (tuplas) de `table` tras el cursor `after`
+    ((created_at, id); con id None, todo lo posterior a created_at) y
+    creadas antes de `until`.
+    """
+    model, columns = TABLES[table]
+    queryset = model.objects.using(using) if using else model.objects.all()
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+    if after is not None:
+        created_at, pk = after
+        if pk is None:
+            queryset = queryset.filter(created_at__gt=created_at)
+        else:
+            # El >= va aparte para que sea un rango del índice (con solo el
+            # OR SQLite recorre el índice desde el principio en cada bloque)
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(id__gt=pk),
+                                       created_at__gte=created_at)
+    fields = [field for _, field, _ in columns]
+    return list(queryset.order_by("created_at", "id").values_list(*fields)[:size])
+
+
+def _cursor(table, row):
+    names = [name for name, _, _ in TABLES[table][1]]
+    return row[names.index("created_at")], row[names.index("id")]
+
+
+def _until():
+    return timezone.now() - SETTLE
+
+
+def chunks(table, since=None, size=CHUNK, using=None, until=None):
+    """Bloques no vacíos de filas posteriores a la marca `since`."""
+    after, until = since, until or _until()
+    while True:
+        rows = fetch_chunk(table, after, until, size, using)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < size:
+            return
+        after = _cursor(table, rows[-1])
+
+
+def watermark(table, rows):
+    """(created_at, id) de la última fila de un bloque: el `since` de la siguiente exportación."""
+    return _cursor(table, rows[-1]) if rows else None
+
+
+def parse_since(value, pk=None):
+    """
+    Marca de agua (created_at, id) a partir de una fecha ISO 8601 (sin zona
+    se toma la del proyecto) y, opcionalmente, un id; None si no hay fecha.
+    """
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(f"Fecha no válida: {value}")
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    if pk in (None, ""):
+        return since, None
+    try:
+        return since, int(pk)
+    except ValueError:
+        raise ValueError(f"Id no válido: {pk}")
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+# --- Formatos -------------------------------------------------------------
+
+class CSVEncoder:
+    content_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self, table):
+        self.columns = [name for name, _, _ in TABLES[table][1]]
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _take(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data.encode()
+
+    def header(self):
+        self._writer.writerow(self.columns)
+        return self._take()
+
+    def encode(self, rows):
+        self._writer.writerows([_plain(value) for value in row] for row in rows)
+        return self._take()
+
+    def footer(self):
+        return b""
+
+
+class JSONLinesEncoder:
+    content_type = "application/x-ndjson"
+    extension = "jsonl"
+
+    def __init__(self, table):
+        self.columns = [name for name, _, _ in TABLES[table][1]]
+
+    def header(self):
+        return b""
+
+    def encode(self, rows):
+        return "".join(
+            json.dumps(dict(zip(self.columns, map(_plain, row))), ensure_ascii=False) + "\n"
+            for row in rows).encode()
+
+    def footer(self):
+        return b""
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _micros(value):
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _encode_column(kind, values):
+    nulls = bytes(value is None for value in values)
+    if kind == "str":
+        encoded = [(value or "").encode() for value in values]
+        payload = array("I", map(len, encoded)).tobytes() + b"".join(encoded)
+    elif kind == "float":
+        payload = array("d", (value or 0.0 for value in values)).tobytes()
+    elif kind == "bool":
+        payload = bytes(bool(value) for value in values)
+    else:
+        if kind == "datetime":
+            values = [_micros(value) if value is not None else 0 for value in values]
+        payload = array("q", (value or 0 for value in values)).tobytes()
+    return zlib.compress(nulls + payload)
+
+
+class ColumnarEncoder:
+    content_type = "application/octet-stream"
+    extension = "col"
+
+    def __init__(self, table):
+        self.columns = [(name, kind) for name, _, kind in TABLES[table][1]]
+
+    def header(self):
+        schema = json.dumps(self.columns).encode()
+        return MAGIC + struct.pack("<I", len(schema)) + schema
+
+    def encode(self, rows):
+        parts = [struct.pack("<I", len(rows))]
+        for index, (_, kind) in enumerate(self.columns):
+            block = _encode_column(kind, [row[index] for row in rows])
+            parts.append(struct.pack("<I", len(block)))
+            parts.append(block)
+        return b"".join(parts)
+
+    def footer(self):
+        return struct.pack("<I", 0)
+
+
+ENCODERS = {"csv": CSVEncoder, "jsonl": JSONLinesEncoder, "col": ColumnarEncoder}
+
+
+def _decode_column(kind, data, count):
+    nulls, payload = data[:count], data[count:]
+    if kind == "str":
+        lengths = array("I")
+        lengths.frombytes(payload[:4 * count])
+        values, offset = [], 4 * count
+        for length in lengths:
+            values.append(payload[offset:offset + length].decode())
+            offset += length
+    elif kind == "bool":
+        values = [bool(b) for b in payload]
+    else:
+        values = array("d" if kind == "float" else "q")
+        values.frombytes(payload)
+        values = list(values)
+        if kind == "datetime":
+            values = [datetime.fromtimestamp(v / 1_000_000, dt_timezone.utc) for v in values]
+    return [None if null else value for null, value in zip(nulls, values)]
+
+
+def read_columnar(stream):
+    """Genera (esquema, {columna: [valores]}) por bloque de un fichero columnar."""
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("No es un fichero columnar de exportación")
+    (length,) = struct.unpack("<I", stream.read(4))
+    schema = json.loads(stream.read(length))
+    while True:
+        (count,) = struct.unpack("<I", stream.read(4))
+        if not count:
+            return
+        block = {}
+        for name, kind in schema:
+            (length,) = struct.unpack("<I", stream.read(4))
+            block[name] = _decode_column(kind, zlib.decompress(stream.read(length)), count)
+        yield schema, block
+
+
+def export(table, fmt, since=None, size=CHUNK, using=None):
+    """Genera los bytes de la exportación completa, bloque a bloque."""
+    encoder = ENCODERS[fmt](table)
+    yield encoder.header()
+    for rows in chunks(table, since, size, using):
+        yield encoder.encode(rows)
+    yield encoder.footer()
+
+
+async def aexport(table, fmt, since=None, size=CHUNK, using=None):
+    """Como `export`, pero cada bloque se lee en un hilo aparte."""
+    encoder = ENCODERS[fmt](table)
+    fetch = sync_to_async(fetch_chunk)
+    yield encoder.header()
+    after, until = since, _until()
+    while True:
+        rows = await fetch(table, after, until, size, using)
+        if rows:
+            yield encoder.encode(rows)
+        if len(rows) < size:
+            break
+        after = _cursor(table, rows[-1])
+    yield encoder.footer()
@@ -0,0 +1,146 @@
+"""
+Facetas del listado de cervezas: cuántas cervezas y reseñas, y qué rating
+medio, hay por estilo, por cervecería y por cervecería y estilo.
+
+Los contadores viven en StyleFacet, BreweryFacet y BreweryStyleFacet y se
+actualizan con un UPDATE ... + delta por tabla al crear, mover o borrar una
+cerveza (señales) y al sumar o restar una reseña (`apply_review_delta` de
+core.models). Leer las facetas nunca agrupa Beer ni Review:
+
+- sin filtros, se leen las tablas por estilo y por cervecería;
+- con un estilo elegido, las cervecerías salen del cruce filtrado por ese
+  estilo (y al revés), así cada desplegable cuenta lo que quedaría al elegirlo.
+
+Las operaciones masivas que no disparan señales (importaciones, datos de
+prueba, fusión de duplicados) llaman a `rebuild()` al terminar.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+
+_RATING_SUMS = ("aroma_sum", "sabor_sum", "cuerpo_sum", "apariencia_sum")
+
+
+def _targets(style, brewery_id):
+    from .models import BreweryFacet, BreweryStyleFacet, StyleFacet
+
+    return ((StyleFacet, {"style": style}),
+            (BreweryFacet, {"brewery_id": brewery_id}),
+            (BreweryStyleFacet, {"brewery_id": brewery_id, "style": style}))
+
+
+def apply_delta(style, brewery_id, beers=0, reviews=0, rating_total=0):
+    """Suma los deltas a las tres facetas de (estilo, cervecería); crea las que falten."""
+    deltas = {"beers": F("beers") + beers, "reviews": F("reviews") + reviews,
+              "rating_total": F("rating_total") + rating_total}
+    for model, lookup in _targets(style, brewery_id):
+        if model.objects.filter(**lookup).update(**deltas):
+            continue
+        # Restar de una faceta que ya no está: se borró con su cervecería
+        if beers <= 0 and reviews <= 0:
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(**lookup, beers=beers, reviews=reviews,
+                                     rating_total=rating_total)
+        except IntegrityError:
+            # Otra petición la ha creado entre el UPDATE y el INSERT
+            model.objects.filter(**lookup).update(**deltas)
+
+
+def apply_review_delta(beer_id, sign, scores):
+    from .models import Beer
+
+    row = Beer.objects.filter(pk=beer_id).values_list("style", "brewery_id").first()
+    if row:
+        apply_delta(*row, reviews=sign, rating_total=sign * sum(scores.values()))
+
+
+def _beer_totals(values):
+    return {"beers": 1, "reviews": values["review_count"],
+            "rating_total": sum(values[field] for field in _RATING_SUMS)}
+
+
+def rebuild():
+    """Recalcula las tres tablas desde Beer con una sola consulta agrupada."""
+    from .models import Beer, BreweryFacet, BreweryStyleFacet, StyleFacet
+
+    rows = (Beer.objects.order_by().values("brewery_id", "style")
+            .annotate(n=Count("id"), reviews=Sum("review_count"),
+                      rating_total=Sum(F("aroma_sum") + F("sabor_sum")
+                                       + F("cuerpo_sum") + F("apariencia_sum"))))
+    styles, breweries, crossed = {}, {}, []
+    for row in rows.iterator():
+        counts = {"beers": row["n"], "reviews": row["reviews"] or 0,
+                  "rating_total": row["rating_total"] or 0}
+        crossed.append(BreweryStyleFacet(brewery_id=row["brewery_id"], style=row["style"], **counts))
+        for totals, key in ((styles, row["style"]), (breweries, row["brewery_id"])):
+            current = totals.setdefault(key, dict.fromkeys(counts, 0))
+            for field, value in counts.items():
+                current[field] += value
+    with transaction.atomic():
+        for model in (StyleFacet, BreweryFacet, BreweryStyleFacet):
+            model.objects.all().delete()
+        StyleFacet.objects.bulk_create(
+            [StyleFacet(style=style, **counts) for style, counts in styles.items()], batch_size=2000)
+        BreweryFacet.objects.bulk_create(
+            [BreweryFacet(brewery_id=pk, **counts) for pk, counts in breweries.items()],
+            batch_size=2000)
+        BreweryStyleFacet.objects.bulk_create(crossed, batch_size=2000)
+
+
+def for_filters(style="", brewery_id=None):
+    """
+    Consultas (estilos, cervecerías) con beers > 0 para los desplegables.
+    Cada una tiene en cuenta el filtro de la otra.
+    """
+    from .models import BreweryFacet, BreweryStyleFacet, StyleFacet
+
+    if brewery_id:
+        styles = BreweryStyleFacet.objects.filter(brewery_id=brewery_id)
+    else:
+        styles = StyleFacet.objects.all()
+    if style:
+        breweries = BreweryStyleFacet.objects.filter(style=style)
+    else:
+        breweries = BreweryFacet.objects.all()
+    return (styles.filter(beers__gt=0).order_by("style"),
+            breweries.filter(beers__gt=0).select_related("brewery").order_by("brewery__name"))
+
+
+# --- Señales --------------------------------------------------------------
+
+def _remember_beer(sender, instance, raw=False, **kwargs):
+    instance._facet_previous = None
+    if instance.pk and not instance._state.adding and not raw:
+        instance._facet_previous = sender.objects.filter(pk=instance.pk).values(
+            "style", "brewery_id", "review_count", *_RATING_SUMS).first()
+
+
+def _beer_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_facet_previous", None)
+    if created or previous is None:
+        apply_delta(instance.style, instance.brewery_id, beers=1)
+        return
+    if (previous["style"], previous["brewery_id"]) == (instance.style, instance.brewery_id):
+        return
+    # Cambio de estilo o cervecería: la cerveza se lleva sus reseñas
+    totals = _beer_totals(previous)
+    apply_delta(previous["style"], previous["brewery_id"],
+                **{field: -value for field, value in totals.items()})
+    apply_delta(instance.style, instance.brewery_id, **totals)
+
+
+def _beer_deleted(sender, instance, **kwargs):
+    # Las reseñas ya se han descontado una a una al borrarse en cascada
+    apply_delta(instance.style, instance.brewery_id, beers=-1)
+
+
+def connect():
+    from .models import Beer
+
+    pre_save.connect(_remember_beer, sender=Beer, dispatch_uid="facets_remember_beer")
+    post_save.connect(_beer_saved, sender=Beer, dispatch_uid="facets_beer_saved")
+    post_delete.connect(_beer_deleted, sender=Beer, dispatch_uid="facets_beer_deleted")
@@ -11,7 +11,8 @@ class ThreadForm(forms.Form):
         max_length=120,
         required=False,
         label="Cerveza (opcional)",
-        help_text="Escribe el nombre de la cerveza (no es obligatorio)."
+        help_text="Escribe el nombre de la cerveza (no es obligatorio).",
+        widget=forms.TextInput(attrs={"data-autocomplete": "beer"}),
     )
 
     def clean_title(self):
@@ -46,11 +47,13 @@ class ReviewForm(forms.Form):
     user_name = forms.CharField(max_length=100, label="Nombre de usuario")
     # Permitir que el usuario escriba libremente el nombre de la cerveza y el estilo
     beer_name = forms.CharField(
-        max_length=120, required=False, label="Nombre de la cerveza")
+        max_length=120, required=False, label="Nombre de la cerveza",
+        widget=forms.TextInput(attrs={"data-autocomplete": "beer"}))
     style = forms.CharField(max_length=80, required=False, label="Estilo")
     brand = forms.CharField(max_length=120, required=False, label="Marca")
     brewery_name = forms.CharField(
-        max_length=120, required=False, label="Cervecería Productora")
+        max_length=120, required=False, label="Cervecería Productora",
+        widget=forms.TextInput(attrs={"data-autocomplete": "brewery"}))
     comment = forms.CharField(
         widget=forms.Textarea(attrs={'rows': 10, 'cols': 40}),
         label="Descripción",
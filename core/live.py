@@ -0,0 +1,248 @@
+"""
+Actualizaciones en vivo de los hilos (Server-Sent Events).
+
+Cada respuesta visible nueva se publica, al confirmarse la transacción, en el
+canal de su hilo. Las conexiones SSE abiertas en este proceso se suscriben a
+ese canal a través de un broker:
+
+- "memory": pub/sub en memoria, válido con un único proceso.
+- "redis": cualquier servidor compatible con Redis; cada proceso mantiene una
+  sola suscripción y reparte los mensajes localmente, así que varios workers
+  ven las respuestas de los demás.
+
+Un suscriptor es solo una cola acotada; si se llena (cliente lento) se le
+desconecta y el navegador se reconecta pidiendo lo que le falta con
+Last-Event-ID. Mientras espera no ocupa ninguna conexión a la base de datos.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.utils import dateformat, timezone
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100
+# Segundos entre comentarios de keep-alive (evitan que proxies corten la conexión)
+HEARTBEAT = 15
+# Respuestas que se reenvían como máximo al reconectar
+BACKLOG = 50
+CHANNEL_PREFIX = "crisol:thread:"
+# Marca que se encola para cortar a un suscriptor que no da abasto
+OVERFLOW = object()
+
+
+def thread_channel(thread_id):
+    return f"{CHANNEL_PREFIX}{thread_id}"
+
+
+def post_payload(post):
+    return {
+        "id": post.id,
+        "thread_id": post.thread_id,
+        "user_name": post.user_name,
+        "body": post.body,
+        "created_at": post.created_at,
+        "created_display": dateformat.format(
+            timezone.localtime(post.created_at), "d/m/Y H:i"),
+    }
+
+
+def format_event(data, event_id=None, event="post"):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.splitlines())
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def deliver(self, message):
+        # Se ejecuta siempre en el bucle del suscriptor
+        if self.queue.full():
+            self.broker.unsubscribe(self)
+            self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+        else:
+            self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Siguiente mensaje, None si vence `timeout`; OVERFLOW si se cortó."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class MemoryBroker:
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        """Seguro desde cualquier hilo: entrega en el bucle de cada suscriptor."""
+        self.dispatch(channel, json.dumps(message, cls=DjangoJSONEncoder))
+
+    def dispatch(self, channel, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, data)
+            except RuntimeError:
+                # El bucle ya se cerró
+                self.unsubscribe(subscription)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+class RedisBroker(MemoryBroker):
+    """Publica en Redis y reparte localmente lo que llega por una única suscripción."""
+
+    def __init__(self, url):
+        super().__init__()
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError:
+            raise ImproperlyConfigured(
+                'LIVE_UPDATES["BROKER"] = "redis" necesita el paquete redis: pip install redis')
+
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+        self._async_module = redis.asyncio
+        self._errors = redis.RedisError
+        self._listeners = {}
+
+    def subscribe(self, channel):
+        subscription = super().subscribe(channel)
+        loop = subscription.loop
+        task = self._listeners.get(loop)
+        if task is None or task.done():
+            self._listeners[loop] = loop.create_task(self._listen())
+        return subscription
+
+    def publish(self, channel, message):
+        try:
+            self._client.publish(channel, json.dumps(message, cls=DjangoJSONEncoder))
+        except self._errors:
+            # Sin Redis no hay directo, pero la respuesta ya está guardada
+            logger.warning("No se pudo publicar en %s", channel, exc_info=True)
+
+    async def _listen(self):
+        while True:
+            client = self._async_module.Redis.from_url(self.url)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self.dispatch(message["channel"].decode(), message["data"].decode())
+            except self._errors:
+                logger.warning("Suscripción a Redis perdida; reintentando", exc_info=True)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, "LIVE_UPDATES", {})
+                if config.get("BROKER", "memory") == "redis":
+                    _broker = RedisBroker(config.get("REDIS_URL", "redis://127.0.0.1:6379/1"))
+                else:
+                    _broker = MemoryBroker()
+    return _broker
+
+
+def _close_connection():
+    # `connection` se resuelve en el hilo donde se ejecuta, no en el del bucle
+    connection.close()
+
+
+async def thread_event_stream(thread_id, last_event_id=None):
+    """
+    Generador SSE de un hilo: primero las respuestas posteriores a
+    `last_event_id` (reconexiones) y después las que se vayan publicando.
+    """
+    from .models import Post
+
+    subscription = get_broker().subscribe(thread_channel(thread_id))
+    try:
+        yield "retry: 3000\n\n"
+        last_sent = last_event_id or 0
+        if last_event_id is not None:
+            backlog = Post.objects.filter(
+                thread_id=thread_id, is_hidden=False, id__gt=last_event_id,
+            ).order_by("id")[:BACKLOG]
+            async for post in backlog:
+                yield format_event(json.dumps(post_payload(post), cls=DjangoJSONEncoder), post.id)
+                last_sent = post.id
+        # La espera puede durar horas: se suelta la conexión del hilo de la
+        # petición (la de la comprobación del hilo y la del backlog)
+        await sync_to_async(_close_connection)()
+        while True:
+            data = await subscription.get(timeout=HEARTBEAT)
+            if data is None:
+                yield ": ping\n\n"
+                continue
+            if data is OVERFLOW:
+                break
+            post_id = json.loads(data)["id"]
+            if post_id <= last_sent:
+                continue
+            last_sent = post_id
+            yield format_event(data, post_id)
+    finally:
+        get_broker().unsubscribe(subscription)
+
+
+def _publish_new_post(sender, instance, created, **kwargs):
+    if not created or instance.is_hidden:
+        return
+    payload = post_payload(instance)
+    channel = thread_channel(instance.thread_id)
+    transaction.on_commit(lambda: get_broker().publish(channel, payload))
+
+
+def connect():
+    from .models import Post
+
+    post_save.connect(_publish_new_post, sender=Post,
+                      dispatch_uid="live_publish_new_post")
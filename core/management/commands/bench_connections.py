@@ -0,0 +1,98 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core import mysqlpool
+from core.benchmark import summarize
+
+# Modo -> CONN_MAX_AGE durante la prueba
+MODES = {"per-request": 0, "persistent": 600}
+
+
+class Command(BaseCommand):
+    help = ("Simula el ciclo de conexión de muchas peticiones (request_started, "
+            "una consulta, request_finished) en varios hilos y compara la latencia "
+            "abriendo una conexión por petición, con conexiones persistentes y, si "
+            "el backend es core.mysqlpool, con el pool.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--requests", type=int, default=500,
+                            help="Peticiones simuladas por modo.")
+        parser.add_argument("-c", "--concurrency", type=int, default=8,
+                            help="Hilos (cada uno con su conexión, como los workers).")
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--mode", action="append", choices=list(MODES),
+                            help="Modos a medir (por defecto todos).")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        settings_dict = connections[alias].settings_dict
+        original_max_age = settings_dict["CONN_MAX_AGE"]
+        self.stdout.write(f"Backend: {settings_dict['ENGINE']} ({alias}), "
+                          f"{options['concurrency']} hilos")
+        try:
+            for mode in options["mode"] or list(MODES):
+                # Todas las conexiones comparten este diccionario de ajustes
+                settings_dict["CONN_MAX_AGE"] = MODES[mode]
+                connections.close_all()
+                summary = self.run(alias, options["requests"], options["concurrency"])
+                self.stdout.write(
+                    f"{mode:<12} p50 {summary['p50_ms']:>7} ms  p95 {summary['p95_ms']:>7} ms  "
+                    f"p99 {summary['p99_ms']:>7} ms  {summary['rps']:>8} req/s  "
+                    f"{summary['connections_opened']:>4} conexiones  {summary['errors']} errores")
+        finally:
+            settings_dict["CONN_MAX_AGE"] = original_max_age
+            connections.close_all()
+        for pool_alias, stats in mysqlpool.all_stats().items():
+            self.stdout.write(f"Pool {pool_alias}: {stats}")
+
+    def run(self, alias, total, concurrency):
+        latencies, errors, opened = [], [0], [0]
+        lock = threading.Lock()
+
+        def count_connection(connection, **kwargs):
+            if connection.alias == alias:
+                with lock:
+                    opened[0] += 1
+
+        def worker(requests):
+            try:
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    request_started.send(sender=self.__class__)
+                    try:
+                        with connections[alias].cursor() as cursor:
+                            cursor.execute("SELECT 1")
+                            cursor.fetchone()
+                    except Exception:
+                        with lock:
+                            errors[0] += 1
+                    finally:
+                        request_finished.send(sender=self.__class__)
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+
+        pool_before = mysqlpool.all_stats().get(alias, {}).get("created", 0)
+        connection_created.connect(count_connection)
+        try:
+            threads = [threading.Thread(target=worker, args=(total // concurrency,))
+                       for _ in range(concurrency)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connection)
+        summary = summarize(latencies, errors[0], elapsed)
+        pool = mysqlpool.all_stats().get(alias)
+        # Con el pool, connection_created salta en cada préstamo: se cuentan las reales
+        summary["connections_opened"] = pool["created"] - pool_before if pool else opened[0]
+        return summary
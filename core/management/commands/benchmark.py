@@ -0,0 +1,213 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+from django.urls import URLPattern, reverse
+
+from core import urls as core_urls
+from core.api import RESOURCES
+from core.benchmark import compare_reports, profile_path, run_load
+from core.models import Beer, Brewery, Post, Report, Review, Thread
+
+# Vistas que no se pueden medir con GET repetidos: cambian datos o no terminan
+SKIP = {"moderation_action", "logout", "thread_events"}
+NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+COUNTED_MODELS = (Brewery, Beer, Review, Thread, Post, Report)
+
+
+def _first_id(model, **filters):
+    return model.objects.filter(**filters).order_by("id").values_list("id", flat=True).first()
+
+
+def sample_kwargs():
+    """Valores reales para cada parámetro de ruta de core/urls.py."""
+    return {
+        "beer_id": _first_id(Beer, review_count__gt=0) or _first_id(Beer),
+        "thread_id": _first_id(Thread, post_count__gt=0) or _first_id(Thread),
+        "review_id": _first_id(Review),
+        "object_type": "post",
+        "object_id": _first_id(Post),
+        "table": "reviews",
+    }
+
+
+def benchmark_cases():
+    """
+    ([(nombre, ruta)], {nombre: motivo}): las rutas de core/urls.py que se
+    pueden pedir por GET y las que se quedan sin medir.
+    """
+    samples = sample_kwargs()
+    cases, skipped = [], {}
+    for pattern in core_urls.urlpatterns:
+        if not isinstance(pattern, URLPattern):
+            continue
+        if pattern.name in SKIP:
+            skipped[pattern.name] = "no se puede medir con GET repetidos"
+            continue
+        params = list(pattern.pattern.converters)
+        if "resource_name" in params:
+            # Un caso por recurso de la API (listado y detalle)
+            for resource_name, resource in RESOURCES.items():
+                kwargs = {"resource_name": resource_name}
+                if "object_id" in params:
+                    object_id = _first_id(resource.model)
+                    if object_id is None:
+                        skipped[f"{pattern.name}:{resource_name}"] = "sin datos"
+                        continue
+                    kwargs["object_id"] = object_id
+                cases.append((f"{pattern.name}:{resource_name}", reverse(pattern.name, kwargs=kwargs)))
+            continue
+        kwargs = {name: samples.get(name) for name in params}
+        missing = [name for name, value in kwargs.items() if value is None]
+        if missing:
+            skipped[pattern.name] = f"sin valor para {', '.join(missing)}"
+            continue
+        cases.append((pattern.name, reverse(pattern.name, kwargs=kwargs)))
+    return cases, skipped
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Mide todas las vistas de core/urls.py con el cliente de pruebas (p50/p95/p99, "
+            "consultas y memoria) y, opcionalmente, con carga HTTP contra un servidor. "
+            "Genera un informe JSON comparable entre commits (--compare).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Peticiones medidas por vista.")
+        parser.add_argument("--only", action="append",
+                            help="Medir solo estas vistas (nombre de URL, repetible).")
+        parser.add_argument("--cache", choices=("on", "off"), default="off",
+                            help="off mide el coste sin caché (por defecto).")
+        parser.add_argument("--user", help="Medir como este usuario autenticado.")
+        parser.add_argument("--staff", action="store_true",
+                            help="Medir como un usuario staff temporal (todo en una "
+                                 "transacción que se deshace al terminar).")
+        parser.add_argument("--http-url",
+                            help="Además, carga HTTP contra este servidor ya arrancado.")
+        parser.add_argument("-c", "--concurrency", type=int, default=20)
+        parser.add_argument("-d", "--duration", type=float, default=5.0,
+                            help="Segundos de carga HTTP por vista.")
+        parser.add_argument("--output", help="Guardar el informe JSON aquí.")
+        parser.add_argument("--compare", help="Informe JSON anterior con el que comparar.")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Empeoramiento de p95 que cuenta como regresión (0.2 = 20%%).")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            setup_test_environment()
+        except RuntimeError:
+            pass  # ya preparado (p. ej. desde los tests)
+        if options["user"] and options["staff"]:
+            raise CommandError("--user y --staff no se pueden combinar.")
+        cases, skipped = benchmark_cases()
+        if options["only"]:
+            cases = [case for case in cases if case[0].split(":")[0] in options["only"]]
+            skipped = {name: reason for name, reason in skipped.items()
+                       if name.split(":")[0] in options["only"]}
+        if not cases:
+            raise CommandError("No hay vistas que medir (¿base de datos vacía? usa seed_forum).")
+
+        with transaction.atomic():
+            client = Client()
+            if options["staff"]:
+                client.force_login(User.objects.create_user(
+                    "benchmark", is_staff=True, is_superuser=True))
+            elif options["user"]:
+                user = User.objects.filter(username=options["user"]).first()
+                if user is None:
+                    raise CommandError(f"No existe el usuario {options['user']}")
+                client.force_login(user)
+            report = {"meta": self.metadata(options), "views": {}, "skipped": skipped}
+            self.measure(client, cases, options, report)
+            transaction.set_rollback(True)
+
+        # Sin la sesión adecuada una vista protegida mide su redirección al login
+        not_ok = {name: result["status"] for name, result in report["views"].items()
+                  if not 200 <= result["status"] < 300}
+        if not_ok:
+            hint = "" if options["user"] or options["staff"] else "; ¿falta --user o --staff?"
+            self.stdout.write(self.style.WARNING(
+                f"Respuestas no 2xx (no miden la página{hint}): "
+                + ", ".join(f"{name} ({status})" for name, status in not_ok.items())))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                "Sin medir: " + ", ".join(f"{name} ({reason})"
+                                          for name, reason in skipped.items())))
+
+        if options["http_url"]:
+            report["http"] = {}
+            for name, path in cases:
+                result = run_load(options["http_url"], [path],
+                                  options["concurrency"], options["duration"])
+                report["http"][name] = result["total"]
+                total = result["total"]
+                self.stdout.write(
+                    f"HTTP {name:<23} {total.get('rps', 0):>7} req/s  "
+                    f"p95 {total['p95_ms']} ms  {total['errors']} errores")
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f"Informe guardado en {options['output']}"))
+
+        if options["compare"]:
+            self.compare(options, report)
+
+    def measure(self, client, cases, options, report):
+        overrides = {"RATE_LIMIT_ENABLED": False}
+        if options["cache"] == "off":
+            overrides["CACHES"] = NO_CACHE
+        with override_settings(**overrides):
+            for name, path in cases:
+                result = profile_path(client, path, options["repeat"])
+                report["views"][name] = result
+                self.stdout.write(
+                    f"{name:<28} {result['status']}  p50 {result['p50_ms']:>7} ms  "
+                    f"p95 {result['p95_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  "
+                    f"{result['queries']:>3} consultas  {result['peak_kb']:>8} KB")
+
+    def metadata(self, options):
+        return {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "cache": options["cache"],
+            "user": "staff temporal" if options["staff"] else options["user"],
+            "repeat": options["repeat"],
+            "rows": {model._meta.model_name: model.objects.count() for model in COUNTED_MODELS},
+        }
+
+    def compare(self, options, report):
+        with open(options["compare"]) as f:
+            baseline = json.load(f)
+        rows = compare_reports(baseline, report, options["threshold"])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Comparación con {baseline['meta'].get('commit') or options['compare']}"))
+        regressions = 0
+        for name, metric, old, new, regression in rows:
+            line = f"  {name:<28} {metric:<8} {old} -> {new}"
+            if regression:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line + "  REGRESIÓN"))
+            else:
+                self.stdout.write(line)
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{regressions} regresiones")
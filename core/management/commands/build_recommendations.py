@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import recommendations
+
+
+class Command(BaseCommand):
+    help = ("Calcula, a partir de las puntuaciones de las reseñas, las cervezas "
+            "más parecidas a cada una y las guarda en BeerNeighbor (ficha de la "
+            "cerveza y feed personal). Necesita numpy y scipy.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=recommendations.TOP_K,
+                            help="Vecinas que se guardan por cerveza.")
+
+    def handle(self, *args, **options):
+        try:
+            import numpy  # noqa: F401
+            import scipy  # noqa: F401
+        except ImportError:
+            raise CommandError("Este comando necesita numpy y scipy: pip install numpy scipy")
+        if options["top"] < 1:
+            raise CommandError("--top debe ser al menos 1.")
+
+        started = time.perf_counter()
+        matrix, beer_ids = recommendations.rating_matrix()
+        self.stdout.write(f"Matriz de {matrix.shape[0]} usuarios x {matrix.shape[1]} cervezas, "
+                          f"{matrix.nnz} puntuaciones ({time.perf_counter() - started:.1f} s)")
+        saved = recommendations.store(
+            recommendations.neighbors(matrix, beer_ids, options["top"]))
+        self.stdout.write(self.style.SUCCESS(
+            f"{saved} vecinas guardadas en {time.perf_counter() - started:.1f} s"))
@@ -0,0 +1,69 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import dedup
+
+
+class Command(BaseCommand):
+    help = ("Busca cervecerías y cervezas duplicadas por nombre parecido y, con "
+            "--apply, las fusiona: mueve reseñas e hilos a la canónica (la de más "
+            "reseñas), recalcula sus agregados y borra las demás.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=["all", "brewery", "beer"], default="all")
+        parser.add_argument("--threshold", type=float, default=dedup.THRESHOLD,
+                            help="Parecido mínimo (0-1) para proponer una fusión.")
+        parser.add_argument("--apply", action="store_true",
+                            help="Fusionar; sin esta opción solo se muestran las propuestas.")
+        parser.add_argument("--json", action="store_true",
+                            help="Escribir las propuestas como JSON, una por línea.")
+        parser.add_argument("--show", type=int, default=50,
+                            help="Propuestas que se muestran de cada tipo (sin --json).")
+
+    def handle(self, *args, **options):
+        if not 0 < options["threshold"] <= 1:
+            raise CommandError("--threshold debe estar entre 0 y 1.")
+        threshold = options["threshold"]
+        brewery_targets = {}
+
+        if options["kind"] in ("all", "brewery"):
+            clusters = self.find("brewery", dedup.brewery_clusters, threshold, options)
+            if options["apply"]:
+                merged = dedup.merge_breweries(clusters)
+                self.log(options, f"{merged} cervecerías fusionadas")
+            else:
+                brewery_targets = dedup.targets(clusters)
+
+        if options["kind"] in ("all", "beer"):
+            clusters = self.find("beer", dedup.beer_clusters, threshold, options,
+                                 brewery_targets=brewery_targets)
+            if options["apply"]:
+                merged = dedup.merge_beers(clusters)
+                self.log(options, f"{merged} cervezas fusionadas")
+
+    def log(self, options, message):
+        if not options["json"]:
+            self.stdout.write(self.style.SUCCESS(message))
+
+    def find(self, kind, finder, threshold, options, **kwargs):
+        started = time.perf_counter()
+        clusters = finder(threshold, **kwargs)
+        elapsed = time.perf_counter() - started
+        for n, (cluster, _, score) in enumerate(clusters):
+            target, *duplicates = cluster
+            if options["json"]:
+                self.stdout.write(json.dumps({
+                    "type": kind,
+                    "score": score,
+                    "target": {"id": target.pk, "name": target.name},
+                    "duplicates": [{"id": r.pk, "name": r.name} for r in duplicates],
+                }, ensure_ascii=False))
+            elif n < options["show"]:
+                names = ", ".join(f"{r.name} (#{r.pk})" for r in duplicates)
+                self.stdout.write(f"[{score}] {target.name} (#{target.pk}) <- {names}")
+        self.log(options, f"{kind}: {len(clusters)} grupos, "
+                          f"{sum(len(c) - 1 for c, _, _ in clusters)} duplicados "
+                          f"({elapsed:.1f} s)")
+        return clusters
@@ -0,0 +1,134 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+
+from core.models import Beer, Thread
+
+NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+def default_paths():
+    """Rutas de lectura más visitadas, con ids reales de la base de datos."""
+    paths = [
+        reverse("home"),
+        reverse("beer_list"),
+        reverse("threads_list"),
+        reverse("threads_list") + "?sort=activity",
+        reverse("moderation_list"),
+        reverse("api_list", args=["beers"]),
+        reverse("api_list", args=["posts"]),
+    ]
+    beer = Beer.objects.order_by("id").values("id", "style").first()
+    if beer:
+        paths.append(reverse("beer_list") + f"?style={beer['style']}")
+        paths.append(reverse("beer_detail", args=[beer["id"]]))
+    thread_id = Thread.objects.order_by("id").values_list("id", flat=True).first()
+    if thread_id:
+        paths.append(reverse("thread_detail", args=[thread_id]))
+    return paths
+
+
+def explain(sql, tables):
+    """(filas del plan como texto, [recorridos completos]) según el motor."""
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            lines = [row[-1] for row in cursor.fetchall()]
+            # "SCAN tabla" sin índice = recorrido completo de la tabla. Si va en
+            # el orden de la clave primaria y con LIMIT, se corta pronto.
+            bounded = " LIMIT " in sql and not any("TEMP B-TREE" in line for line in lines)
+            scans = [line for line in lines
+                     if (m := re.match(r"SCAN (\w+)(?: \(|$)", line))
+                     and m.group(1) in tables and not bounded]
+        elif vendor == "mysql":
+            cursor.execute(f"EXPLAIN {sql}")
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            lines = [f"{r['table']}: type={r['type']} key={r['key']} rows={r['rows']} "
+                     f"{r.get('Extra') or ''}".strip() for r in rows]
+            scans = [line for line, r in zip(lines, rows)
+                     if r["type"] == "ALL" and r["table"] in tables]
+        elif vendor == "postgresql":
+            cursor.execute(f"EXPLAIN {sql}")
+            lines = [row[0] for row in cursor.fetchall()]
+            scans = [line.strip() for line in lines if "Seq Scan" in line]
+        else:
+            raise CommandError(f"EXPLAIN no soportado para {vendor}")
+    return lines, scans
+
+
+class Command(BaseCommand):
+    help = ("Pide las páginas más usadas (sin caché) como un usuario staff temporal, "
+            "ejecuta EXPLAIN sobre cada consulta y señala las que recorren tablas "
+            "enteras. Todo va en una transacción que se deshace al terminar.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*",
+                            help="Rutas a analizar (por defecto las principales).")
+        parser.add_argument("--verbose-plans", action="store_true",
+                            help="Mostrar el plan de todas las consultas.")
+        parser.add_argument("--fail-on-scan", action="store_true",
+                            help="Salir con error si hay recorridos completos o rutas "
+                                 "que no responden 200 (CI).")
+
+    def handle(self, *args, **options):
+        try:
+            setup_test_environment()
+        except RuntimeError:
+            pass  # ya preparado (p. ej. desde los tests)
+        paths = options["paths"] or default_paths()
+        tables = set(connection.introspection.table_names())
+        with transaction.atomic():
+            # Staff para que las vistas protegidas respondan de verdad (y no con
+            # una redirección al login, sin consultas)
+            client = Client()
+            client.force_login(User.objects.create_user(
+                "explain-queries", is_staff=True, is_superuser=True))
+            flagged, failed = self.explain_paths(client, paths, tables, options)
+            transaction.set_rollback(True)
+
+        summary = f"{flagged} consultas con recorridos completos en {len(paths)} rutas."
+        if failed:
+            summary += f" {failed} rutas no respondieron 200 y no se analizaron enteras."
+        if (flagged or failed) and options["fail_on_scan"]:
+            raise CommandError(summary)
+        style = self.style.WARNING if flagged or failed else self.style.SUCCESS
+        self.stdout.write(style(summary))
+
+    def explain_paths(self, client, paths, tables, options):
+        flagged = failed = 0
+        for path in paths:
+            with override_settings(CACHES=NO_CACHE, RATE_LIMIT_ENABLED=False):
+                with CaptureQueriesContext(connection) as captured:
+                    status = client.get(path).status_code
+            selects = [q["sql"] for q in captured.captured_queries
+                       if q["sql"].lstrip().upper().startswith("SELECT")]
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{path} -> {status}, {len(selects)} consultas"))
+            if status != 200:
+                failed += 1
+                self.stdout.write(self.style.WARNING(
+                    f"  RESPUESTA {status}: las consultas no son las de la página"))
+            seen = set()
+            for sql in selects:
+                if sql in seen:
+                    continue
+                seen.add(sql)
+                lines, scans = explain(sql, tables)
+                if scans:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(f"  RECORRIDO COMPLETO: {sql[:200]}"))
+                    for line in scans:
+                        self.stdout.write(f"    {line}")
+                elif options["verbose_plans"]:
+                    self.stdout.write(f"  {sql[:200]}")
+                if options["verbose_plans"]:
+                    for line in lines:
+                        self.stdout.write(f"    {line}")
+        return flagged, failed
@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import export
+
+
+class Command(BaseCommand):
+    help = ("Exporta reseñas, hilos o mensajes en CSV, JSON Lines o formato "
+            "columnar comprimido, por bloques y con memoria constante. Con "
+            "--since (y --since-id) solo las filas posteriores a esa marca de "
+            "agua; al terminar se muestra la de la siguiente exportación.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=sorted(export.TABLES))
+        parser.add_argument("--format", choices=sorted(export.ENCODERS), default="csv")
+        parser.add_argument("--since", help="Fecha ISO 8601 de la última fila exportada.")
+        parser.add_argument("--since-id", help="Id de la última fila exportada.")
+        parser.add_argument("--output", "-o", help="Fichero de salida (por defecto, stdout).")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK)
+        parser.add_argument("--database", help="Alias de la base de datos (p. ej. una réplica).")
+
+    def handle(self, *args, **options):
+        try:
+            since = export.parse_since(options["since"], options["since_id"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size debe ser al menos 1.")
+
+        table, size = options["table"], options["chunk_size"]
+        encoder = export.ENCODERS[options["format"]](table)
+        out = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        rows_written, last = 0, since
+        try:
+            out.write(encoder.header())
+            for rows in export.chunks(table, since, size, options["database"]):
+                out.write(encoder.encode(rows))
+                rows_written += len(rows)
+                last = export.watermark(table, rows)
+            out.write(encoder.footer())
+        finally:
+            if options["output"]:
+                out.close()
+            else:
+                out.flush()
+
+        # A stderr para no mezclarlo con los datos cuando salen por stdout
+        self.stderr.write(f"{rows_written} filas de {table} exportadas.")
+        if last is not None:
+            created_at, pk = last
+            hint = f"--since {created_at.isoformat()}"
+            if pk is not None:
+                hint += f" --since-id {pk}"
+            self.stderr.write(f"Siguiente exportación: {hint}")
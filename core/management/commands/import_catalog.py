@@ -0,0 +1,227 @@
+import csv
+import json
+import os
+import time
+from collections import Counter, OrderedDict
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import caching, facets
+from core.models import NORMALIZED_NAME_LENGTH, Beer, Brewery
+from core.search import get_backend
+from core.search.documents import document_for
+from core.text import normalize_name
+
+DEFAULT_BREWERY = "Desconocida"
+DEFAULT_STYLE = "Desconocido"
+
+
+class BreweryCache:
+    """Nombre normalizado -> id, acotado (LRU) para que la memoria no crezca."""
+
+    def __init__(self, max_size=50000):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+
+    def get(self, key):
+        if key in self._ids:
+            self._ids.move_to_end(key)
+            return self._ids[key]
+        return None
+
+    def set(self, key, value):
+        self._ids[key] = value
+        self._ids.move_to_end(key)
+        if len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def parse_abv(value):
+    if value in (None, ""):
+        return None
+    try:
+        abv = Decimal(str(value).replace(",", ".")).quantize(Decimal("0.1"))
+    except InvalidOperation:
+        return None
+    return abv if 0 <= abv < 100 else None
+
+
+class Command(BaseCommand):
+    help = ("Importa cervecerías y cervezas desde CSV o JSON Lines en streaming, "
+            "deduplicando por nombre normalizado e insertando por lotes. "
+            "Columnas: brewery, country, name, style, abv.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=sorted(READERS),
+                            help="Por defecto se deduce de la extensión.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--progress-every", type=int, default=50000,
+                            help="Filas leídas entre cada línea de progreso.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Leer y deduplicar sin escribir nada.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"No existe el fichero {path}")
+        fmt = options["format"] or os.path.splitext(path)[1].lstrip(".").lower()
+        if fmt == "json":
+            fmt = "jsonl"
+        if fmt not in READERS:
+            raise CommandError("Formato desconocido: usa --format csv|jsonl")
+
+        self.dry_run = options["dry_run"]
+        self.breweries = BreweryCache()
+        self.search_backend = get_backend()
+        self.stats = {"read": 0, "inserted": 0, "duplicates": 0,
+                      "invalid": 0, "breweries": 0}
+        self.started = time.monotonic()
+        batch_size = options["batch_size"]
+        progress_every = options["progress_every"]
+
+        batch = []
+        try:
+            for row in READERS[fmt](path):
+                self.stats["read"] += 1
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    self.import_batch(batch)
+                    batch = []
+                if self.stats["read"] % progress_every == 0:
+                    self.report()
+        except (csv.Error, json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise CommandError(f"Fila {self.stats['read']}: {e}")
+        if batch:
+            self.import_batch(batch)
+
+        if self.stats["inserted"] and not self.dry_run:
+            caching.invalidate(caching.BEER_LIST_FILTERS, caching.HOME_TOP_BEERS)
+        self.report(final=True)
+
+    def report(self, final=False):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        s = self.stats
+        line = (f"{s['read']} leídas, {s['inserted']} insertadas, "
+                f"{s['duplicates']} duplicadas, {s['invalid']} inválidas, "
+                f"{s['breweries']} cervecerías nuevas "
+                f"({s['read'] / elapsed:,.0f} filas/s)")
+        self.stdout.write(self.style.SUCCESS(line) if final else line)
+
+    def clean_row(self, row):
+        # Una línea JSON válida que no es un objeto ([], "x", 3...) es una fila inválida
+        if not isinstance(row, dict):
+            return None
+        name = (row.get("name") or "").strip()[:120]
+        normalized = normalize_name(name, NORMALIZED_NAME_LENGTH)
+        if not normalized:
+            return None
+        brewery = (row.get("brewery") or "").strip()[:120] or DEFAULT_BREWERY
+        return {
+            "name": name,
+            "normalized_name": normalized,
+            "style": (row.get("style") or "").strip()[:80] or DEFAULT_STYLE,
+            "abv": parse_abv(row.get("abv")),
+            "brewery": brewery,
+            "brewery_key": normalize_name(brewery, NORMALIZED_NAME_LENGTH),
+            "country": (row.get("country") or "").strip()[:80],
+        }
+
+    def resolve_breweries(self, rows):
+        """Asigna `brewery_id` a cada fila creando las cervecerías que falten."""
+        missing = {}
+        for row in rows:
+            if self.breweries.get(row["brewery_key"]) is None:
+                missing.setdefault(row["brewery_key"], row)
+        if missing:
+            existing = Brewery.objects.filter(
+                normalized_name__in=list(missing)).values_list("normalized_name", "id")
+            for key, pk in existing:
+                self.breweries.set(key, pk)
+                missing.pop(key, None)
+        if missing and self.dry_run:
+            # Marcador para no volver a contarlas en lotes siguientes
+            for key in missing:
+                self.breweries.set(key, f"nueva:{key}")
+        elif missing:
+            # bulk_create no devuelve ids en MySQL: releer por nombre normalizado
+            Brewery.objects.bulk_create([
+                Brewery(name=row["brewery"], country=row["country"], normalized_name=key)
+                for key, row in missing.items()
+            ])
+            for key, pk in Brewery.objects.filter(
+                    normalized_name__in=list(missing)).values_list("normalized_name", "id"):
+                self.breweries.set(key, pk)
+        self.stats["breweries"] += len(missing)
+        for row in rows:
+            row["brewery_id"] = self.breweries.get(row["brewery_key"])
+
+    def import_batch(self, raw_rows):
+        rows = []
+        for raw in raw_rows:
+            row = self.clean_row(raw)
+            if row is None:
+                self.stats["invalid"] += 1
+            else:
+                rows.append(row)
+        if not rows:
+            return
+
+        with transaction.atomic():
+            self.resolve_breweries(rows)
+            existing = set(Beer.objects.filter(
+                normalized_name__in={row["normalized_name"] for row in rows}
+            ).values_list("brewery_id", "normalized_name"))
+
+            new_beers = []
+            for row in rows:
+                key = (row["brewery_id"], row["normalized_name"])
+                if key in existing:
+                    self.stats["duplicates"] += 1
+                    continue
+                existing.add(key)
+                new_beers.append(Beer(
+                    brewery_id=row["brewery_id"], name=row["name"],
+                    normalized_name=row["normalized_name"],
+                    style=row["style"], abv=row["abv"]))
+
+            self.stats["inserted"] += len(new_beers)
+            if self.dry_run or not new_beers:
+                return
+            Beer.objects.bulk_create(new_beers)
+            self.index_new_beers(new_beers)
+            # bulk_create tampoco mantiene las facetas: una suma por (estilo, cervecería)
+            added = Counter((beer.style, beer.brewery_id) for beer in new_beers)
+            for (style, brewery_id), count in added.items():
+                facets.apply_delta(style, brewery_id, beers=count)
+
+    def index_new_beers(self, new_beers):
+        # bulk_create no dispara señales: indexar a mano si el motor lo necesita
+        if not self.search_backend.needs_signals:
+            return
+        keys = {(beer.brewery_id, beer.normalized_name) for beer in new_beers}
+        rows = Beer.objects.filter(
+            normalized_name__in={key[1] for key in keys}
+        ).values("id", "brewery_id", "normalized_name", "name", "style")
+        self.search_backend.index_many("beer", [
+            (row["id"], *document_for("beer", row)) for row in rows
+            if (row["brewery_id"], row["normalized_name"]) in keys
+        ])
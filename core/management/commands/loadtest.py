@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import run_load
+
+DEFAULT_PATHS = ["/", "/beers/", "/threads/"]
+
+
+class Command(BaseCommand):
+    help = ("Genera carga HTTP concurrente contra uno o varios servidores ya "
+            "arrancados y compara latencias (p50/p95/p99) y peticiones/s. "
+            "Ej.: --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", required=True,
+                            help="NOMBRE=URL base del servidor (repetible).")
+        parser.add_argument("--path", action="append", dest="paths",
+                            help=f"Ruta a pedir (repetible). Por defecto: {DEFAULT_PATHS}")
+        parser.add_argument("-c", "--concurrency", type=int, default=50)
+        parser.add_argument("-d", "--duration", type=float, default=10.0,
+                            help="Segundos de carga por servidor.")
+        parser.add_argument("-n", "--requests", type=int,
+                            help="Número máximo de peticiones por servidor.")
+        parser.add_argument("--warmup", type=float, default=1.0,
+                            help="Segundos de calentamiento (no cuentan).")
+        parser.add_argument("--json", dest="json_path",
+                            help="Guardar el informe completo en este fichero.")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep or not url.startswith("http://"):
+                raise CommandError(f"--target inválido: {target} (usa NOMBRE=http://host:puerto)")
+            targets.append((name, url))
+        paths = options["paths"] or DEFAULT_PATHS
+
+        report = {}
+        for name, url in targets:
+            if options["warmup"]:
+                run_load(url, paths, options["concurrency"], options["warmup"])
+            result = run_load(url, paths, options["concurrency"],
+                              options["duration"], options["requests"])
+            report[name] = result
+            self.print_result(name, result)
+
+        if len(report) > 1:
+            self.print_comparison(report)
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Informe guardado en {options['json_path']}")
+
+    def print_result(self, name, result):
+        total = result["total"]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{name} ({result['url']}, c={result['concurrency']})"))
+        self.stdout.write(
+            f"  total: {total['requests']} peticiones, {total['errors']} errores, "
+            f"{total.get('rps', 0)} req/s, p50 {total['p50_ms']} ms, "
+            f"p95 {total['p95_ms']} ms, p99 {total['p99_ms']} ms")
+        for path, s in result["paths"].items():
+            self.stdout.write(
+                f"  {path:<30} p50 {s['p50_ms']} ms  p95 {s['p95_ms']} ms  "
+                f"p99 {s['p99_ms']} ms  ({s['requests']} ok, {s['errors']} err)")
+
+    def print_comparison(self, report):
+        names = list(report)
+        base = report[names[0]]["total"]
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Comparado con {names[0]}"))
+        for name in names[1:]:
+            other = report[name]["total"]
+            if not base.get("rps") or not other.get("rps"):
+                continue
+            self.stdout.write(
+                f"  {name}: x{other['rps'] / base['rps']:.2f} req/s, "
+                f"p95 {other['p95_ms']} ms frente a {base['p95_ms']} ms")
@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.models import ReviewPhoto
+from core.photos import process_many, requeue_stale
+
+
+class Command(BaseCommand):
+    help = ("Worker del procesado de fotos: genera miniaturas WebP, quita el "
+            "EXIF y guarda dimensiones de las fotos pendientes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--interval", type=float, default=2.0,
+                            help="Segundos de espera cuando no hay pendientes.")
+        parser.add_argument("--once", action="store_true",
+                            help="Procesar lo pendiente y salir.")
+        parser.add_argument("--requeue", action="store_true",
+                            help="Devolver a pendientes todas las fotos \"procesándose\", "
+                                 "no solo las que llevan más de STALE_AFTER. Solo con "
+                                 "ningún otro worker en marcha.")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale(timedelta(0) if options["requeue"] else None)
+        if requeued:
+            self.stdout.write(f"{requeued} fotos a medias devueltas a pendientes")
+        batch_size = options["batch_size"]
+        processed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            while True:
+                close_old_connections()
+                ids = list(ReviewPhoto.objects.filter(status="pending")
+                           .order_by("id").values_list("id", flat=True)[:batch_size])
+                if not ids:
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+                    continue
+                chunks = [ids[i::options["workers"]] for i in range(options["workers"])]
+                list(pool.map(self._process_chunk, [c for c in chunks if c]))
+                processed += len(ids)
+                self.stdout.write(f"{processed} fotos procesadas")
+        self.stdout.write(self.style.SUCCESS(f"Listo: {processed} fotos procesadas."))
+
+    def _process_chunk(self, ids):
+        try:
+            process_many(ids)
+        finally:
+            connections.close_all()
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from core import facets
+from core.models import Beer, rebuild_beer_aggregates
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los agregados de reseñas de cada cerveza y detecta desfases."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Solo comprobar: informa de los desfases sin corregirlos.")
+        parser.add_argument(
+            "--beer", type=int, action="append", dest="beer_ids",
+            help="Limitar a esta cerveza (se puede repetir).")
+
+    def handle(self, *args, **options):
+        beers = Beer.objects.all()
+        if options["beer_ids"]:
+            beers = beers.filter(id__in=options["beer_ids"])
+
+        drifted = rebuild_beer_aggregates(beers, fix=not options["check"])
+        if drifted and not options["check"]:
+            # Las facetas suman los agregados de las cervezas
+            facets.rebuild()
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(
+                "Agregados correctos: no hay desfases."))
+            return
+        ids = ", ".join(str(beer_id) for beer_id in drifted[:20])
+        if len(drifted) > 20:
+            ids += ", ..."
+        if options["check"]:
+            self.stdout.write(self.style.WARNING(
+                f"{len(drifted)} cervezas con agregados desfasados: {ids}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(drifted)} cervezas corregidas: {ids}"))
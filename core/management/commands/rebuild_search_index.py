@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de texto completo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if not backend.needs_signals:
+            self.stdout.write(
+                f"{type(backend).__name__} se mantiene solo: nada que reconstruir.")
+            return
+        started = time.monotonic()
+        total = backend.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} documentos indexados en {time.monotonic() - started:.1f}s."))
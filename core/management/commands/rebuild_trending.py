@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core import caching, trending
+
+
+class Command(BaseCommand):
+    help = ("Recalcula las puntuaciones de tendencia de cervezas e hilos desde "
+            "las reseñas, hilos y mensajes recientes. Solo hace falta una vez "
+            "(o tras cambiar los pesos): luego se mantienen al escribir.")
+
+    def handle(self, *args, **options):
+        beers, threads = trending.rebuild_all()
+        caching.invalidate(caching.HOME_TRENDING_BEERS, caching.HOME_RECENT_THREADS)
+        self.stdout.write(self.style.SUCCESS(
+            f"Tendencias recalculadas: {beers} cervezas y {threads} hilos con actividad."))
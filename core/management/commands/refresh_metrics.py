@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core import metrics
+
+
+class Command(BaseCommand):
+    help = ("Guarda una foto de las métricas del panel y actualiza la actividad "
+            "diaria. Pensado para cron (p. ej. cada 15 minutos) o con --interval.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-reviews", type=int, default=metrics.MIN_REVIEWS,
+                            help="Reseñas mínimas para entrar en el top.")
+        parser.add_argument("--top", type=int, default=metrics.TOP_BEERS)
+        parser.add_argument("--groups", type=int, default=metrics.TOP_GROUPS,
+                            help="Estilos y cervecerías que se guardan por foto.")
+        parser.add_argument("--full", action="store_true",
+                            help="Recontar la actividad diaria desde el principio.")
+        parser.add_argument("--keep", type=int, default=metrics.KEEP_SNAPSHOTS,
+                            help="Fotos que se conservan; las anteriores se borran.")
+        parser.add_argument("--interval", type=float,
+                            help="Repetir cada N segundos en vez de salir.")
+
+    def handle(self, *args, **options):
+        if options["keep"] < 1:
+            raise CommandError("--keep debe ser al menos 1.")
+        while True:
+            close_old_connections()
+            started = time.monotonic()
+            days = metrics.refresh_daily_activity(full=options["full"])
+            snapshot = metrics.take_snapshot(
+                options["min_reviews"], options["top"], options["groups"])
+            pruned = metrics.prune_snapshots(options["keep"])
+            self.stdout.write(self.style.SUCCESS(
+                f"{snapshot}: {snapshot.reviews} reseñas, {snapshot.threads} hilos, "
+                f"{snapshot.posts} respuestas; {days} días de actividad actualizados, "
+                f"{pruned} fotos antiguas borradas ({time.monotonic() - started:.2f} s)"))
+            if not options["interval"]:
+                break
+            options["full"] = False
+            time.sleep(options["interval"])
@@ -0,0 +1,327 @@
+import io
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from PIL import Image
+
+from core import caching, facets, trending
+from core.models import (RATING_FIELDS, Beer, Brewery, Post, Report, Review,
+                         ReviewPhoto, StoredFile, Thread, avg_rating_expression,
+                         bayes_rating_expression)
+from core.photos import process_photo
+from core.search import get_backend
+from core.text import normalize_name
+
+# Volúmenes por escala; cada opción suelta (--beers...) los sobrescribe
+SCALES = {
+    "small": {"breweries": 50, "beers": 500, "users": 200, "reviews": 5000,
+              "threads": 500, "posts": 5000, "reports": 200},
+    "medium": {"breweries": 300, "beers": 5000, "users": 2000, "reviews": 50000,
+               "threads": 5000, "posts": 50000, "reports": 2000},
+    "large": {"breweries": 2000, "beers": 50000, "users": 20000, "reviews": 500000,
+              "threads": 50000, "posts": 500000, "reports": 20000},
+}
+
+STYLES = ["IPA", "Lager", "Pilsner", "Stout", "Porter", "Weissbier", "Saison",
+          "Pale Ale", "Amber Ale", "Sour", "Bock", "Tripel", "Dubbel", "Märzen",
+          "Red Ale", "Barley Wine", "Session IPA", "NEIPA", "Kölsch", "Gose"]
+COUNTRIES = ["España", "España", "España", "Bélgica", "Alemania", "Reino Unido",
+             "Estados Unidos", "República Checa", "Irlanda", "México"]
+NAME_WORDS = ["Lúpulo", "Dorada", "Negra", "Roja", "Brava", "Sierra", "Mar",
+              "Trigo", "Cebada", "Bosque", "Luna", "Sol", "Niebla", "Fuego",
+              "Faro", "Molino", "Real", "Vieja", "Nueva", "Salvaje", "Tostada"]
+BREWERY_WORDS = ["Cervecera", "Fábrica", "Brewing", "Compañía", "Taller",
+                 "Birrería", "Maltería"]
+PLACES = ["del Norte", "de la Sierra", "del Puerto", "Artesana", "del Valle",
+          "de Castilla", "Mediterránea", "Atlántica", "del Sur", "Urbana"]
+SENTENCE_WORDS = ("la cerveza tiene un aroma intenso a lúpulo cítrico y un final "
+                  "seco con notas de malta tostada caramelo café y frutas tropicales "
+                  "la espuma es cremosa y persistente cuerpo medio carbonatación "
+                  "alta muy equilibrada repetiría sin duda aunque algo amarga para "
+                  "mi gusto ideal para acompañar comida especiada").split()
+REPORT_REASONS = ["spam", "lenguaje ofensivo", "fuera de tema", "publicidad",
+                  "información falsa"]
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """Permite fijar `created_at` a mano en bulk_create (auto_now_add lo pisa)."""
+    fields = [model._meta.get_field("created_at") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ("Genera datos sintéticos realistas (cervecerías, cervezas, usuarios, "
+            "reseñas con fotos, hilos, respuestas y denuncias) con bulk_create y "
+            "una semilla fija: misma semilla y escala, mismos datos.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+        for name in SCALES["small"]:
+            parser.add_argument(f"--{name}", type=int)
+        parser.add_argument("--photo-ratio", type=float, default=0.05,
+                            help="Fracción de reseñas con foto.")
+        parser.add_argument("--photo-pool", type=int, default=8,
+                            help="Imágenes distintas (se reutilizan: almacenamiento por hash).")
+        parser.add_argument("--hidden-ratio", type=float, default=0.02,
+                            help="Fracción de respuestas ocultas por moderación.")
+        parser.add_argument("--days", type=int, default=365,
+                            help="Días hacia atrás por los que se reparten las fechas.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now().replace(microsecond=0)
+        self.start = self.now - timedelta(days=options["days"])
+        counts = {name: options[name] if options[name] is not None else value
+                  for name, value in SCALES[options["scale"]].items()}
+        started = time.monotonic()
+
+        with transaction.atomic(), manual_timestamps(Review, ReviewPhoto, Thread, Post, Report):
+            brewery_ids = self.seed_breweries(counts["breweries"])
+            beers = self.seed_beers(counts["beers"], brewery_ids)
+            users = self.seed_users(counts["users"])
+            review_ids = self.seed_reviews(counts["reviews"], beers, users)
+            self.seed_photos(review_ids, options["photo_ratio"], options["photo_pool"])
+            threads = self.seed_threads(counts["threads"], beers, users)
+            post_ids = self.seed_posts(counts["posts"], threads, users,
+                                       options["hidden_ratio"])
+            self.seed_reports(counts["reports"], post_ids, review_ids, users)
+            self.reset_sequences()
+
+        backend = get_backend()
+        if backend.needs_signals:
+            self.log("Reconstruyendo el índice de búsqueda...")
+            backend.rebuild()
+        # bulk_create no dispara las señales que mantienen tendencias y facetas
+        trending.rebuild_all(self.now)
+        facets.rebuild()
+        caching.invalidate(caching.HOME_TOP_BEERS, caching.HOME_RECENT_THREADS,
+                           caching.HOME_TRENDING_BEERS, caching.BEER_LIST_FILTERS)
+        self.stdout.write(self.style.SUCCESS(
+            f"Datos generados en {time.monotonic() - started:.1f} s: "
+            + ", ".join(f"{n} {name}" for name, n in counts.items())))
+
+    # Utilidades -----------------------------------------------------------
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def next_id(self, model):
+        return (model.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+
+    def bulk(self, model, objects):
+        # Ids explícitos: así funciona igual en MySQL, que no los devuelve
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.log(f"  {len(objects)} {model._meta.model_name}")
+
+    def bulk_stream(self, model, objects):
+        """bulk_create por lotes desde un generador, sin tenerlo todo en memoria."""
+        batch, total = [], 0
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+            total += len(batch)
+        self.log(f"  {total} {model._meta.model_name}")
+
+    def random_date(self, after=None):
+        start = after or self.start
+        span = max((self.now - start).total_seconds(), 1)
+        # Más actividad reciente que antigua
+        return start + timedelta(seconds=span * (self.rng.random() ** 0.7))
+
+    def sentence(self, low, high):
+        words = self.rng.choices(SENTENCE_WORDS, k=self.rng.randint(low, high))
+        return " ".join(words).capitalize() + "."
+
+    def reset_sequences(self):
+        # PostgreSQL: los ids explícitos no avanzan las secuencias
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Brewery, Beer, User, Review, ReviewPhoto, Thread, Post, Report])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    # Generadores ----------------------------------------------------------
+
+    def seed_breweries(self, n):
+        first = self.next_id(Brewery)
+        breweries = []
+        for i in range(n):
+            name = (f"{self.rng.choice(BREWERY_WORDS)} {self.rng.choice(NAME_WORDS)} "
+                    f"{self.rng.choice(PLACES)} {first + i}")
+            breweries.append(Brewery(id=first + i, name=name, normalized_name=normalize_name(name),
+                                     country=self.rng.choice(COUNTRIES)))
+        self.bulk(Brewery, breweries)
+        return [b.id for b in breweries]
+
+    def seed_beers(self, n, brewery_ids):
+        first = self.next_id(Beer)
+        beers = []
+        for i in range(n):
+            name = f"{self.rng.choice(NAME_WORDS)} {self.rng.choice(NAME_WORDS)} {first + i}"
+            beer = Beer(id=first + i, brewery_id=self.rng.choice(brewery_ids), name=name,
+                        normalized_name=normalize_name(name), style=self.rng.choice(STYLES),
+                        abv=Decimal(self.rng.randint(35, 120)) / 10)
+            # Calidad "real" de la cerveza: sus reseñas giran alrededor de ella
+            beer.quality = self.rng.uniform(1.5, 4.8)
+            beers.append(beer)
+        # Los agregados se rellenan en seed_reviews antes de insertar
+        return beers
+
+    def seed_users(self, n):
+        first = self.next_id(User)
+        password = make_password(None)
+        users = [User(id=first + i, username=f"catador{first + i}", password=password,
+                      date_joined=self.random_date())
+                 for i in range(n)]
+        self.bulk(User, users)
+        return [(u.id, u.username) for u in users]
+
+    def seed_reviews(self, n, beers, users):
+        first = self.next_id(Review)
+        # Popularidad de cola larga: unas pocas cervezas acaparan reseñas
+        weights = [1 / (rank + 1) for rank in range(len(beers))]
+        targets = self.rng.choices(beers, weights=weights, k=n) if beers else []
+        # Primero se decide cada reseña (compacta) para llegar a insertar las
+        # cervezas ya con sus agregados: con claves foráneas inmediatas
+        # (InnoDB) las cervezas tienen que existir antes que sus reseñas.
+        plan = []
+        for beer in targets:
+            scores = tuple(min(5, max(1, round(self.rng.gauss(beer.quality, 0.8))))
+                           for _ in RATING_FIELDS)
+            plan.append((beer.id, scores))
+            beer.review_count += 1
+            for field, score in zip(RATING_FIELDS, scores):
+                setattr(beer, f"{field}_sum", getattr(beer, f"{field}_sum") + score)
+        self.bulk(Beer, beers)
+        # Medias con las mismas expresiones (y redondeo) que las reseñas
+        Beer.objects.filter(review_count__gt=0).update(
+            avg_rating=avg_rating_expression(), bayes_rating=bayes_rating_expression())
+
+        def build(i, beer_id, scores):
+            _, user_name = self.rng.choice(users) if users else (None, "anónimo")
+            return Review(id=first + i, beer_id=beer_id, user_name=user_name,
+                          comment=self.sentence(8, 40), created_at=self.random_date(),
+                          **dict(zip(RATING_FIELDS, scores)))
+
+        self.bulk_stream(Review, (build(i, *item) for i, item in enumerate(plan)))
+        return list(range(first, first + len(plan)))
+
+    def seed_photos(self, review_ids, ratio, pool_size):
+        with_photo = [rid for rid in review_ids if self.rng.random() < ratio]
+        if not with_photo or pool_size < 1:
+            return
+        # Unas pocas imágenes reales pasan por el procesado normal...
+        pool = []
+        for i, review_id in enumerate(with_photo[:pool_size]):
+            color = tuple(self.rng.randint(40, 220) for _ in range(3))
+            image = Image.new("RGB", (1200, 900), color)
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=85)
+            photo = ReviewPhoto(review_id=review_id, created_at=self.random_date())
+            photo.photo.save(f"seed_{i}.jpg", ContentFile(buffer.getvalue()), save=False)
+            photo.save()
+            process_photo(photo.id)
+            photo.refresh_from_db()
+            pool.append(photo)
+
+        # ...y el resto de filas reutiliza sus ficheros (mismo contenido, mismo hash)
+        first = self.next_id(ReviewPhoto)
+        rows, uses = [], {}
+        for i, review_id in enumerate(with_photo[len(pool):]):
+            source = pool[i % len(pool)]
+            rows.append(ReviewPhoto(
+                id=first + i, review_id=review_id, status="ready", created_at=self.random_date(),
+                width=source.width, height=source.height, photo=source.photo.name,
+                thumb_small=source.thumb_small.name, thumb_medium=source.thumb_medium.name))
+            for name in source.file_names():
+                uses[name] = uses.get(name, 0) + 1
+        self.bulk(ReviewPhoto, rows)
+        # bulk_create no dispara las señales que cuentan referencias
+        for name, n in uses.items():
+            StoredFile.objects.filter(name=name).update(refcount=F("refcount") + n)
+
+    def seed_threads(self, n, beers, users):
+        first = self.next_id(Thread)
+        threads = []
+        for i in range(n):
+            beer = self.rng.choice(beers) if beers and self.rng.random() < 0.7 else None
+            user_id, user_name = self.rng.choice(users) if users else (None, "anónimo")
+            created_at = self.random_date()
+            threads.append(Thread(
+                id=first + i, beer_id=beer.id if beer else None,
+                beer_name=beer.name if beer else "", user_id=user_id, user_name=user_name,
+                title=self.sentence(3, 9)[:140], created_at=created_at,
+                last_post_at=created_at))
+        return threads
+
+    def seed_posts(self, n, threads, users, hidden_ratio):
+        first = self.next_id(Post)
+        weights = [self.rng.paretovariate(1.2) for _ in threads]
+        targets = self.rng.choices(threads, weights=weights, k=n) if threads else []
+        # Igual que las reseñas: plan compacto, hilos con sus contadores y
+        # después las respuestas por lotes
+        plan = []
+        for thread in targets:
+            hidden = self.rng.random() < hidden_ratio
+            created_at = self.random_date(after=thread.created_at)
+            plan.append((thread.id, created_at, hidden))
+            if not hidden:
+                thread.post_count += 1
+                thread.last_post_at = max(thread.last_post_at, created_at)
+        self.bulk(Thread, threads)
+
+        def build(i, thread_id, created_at, hidden):
+            user_id, user_name = self.rng.choice(users) if users else (None, "anónimo")
+            return Post(id=first + i, thread_id=thread_id, user_id=user_id,
+                        user_name=user_name, body=self.sentence(5, 60),
+                        created_at=created_at, is_hidden=hidden)
+
+        self.bulk_stream(Post, (build(i, *item) for i, item in enumerate(plan)))
+        return list(range(first, first + len(plan)))
+
+    def seed_reports(self, n, post_ids, review_ids, users):
+        first = self.next_id(Report)
+        # Unos pocos objetos reciben muchas denuncias
+        hot_posts = self.rng.sample(post_ids, min(len(post_ids), max(n // 20, 1)))
+        hot_reviews = self.rng.sample(review_ids, min(len(review_ids), max(n // 50, 1)))
+        reports = []
+        for i in range(n):
+            if hot_reviews and (not hot_posts or self.rng.random() < 0.3):
+                object_type, object_id = "review", self.rng.choice(hot_reviews)
+            elif hot_posts:
+                object_type, object_id = "post", self.rng.choice(hot_posts)
+            else:
+                break
+            _, user_name = self.rng.choice(users) if users else (None, "anónimo")
+            reports.append(Report(
+                id=first + i, object_type=object_type, object_id=object_id,
+                user_name=user_name, reason=self.rng.choice(REPORT_REASONS),
+                status="closed" if self.rng.random() < 0.3 else "open",
+                created_at=self.random_date()))
+        self.bulk(Report, reports)
@@ -0,0 +1,132 @@
+"""
+Métricas del panel de administración, materializadas en tablas.
+
+`take_snapshot` guarda los totales, el top de cervezas y los agregados por
+estilo y cervecería a partir de las columnas desnormalizadas de `Beer` (no
+recorre reseñas). `refresh_daily_activity` solo vuelve a contar desde el
+último día guardado. El panel lee únicamente estas tablas; la serie de fotos
+sirve de histórico y `prune_snapshots` la recorta a las KEEP_SNAPSHOTS últimas.
+"""
+from collections import Counter
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import (RATING_FIELDS, Beer, Brewery, DailyActivity, GroupMetric,
+                     MetricsSnapshot, Post, Review, Thread)
+
+MIN_REVIEWS = 5
+TOP_BEERS = 5
+TOP_GROUPS = 50
+# Una semana de fotos cada 15 minutos
+KEEP_SNAPSHOTS = 672
+
+# Modelo -> columna de DailyActivity
+ACTIVITY_SOURCES = {
+    "reviews": Review,
+    "threads": Thread,
+    "posts": Post,
+}
+
+
+def _group_avg(row):
+    if not row["reviews"]:
+        return Decimal("0")
+    total = sum(row[f"{field}_sum"] or 0 for field in RATING_FIELDS)
+    return (Decimal(total) / (row["reviews"] * 4)).quantize(Decimal("0.01"))
+
+
+def top_beers(min_reviews=MIN_REVIEWS, limit=TOP_BEERS):
+    """Mejor valoradas con al menos `min_reviews`; si no llegan, las mejores sin mínimo."""
+    fields = ("id", "name", "style", "avg_rating", "review_count")
+    ordering = ("-avg_rating", "-review_count", "id")
+    rows = list(Beer.objects.filter(review_count__gte=min_reviews)
+                .order_by(*ordering).values(*fields)[:limit])
+    if len(rows) < limit:
+        rows = list(Beer.objects.order_by(*ordering).values(*fields)[:limit])
+    for row in rows:
+        row["avg_rating"] = str(row["avg_rating"])
+    return rows
+
+
+def group_metrics(dimension, limit=TOP_GROUPS):
+    """Filas (label, beers, reviews, avg_rating) de los grupos con más reseñas."""
+    group_by, label_field = {
+        "style": ("style", "style"),
+        "brewery": ("brewery_id", "brewery__name"),
+    }[dimension]
+    rows = (Beer.objects.values(group_by, label_field)
+            .annotate(beers=Count("id"), reviews=Sum("review_count"),
+                      **{f"{f}_sum": Sum(f"{f}_sum") for f in RATING_FIELDS})
+            .order_by("-reviews", group_by)[:limit])
+    return [
+        {"label": row[label_field] or "", "beers": row["beers"],
+         "reviews": row["reviews"] or 0, "avg_rating": _group_avg(row)}
+        for row in rows
+    ]
+
+
+@transaction.atomic
+def take_snapshot(min_reviews=MIN_REVIEWS, top=TOP_BEERS, groups=TOP_GROUPS):
+    snapshot = MetricsSnapshot.objects.create(
+        taken_at=timezone.now(),
+        beers=Beer.objects.count(),
+        breweries=Brewery.objects.count(),
+        # Las reseñas y respuestas visibles ya están contadas por cerveza/hilo
+        reviews=Beer.objects.aggregate(n=Sum("review_count"))["n"] or 0,
+        threads=Thread.objects.count(),
+        posts=Thread.objects.aggregate(n=Sum("post_count"))["n"] or 0,
+        top_beers=top_beers(min_reviews, top),
+    )
+    GroupMetric.objects.bulk_create([
+        GroupMetric(snapshot=snapshot, dimension=dimension, **row)
+        for dimension, _ in GroupMetric.DIMENSIONS
+        for row in group_metrics(dimension, groups)
+    ])
+    return snapshot
+
+
+@transaction.atomic
+def prune_snapshots(keep=KEEP_SNAPSHOTS):
+    """Borra las fotos (y sus grupos) anteriores a las `keep` más recientes. Devuelve cuántas."""
+    cutoff = MetricsSnapshot.objects.values_list("taken_at", flat=True)[keep - 1:keep].first()
+    if cutoff is None:
+        return 0
+    _, deleted = MetricsSnapshot.objects.filter(taken_at__lt=cutoff).delete()
+    return deleted.get(MetricsSnapshot._meta.label, 0)
+
+
+@transaction.atomic
+def refresh_daily_activity(full=False):
+    """
+    Recuenta las altas por día desde el último día guardado (incluido, porque
+    pudo quedar a medias) o desde el principio con `full`. Devuelve los días
+    escritos. Se agrupa en Python por fecha local para no depender de las
+    tablas de zonas horarias de MySQL.
+    """
+    last = None if full else DailyActivity.objects.order_by("-day").first()
+    since = None
+    if last is not None:
+        since = timezone.make_aware(datetime.combine(last.day, time.min))
+
+    counts = {}
+    for column, model in ACTIVITY_SOURCES.items():
+        queryset = model.objects.order_by()
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        counter = Counter(
+            timezone.localtime(created_at).date()
+            for created_at in queryset.values_list("created_at", flat=True).iterator())
+        for day, n in counter.items():
+            counts.setdefault(day, dict.fromkeys(ACTIVITY_SOURCES, 0))[column] = n
+
+    stale = DailyActivity.objects.all()
+    if since is not None:
+        stale = stale.filter(day__gte=last.day)
+    stale.delete()
+    DailyActivity.objects.bulk_create([
+        DailyActivity(day=day, **values) for day, values in sorted(counts.items())])
+    return len(counts)
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:06
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_aggregates(apps, schema_editor):
+    Beer = apps.get_model('core', 'Beer')
+    Review = apps.get_model('core', 'Review')
+    fields = ('aroma', 'sabor', 'cuerpo', 'apariencia')
+    rows = (
+        Review.objects.values('beer_id')
+        .annotate(review_count=Count('id'),
+                  **{f'{f}_sum': Sum(f) for f in fields})
+        .order_by()
+    )
+    for row in rows.iterator():
+        Beer.objects.filter(pk=row.pop('beer_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_thread_beer_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beer',
+            name='apariencia_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='beer',
+            name='aroma_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='beer',
+            name='cuerpo_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='beer',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='beer',
+            name='sabor_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# Códigos de tipo usados en el rowid de la tabla FTS5 (ver core.search.backends.sqlite)
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE core_search_fts USING fts5("
+    "title, body, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO core_search_fts (rowid, title, body) "
+    "SELECT id * 4 + 0, name, style FROM core_beer",
+    "INSERT INTO core_search_fts (rowid, title, body) "
+    "SELECT id * 4 + 1, title, '' FROM core_thread",
+    "INSERT INTO core_search_fts (rowid, title, body) "
+    "SELECT id * 4 + 2, '', body FROM core_post",
+    "INSERT INTO core_search_fts (rowid, title, body) "
+    "SELECT id * 4 + 3, '', comment FROM core_review",
+]
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS core_search_fts"]
+
+MYSQL_FORWARD = [
+    "ALTER TABLE core_beer ADD FULLTEXT INDEX core_beer_fulltext (name, style)",
+    "ALTER TABLE core_thread ADD FULLTEXT INDEX core_thread_fulltext (title)",
+    "ALTER TABLE core_post ADD FULLTEXT INDEX core_post_fulltext (body)",
+    "ALTER TABLE core_review ADD FULLTEXT INDEX core_review_fulltext (comment)",
+]
+MYSQL_BACKWARD = [
+    "ALTER TABLE core_beer DROP INDEX core_beer_fulltext",
+    "ALTER TABLE core_thread DROP INDEX core_thread_fulltext",
+    "ALTER TABLE core_post DROP INDEX core_post_fulltext",
+    "ALTER TABLE core_review DROP INDEX core_review_fulltext",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_beer_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"sqlite": SQLITE_FORWARD, "mysql": MYSQL_FORWARD}),
+            _run({"sqlite": SQLITE_BACKWARD, "mysql": MYSQL_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Thread = apps.get_model('core', 'Thread')
+    Post = apps.get_model('core', 'Post')
+    visible = Post.objects.filter(
+        thread=OuterRef('pk'), is_hidden=False).order_by().values('thread')
+    Thread.objects.update(
+        post_count=Coalesce(Subquery(
+            visible.annotate(n=Count('id')).values('n')), 0),
+        last_post_at=Coalesce(Subquery(
+            visible.annotate(latest=Max('created_at')).values('latest')),
+            F('created_at')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['-last_post_at', '-id'], name='thread_activity_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_thread_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewphoto',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reviewphoto',
+            name='status',
+            field=models.CharField(choices=[('pending', 'pendiente'), ('ready', 'procesada'), ('failed', 'fallida')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='reviewphoto',
+            name='thumb_medium',
+            field=models.ImageField(blank=True, upload_to='review_photos/variants/'),
+        ),
+        migrations.AddField(
+            model_name='reviewphoto',
+            name='thumb_small',
+            field=models.ImageField(blank=True, upload_to='review_photos/variants/'),
+        ),
+        migrations.AddField(
+            model_name='reviewphoto',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:12
+
+import core.storage
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_existing_references(apps, schema_editor):
+    ReviewPhoto = apps.get_model('core', 'ReviewPhoto')
+    StoredFile = apps.get_model('core', 'StoredFile')
+    counts = Counter()
+    fields = ('photo', 'thumb_small', 'thumb_medium')
+    for row in ReviewPhoto.objects.values_list(*fields).iterator():
+        counts.update(name for name in row if name)
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name, refcount=n) for name, n in counts.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_reviewphoto_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='reviewphoto',
+            name='photo',
+            field=models.ImageField(storage=core.storage.review_photo_storage, upload_to='review_photos/'),
+        ),
+        migrations.AlterField(
+            model_name='reviewphoto',
+            name='thumb_medium',
+            field=models.ImageField(blank=True, storage=core.storage.review_photo_storage, upload_to='review_photos/variants/'),
+        ),
+        migrations.AlterField(
+            model_name='reviewphoto',
+            name='thumb_small',
+            field=models.ImageField(blank=True, storage=core.storage.review_photo_storage, upload_to='review_photos/variants/'),
+        ),
+        migrations.RunPython(count_existing_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:13
+
+from django.db import migrations, models
+
+from core.text import normalize_name
+
+
+def backfill_normalized_names(apps, schema_editor):
+    for model_name in ('Brewery', 'Beer'):
+        model = apps.get_model('core', model_name)
+        batch = []
+        for obj in model.objects.only('id', 'name').iterator(chunk_size=2000):
+            obj.normalized_name = normalize_name(obj.name)
+            batch.append(obj)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['normalized_name'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_content_addressed_photos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beer',
+            name='normalized_name',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='brewery',
+            name='normalized_name',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=120),
+        ),
+        migrations.RunPython(backfill_normalized_names, migrations.RunPython.noop),
+    ]
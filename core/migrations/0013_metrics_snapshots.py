@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_normalized_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('threads', models.PositiveIntegerField(default=0)),
+                ('posts', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MetricsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(db_index=True)),
+                ('beers', models.PositiveIntegerField(default=0)),
+                ('breweries', models.PositiveIntegerField(default=0)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('threads', models.PositiveIntegerField(default=0)),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('top_beers', models.JSONField(default=list)),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'get_latest_by': 'taken_at',
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('style', 'estilo'), ('brewery', 'cervecería')], max_length=10)),
+                ('label', models.CharField(max_length=120)),
+                ('beers', models.PositiveIntegerField(default=0)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('avg_rating', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='groups', to='core.metricssnapshot')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['snapshot', 'dimension', '-reviews'], name='groupmetric_lookup_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:26
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_metrics_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='beer',
+            index=models.Index(fields=['-avg_rating'], name='beer_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='beer',
+            index=models.Index(fields=['style', '-avg_rating'], name='beer_style_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='beer',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='beer_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='brewery',
+            index=models.Index(fields=['name'], name='brewery_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['thread', 'created_at', 'id'], name='post_thread_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', '-created_at'], name='report_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', 'object_type', 'object_id'], name='report_status_target_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['beer', '-created_at'], name='review_beer_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['-created_at', '-id'], name='thread_recent_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.CheckConstraint(condition=models.Q(('aroma__gte', 1), ('aroma__lte', 5)), name='review_aroma_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.CheckConstraint(condition=models.Q(('sabor__gte', 1), ('sabor__lte', 5)), name='review_sabor_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.CheckConstraint(condition=models.Q(('cuerpo__gte', 1), ('cuerpo__lte', 5)), name='review_cuerpo_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.CheckConstraint(condition=models.Q(('apariencia__gte', 1), ('apariencia__lte', 5)), name='review_apariencia_range'),
+        ),
+    ]
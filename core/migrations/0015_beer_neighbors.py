@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BeerNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+            ],
+            options={
+                'ordering': ['beer', 'rank'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user_name', '-created_at'], name='review_user_recent_idx'),
+        ),
+        migrations.AddField(
+            model_name='beerneighbor',
+            name='beer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='core.beer'),
+        ),
+        migrations.AddField(
+            model_name='beerneighbor',
+            name='neighbor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.beer'),
+        ),
+        migrations.AddConstraint(
+            model_name='beerneighbor',
+            constraint=models.UniqueConstraint(fields=('beer', 'rank'), name='beer_neighbor_rank_uniq'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:48
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Round
+
+
+def backfill_bayes_rating(apps, schema_editor):
+    # Mismo cálculo que core.models.bayes_rating_expression (prior 3.5, peso 10)
+    Beer = apps.get_model('core', 'Beer')
+    total = F('aroma_sum') + F('sabor_sum') + F('cuerpo_sum') + F('apariencia_sum')
+    Beer.objects.update(bayes_rating=Round(
+        (Value(35.0) + total / 4.0) / (Value(10) + F('review_count')), 3,
+        output_field=models.DecimalField(max_digits=4, decimal_places=3)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_beer_neighbors'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beer',
+            name='bayes_rating',
+            field=models.DecimalField(decimal_places=3, default=3.5, max_digits=4),
+        ),
+        migrations.AddField(
+            model_name='beer',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='beer',
+            index=models.Index(fields=['-bayes_rating', '-id'], name='beer_bayes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='beer',
+            index=models.Index(fields=['-trending_score', '-id'], name='beer_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['-trending_score', '-id'], name='thread_trending_idx'),
+        ),
+        migrations.RunPython(backfill_bayes_rating, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def backfill_facets(apps, schema_editor):
+    Beer = apps.get_model('core', 'Beer')
+    StyleFacet = apps.get_model('core', 'StyleFacet')
+    BreweryFacet = apps.get_model('core', 'BreweryFacet')
+    BreweryStyleFacet = apps.get_model('core', 'BreweryStyleFacet')
+    rows = (
+        Beer.objects.order_by().values('brewery_id', 'style')
+        .annotate(beers=Count('id'), reviews=Sum('review_count'),
+                  rating_total=Sum(F('aroma_sum') + F('sabor_sum')
+                                   + F('cuerpo_sum') + F('apariencia_sum')))
+    )
+    styles, breweries = {}, {}
+    for row in rows.iterator():
+        counts = {field: row[field] or 0 for field in ('beers', 'reviews', 'rating_total')}
+        BreweryStyleFacet.objects.create(brewery_id=row['brewery_id'], style=row['style'], **counts)
+        for totals, key in ((styles, row['style']), (breweries, row['brewery_id'])):
+            current = totals.setdefault(key, dict.fromkeys(counts, 0))
+            for field, value in counts.items():
+                current[field] += value
+    for style, counts in styles.items():
+        StyleFacet.objects.create(style=style, **counts)
+    for brewery_id, counts in breweries.items():
+        BreweryFacet.objects.create(brewery_id=brewery_id, **counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_trending_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BreweryFacet',
+            fields=[
+                ('beers', models.IntegerField(default=0)),
+                ('reviews', models.IntegerField(default=0)),
+                ('rating_total', models.BigIntegerField(default=0)),
+                ('brewery', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='facet', serialize=False, to='core.brewery')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='StyleFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('beers', models.IntegerField(default=0)),
+                ('reviews', models.IntegerField(default=0)),
+                ('rating_total', models.BigIntegerField(default=0)),
+                ('style', models.CharField(max_length=80, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='BreweryStyleFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('beers', models.IntegerField(default=0)),
+                ('reviews', models.IntegerField(default=0)),
+                ('rating_total', models.BigIntegerField(default=0)),
+                ('style', models.CharField(max_length=80)),
+                ('brewery', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.brewery')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['style', 'brewery'], name='style_brewery_facet_idx')],
+                'constraints': [models.UniqueConstraint(fields=('brewery', 'style'), name='brewery_style_facet_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_export_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='beer',
+            name='apariencia_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='beer',
+            name='aroma_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='beer',
+            name='avg_rating',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AlterField(
+            model_name='beer',
+            name='bayes_rating',
+            field=models.DecimalField(decimal_places=3, default=3.5, editable=False, max_digits=4),
+        ),
+        migrations.AlterField(
+            model_name='beer',
+            name='cuerpo_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='beer',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='beer',
+            name='sabor_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_beer_aggregates_readonly'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reviewphoto',
+            name='status',
+            field=models.CharField(choices=[('pending', 'pendiente'), ('processing', 'procesándose'), ('ready', 'procesada'), ('failed', 'fallida')], db_index=True, default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:10
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_last_post_at(apps, schema_editor):
+    # Hilos creados en bloque sin pasar por Thread.save
+    Thread = apps.get_model('core', 'Thread')
+    Thread.objects.filter(last_post_at__isnull=True).update(last_post_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_reviewphoto_processing_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_last_post_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='thread',
+            name='last_post_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='thread',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_thread_counters_readonly'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='beer',
+            name='beer_name_lower_idx',
+        ),
+    ]
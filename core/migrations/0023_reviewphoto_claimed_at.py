@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_drop_beer_name_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewphoto',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,29 +1,115 @@
-from django.db.models import Avg
+from django.db.models import Case, Count, F, Max, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Round
 from django.dispatch import receiver
-from django.db.models.signals import post_save, post_delete
-from django.db import models
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import facets
+from .storage import review_photo_storage
+from .text import normalize_name
+
+# Longitud de las columnas normalized_name (el nombre normalizado se recorta a ella)
+NORMALIZED_NAME_LENGTH = 120
 
 
 class Brewery(models.Model):
     name = models.CharField(max_length=120)
     country = models.CharField(max_length=80, blank=True)
+    # Nombre normalizado (ver core.text) para deduplicar e importar
+    normalized_name = models.CharField(
+        max_length=NORMALIZED_NAME_LENGTH, blank=True, default="", db_index=True,
+        editable=False)
+
+    class Meta:
+        indexes = [
+            # Desplegable de cervecerías del listado, por nombre
+            models.Index(fields=["name"], name="brewery_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name, NORMALIZED_NAME_LENGTH)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def matching(cls, name):
+        """Cervecerías con el mismo nombre normalizado, la más antigua primero."""
+        normalized = normalize_name(name, NORMALIZED_NAME_LENGTH)
+        if not normalized:
+            return cls.objects.none()
+        return cls.objects.filter(normalized_name=normalized).order_by("id")
+
 
 class Beer(models.Model):
     brewery = models.ForeignKey(Brewery, on_delete=models.CASCADE)
     name = models.CharField(max_length=120)
+    normalized_name = models.CharField(
+        max_length=NORMALIZED_NAME_LENGTH, blank=True, default="", db_index=True,
+        editable=False)
     style = models.CharField(max_length=80)
     abv = models.DecimalField(
         max_digits=4, decimal_places=1, null=True, blank=True)
-    avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    # Media bayesiana: el rating medio tirando hacia RATING_PRIOR_MEAN mientras
+    # hay pocas reseñas (ver bayes_rating_expression). Ordena la portada.
+    bayes_rating = models.DecimalField(
+        max_digits=4, decimal_places=3, default=3.5, editable=False)
+    # Actividad reciente con decaimiento exponencial (ver core.trending)
+    trending_score = models.FloatField(default=0, editable=False)
+    # Agregados acumulados de las reseñas (se mantienen incrementalmente)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    aroma_sum = models.PositiveIntegerField(default=0, editable=False)
+    sabor_sum = models.PositiveIntegerField(default=0, editable=False)
+    cuerpo_sum = models.PositiveIntegerField(default=0, editable=False)
+    apariencia_sum = models.PositiveIntegerField(default=0, editable=False)
+
+    # Columnas que solo se escriben con UPDATE ... F() (reseñas, tendencias)
+    DENORMALIZED_FIELDS = frozenset((
+        "avg_rating", "bayes_rating", "trending_score", "review_count",
+        "aroma_sum", "sabor_sum", "cuerpo_sum", "apariencia_sum"))
+
+    class Meta:
+        indexes = [
+            # Portada y API: mejor valoradas
+            models.Index(fields=["-avg_rating"], name="beer_rating_idx"),
+            models.Index(fields=["-bayes_rating", "-id"], name="beer_bayes_idx"),
+            models.Index(fields=["-trending_score", "-id"], name="beer_trending_idx"),
+            # Filtro por estilo del listado y lista de estilos (distinct)
+            models.Index(fields=["style", "-avg_rating"], name="beer_style_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.style})"
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name, NORMALIZED_NAME_LENGTH)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            if "name" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "normalized_name"}
+        elif not self._state.adding and not kwargs.get("force_insert"):
+            # Una instancia leída antes de otra reseña no debe pisar los
+            # agregados que se han sumado con F() entretanto
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def matching(cls, name):
+        """
+        Cervezas con el mismo nombre normalizado ("Mahou 5★" = "mahou 5"), la
+        de más reseñas primero. Las que solo se parecen las une dedup_catalog.
+        """
+        normalized = normalize_name(name, NORMALIZED_NAME_LENGTH)
+        if not normalized:
+            return cls.objects.none()
+        return cls.objects.filter(normalized_name=normalized).order_by("-review_count", "id")
+
 
 class Review(models.Model):
     beer = models.ForeignKey(
@@ -39,6 +125,23 @@ class Review(models.Model):
         max_length=120, blank=True, verbose_name="Cervecería Productora")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Reseñas de la ficha de una cerveza, más recientes primero
+            models.Index(fields=["beer", "-created_at"], name="review_beer_recent_idx"),
+            # Últimas reseñas de un usuario (recomendaciones personales)
+            models.Index(fields=["user_name", "-created_at"], name="review_user_recent_idx"),
+            # Cursor de la exportación (core.export)
+            models.Index(fields=["created_at", "id"], name="review_created_idx"),
+        ]
+        # Los agregados de Beer dan por hecho puntuaciones de 1 a 5
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(**{f"{field}__gte": 1, f"{field}__lte": 5}),
+                name=f"review_{field}_range")
+            for field in ("aroma", "sabor", "cuerpo", "apariencia")
+        ]
+
     def __str__(self):
         return f"Reseña de {self.user_name} para {self.beer.name}"
 
@@ -46,29 +149,275 @@ class Review(models.Model):
         """Cuenta las palabras en el comentario"""
         return len(self.comment.split())
 
+    def save(self, *args, **kwargs):
+        # Guardar la reseña y actualizar los agregados de la cerveza
+        # (receptores pre_save/post_save) en la misma transacción.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class ReviewPhoto(models.Model):
+    STATUS_CHOICES = (
+        ("pending", "pendiente"),
+        ("processing", "procesándose"),
+        ("ready", "procesada"),
+        ("failed", "fallida"),
+    )
+
     review = models.ForeignKey(
         Review, on_delete=models.CASCADE, related_name="photos")
-    photo = models.ImageField(upload_to='review_photos/')
+    photo = models.ImageField(
+        upload_to='review_photos/', storage=review_photo_storage)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Rellenado en segundo plano por core.photos (miniaturas WebP sin EXIF)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="pending", db_index=True)
+    # Cuándo pasó a "processing": si lleva demasiado, su proceso murió a medias
+    claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    thumb_small = models.ImageField(
+        upload_to='review_photos/variants/', storage=review_photo_storage,
+        blank=True)
+    thumb_medium = models.ImageField(
+        upload_to='review_photos/variants/', storage=review_photo_storage,
+        blank=True)
+
+    # Campos de fichero cuyas referencias se cuentan en StoredFile
+    FILE_FIELDS = ("photo", "thumb_small", "thumb_medium")
 
     def __str__(self):
         return f"Foto de reseña {self.review.id}"
 
+    def variants(self):
+        """[(campo, ancho)] de las variantes ya generadas, de menor a mayor."""
+        from core.photos import VARIANTS
+
+        return [(getattr(self, field), size) for field, size in VARIANTS
+                if getattr(self, field)]
+
+    @property
+    def is_ready(self):
+        return self.status == "ready"
+
+    @property
+    def display_url(self):
+        """
+        La variante más pequeña disponible; el original (ya sin EXIF) si no
+        hay. Nada mientras la foto no está procesada.
+        """
+        if not self.is_ready:
+            return ""
+        variants = self.variants()
+        return variants[0][0].url if variants else self.photo.url
+
+    @property
+    def srcset(self):
+        return ", ".join(f"{image.url} {size}w" for image, size in self.variants())
+
+    def file_names(self):
+        return {getattr(self, field).name for field in self.FILE_FIELDS
+                if getattr(self, field)}
+
     class Meta:
         ordering = ['created_at']
 
 
-@receiver([post_save, post_delete], sender=Review)
-def update_beer_avg_rating(sender, instance, **kwargs):
-    beer = instance.beer
-    avg = beer.reviews.aggregate(promedio=Avg(
-        (models.F('aroma') + models.F('sabor') +
-         models.F('cuerpo') + models.F('apariencia')) / 4
-    ))["promedio"]
-    beer.avg_rating = round(avg or 0, 2)
-    beer.save()
+class StoredFile(models.Model):
+    """Recuento de filas que apuntan a cada fichero de fotos."""
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+def acquire_files(names):
+    for name in names:
+        if StoredFile.objects.filter(name=name).update(refcount=F("refcount") + 1):
+            continue
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, refcount=1)
+        except IntegrityError:
+            # Otro proceso lo acaba de crear
+            StoredFile.objects.filter(name=name).update(refcount=F("refcount") + 1)
+
+
+def release_files(names, storage):
+    """Resta una referencia y borra del disco los ficheros que quedan sin uso."""
+    released_at = timezone.now()
+    for name in names:
+        StoredFile.objects.filter(name=name).update(refcount=F("refcount") - 1)
+        if StoredFile.objects.filter(name=name, refcount__lte=0).exists():
+            transaction.on_commit(
+                lambda name=name: _delete_if_unused(name, storage, released_at))
+
+
+def _delete_if_unused(name, storage, released_at):
+    """
+    Borra fila y fichero en un solo paso con la fila bloqueada, así una
+    subida del mismo contenido no puede sumar su referencia entre la
+    comprobación y el borrado (su UPDATE espera al bloqueo).
+    """
+    with transaction.atomic():
+        stored = StoredFile.objects.select_for_update().filter(
+            name=name, refcount__lte=0).first()
+        if stored is None:
+            return  # alguien ha vuelto a subir el mismo contenido
+        try:
+            rewritten = storage.get_modified_time(name) > released_at
+        except FileNotFoundError:
+            rewritten = False
+        if rewritten:
+            # Una subida lo ha reescrito después de soltarlo y aún no ha
+            # contado su referencia: la fila a 0 la recoge `acquire_files`
+            return
+        stored.delete()
+        storage.delete(name)
+
+
+@receiver(pre_save, sender=ReviewPhoto)
+def remember_previous_photo_files(sender, instance, **kwargs):
+    instance._previous_files = set()
+    if instance.pk and not instance._state.adding:
+        previous = ReviewPhoto.objects.filter(pk=instance.pk).values(
+            *ReviewPhoto.FILE_FIELDS).first() or {}
+        instance._previous_files = {name for name in previous.values() if name}
+
+
+@receiver(post_save, sender=ReviewPhoto)
+def count_photo_file_references(sender, instance, **kwargs):
+    current = instance.file_names()
+    previous = getattr(instance, "_previous_files", set())
+    acquire_files(current - previous)
+    release_files(previous - current, instance.photo.storage)
+
+
+@receiver(post_delete, sender=ReviewPhoto)
+def release_photo_files(sender, instance, **kwargs):
+    release_files(instance.file_names(), instance.photo.storage)
+
+
+RATING_FIELDS = ("aroma", "sabor", "cuerpo", "apariencia")
+
+
+def avg_rating_expression():
+    """Expresión SQL del rating medio a partir de los agregados de `Beer`."""
+    total = (F("aroma_sum") + F("sabor_sum") +
+             F("cuerpo_sum") + F("apariencia_sum"))
+    return Case(
+        When(review_count=0, then=Value(0.0)),
+        default=Round(total * 1.0 / (F("review_count") * 4), 2),
+        output_field=models.DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+# Media y peso (en reseñas) del prior de la media bayesiana: una cerveza con
+# una sola reseña de 5 queda cerca de 3.5, no por encima de las consagradas.
+RATING_PRIOR_MEAN = 3.5
+RATING_PRIOR_WEIGHT = 10
+
+
+def bayes_rating_expression():
+    """(C·m + suma de notas medias) / (C + reseñas), con C y m los del prior."""
+    total = (F("aroma_sum") + F("sabor_sum") +
+             F("cuerpo_sum") + F("apariencia_sum"))
+    return Round(
+        (Value(RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN) + total / 4.0)
+        / (Value(RATING_PRIOR_WEIGHT) + F("review_count")), 3,
+        output_field=models.DecimalField(max_digits=4, decimal_places=3))
+
+
+def apply_review_delta(beer_id, sign, scores):
+    """
+    Suma (sign=1) o resta (sign=-1) una reseña a los agregados de la cerveza.
+    `scores` es un dict con las puntuaciones aroma/sabor/cuerpo/apariencia.
+    Todo se hace con expresiones F: no se leen ni reescriben filas completas.
+    """
+    beers = Beer.objects.filter(pk=beer_id)
+    deltas = {"review_count": F("review_count") + sign}
+    for field in RATING_FIELDS:
+        deltas[f"{field}_sum"] = F(f"{field}_sum") + sign * scores[field]
+    # Dos UPDATE separados: el orden de evaluación de SET no es portable
+    # entre MySQL y el resto de motores.
+    beers.update(**deltas)
+    beers.update(avg_rating=avg_rating_expression(), bayes_rating=bayes_rating_expression())
+    facets.apply_review_delta(beer_id, sign, scores)
+
+
+def rebuild_beer_aggregates(beers=None, fix=True):
+    """
+    Recalcula desde cero los agregados de las cervezas indicadas (todas por
+    defecto) y devuelve los ids cuyos valores guardados (contadores, sumas o
+    medias) estaban desfasados.
+    Recorre cervezas y reseñas agrupadas en paralelo, ordenadas por id, para
+    no lanzar una consulta por cerveza.
+    """
+    if beers is None:
+        beers = Beer.objects.all()
+    sum_fields = [f"{field}_sum" for field in RATING_FIELDS]
+    # Las medias guardadas se comparan con las que salen de los agregados
+    # guardados (mismas expresiones SQL, mismo redondeo)
+    stored_rows = beers.order_by("id").annotate(
+        expected_avg=avg_rating_expression(), expected_bayes=bayes_rating_expression(),
+    ).values_list("id", "avg_rating", "expected_avg", "bayes_rating", "expected_bayes",
+                  "review_count", *sum_fields).iterator()
+    actual_rows = (
+        Review.objects.filter(beer__in=beers.values("id"))
+        .values("beer_id")
+        .annotate(review_count=models.Count("id"),
+                  **{f"{f}_sum": Sum(f) for f in RATING_FIELDS})
+        .order_by("beer_id")
+        .values_list("beer_id", "review_count", *sum_fields)
+        .iterator()
+    )
+    empty = (0,) * (1 + len(sum_fields))
+    drifted = []
+    current = next(actual_rows, None)
+    for beer_id, avg, expected_avg, bayes, expected_bayes, *stored in stored_rows:
+        actual = empty
+        if current is not None and current[0] == beer_id:
+            actual = tuple(current[1:])
+            current = next(actual_rows, None)
+        if tuple(stored) != actual or avg != expected_avg or bayes != expected_bayes:
+            drifted.append(beer_id)
+            if fix:
+                with transaction.atomic():
+                    target = Beer.objects.filter(pk=beer_id)
+                    target.update(**dict(zip(["review_count", *sum_fields], actual)))
+                    target.update(avg_rating=avg_rating_expression(),
+                                  bayes_rating=bayes_rating_expression())
+    return drifted
+
+
+def _review_scores(review):
+    return {field: getattr(review, field) for field in RATING_FIELDS}
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_review_scores(sender, instance, **kwargs):
+    # Si la reseña ya existía guardamos sus valores anteriores para poder
+    # aplicar solo la diferencia en post_save.
+    instance._previous_scores = None
+    if instance.pk and not instance._state.adding:
+        previous = Review.objects.filter(pk=instance.pk).values(
+            "beer_id", *RATING_FIELDS).first()
+        instance._previous_scores = previous
+
+
+@receiver(post_save, sender=Review)
+def update_beer_avg_rating(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_scores", None)
+    if previous:
+        apply_review_delta(previous.pop("beer_id"), -1, previous)
+    apply_review_delta(instance.beer_id, 1, _review_scores(instance))
+
+
+@receiver(post_delete, sender=Review)
+def discount_deleted_review(sender, instance, **kwargs):
+    apply_review_delta(instance.beer_id, -1, _review_scores(instance))
 
 
 class Thread(models.Model):
@@ -81,6 +430,16 @@ class Thread(models.Model):
         User, on_delete=models.SET_NULL, null=True, blank=True, related_name="threads")
     user_name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Contadores desnormalizados de mensajes visibles (ver señales de Post).
+    # `last_post_at` vale la fecha de creación mientras no haya respuestas; no
+    # admite nulos para que el cursor (-last_post_at, -id) tenga orden total.
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    last_post_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Actividad reciente con decaimiento exponencial (ver core.trending)
+    trending_score = models.FloatField(default=0, editable=False)
+
+    # Columnas que solo se escriben con UPDATE (señales de Post, tendencias)
+    DENORMALIZED_FIELDS = frozenset(("post_count", "last_post_at", "trending_score"))
 
     def __str__(self):
         # Preferir el campo libre `beer_name` si el autor lo proporcionó
@@ -90,8 +449,25 @@ class Thread(models.Model):
             display = self.beer.name if self.beer else "General"
         return f"{self.title} — {display}"
 
+    def save(self, *args, **kwargs):
+        # Como Beer.save: una instancia vieja no pisa los contadores
+        if (kwargs.get("update_fields") is None and not self._state.adding
+                and not kwargs.get("force_insert")):
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS]
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'],
+                         name='thread_recent_idx'),
+            models.Index(fields=['-last_post_at', '-id'],
+                         name='thread_activity_idx'),
+            models.Index(fields=['-trending_score', '-id'],
+                         name='thread_trending_idx'),
+        ]
 
 
 class Post(models.Model):
@@ -107,8 +483,75 @@ class Post(models.Model):
     def __str__(self):
         return f"Post de {self.user_name} en {self.thread.title}"
 
+    def save(self, *args, **kwargs):
+        # Igual que Review: contadores del hilo en la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Detalle de hilo en orden (keyset created_at, id). `is_hidden` no
+            # va en el índice: Django lo filtra como NOT is_hidden, que no sirve
+            # de prefijo, y las ocultas son pocas.
+            models.Index(fields=['thread', 'created_at', 'id'],
+                         name='post_thread_order_idx'),
+            # Cursor de la exportación (core.export)
+            models.Index(fields=['created_at', 'id'], name='post_created_idx'),
+        ]
+
+
+def _last_visible_post_expression():
+    latest = (Post.objects.filter(thread=OuterRef("pk"), is_hidden=False)
+              .order_by().values("thread").annotate(latest=Max("created_at"))
+              .values("latest"))
+    return Coalesce(Subquery(latest), F("created_at"))
+
+
+def refresh_thread_counters(thread_ids):
+    """
+    Recalcula `post_count` y `last_post_at` de los hilos indicados con un único
+    UPDATE. Útil tras actualizaciones masivas que no disparan señales.
+    """
+    visible = (Post.objects.filter(thread=OuterRef("pk"), is_hidden=False)
+               .order_by().values("thread").annotate(n=Count("id")).values("n"))
+    Thread.objects.filter(pk__in=thread_ids).update(
+        post_count=Coalesce(Subquery(visible), 0),
+        last_post_at=_last_visible_post_expression(),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post_visibility(sender, instance, **kwargs):
+    instance._was_hidden = None
+    if instance.pk and not instance._state.adding:
+        instance._was_hidden = Post.objects.filter(
+            pk=instance.pk).values_list("is_hidden", flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def update_thread_counters(sender, instance, created, **kwargs):
+    threads = Thread.objects.filter(pk=instance.thread_id)
+    if created:
+        if not instance.is_hidden:
+            threads.update(post_count=F("post_count") + 1,
+                           last_post_at=instance.created_at)
+        return
+    was_hidden = getattr(instance, "_was_hidden", None)
+    if was_hidden is None or was_hidden == instance.is_hidden:
+        return
+    # Se ha ocultado o vuelto a mostrar: ajustar contador y última actividad
+    threads.update(post_count=F("post_count") + (-1 if instance.is_hidden else 1))
+    threads.update(last_post_at=_last_visible_post_expression())
+
+
+@receiver(post_delete, sender=Post)
+def discount_deleted_post(sender, instance, **kwargs):
+    if instance.is_hidden:
+        return
+    threads = Thread.objects.filter(pk=instance.thread_id)
+    threads.update(post_count=F("post_count") - 1)
+    threads.update(last_post_at=_last_visible_post_expression())
 
 
 class Report(models.Model):
@@ -129,9 +572,143 @@ class Report(models.Model):
         max_length=10, choices=STATUS_CHOICES, default="open")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-created_at"], name="report_status_recent_idx"),
+            # Cola de moderación: agrupar las abiertas por objeto denunciado
+            models.Index(fields=["status", "object_type", "object_id"],
+                         name="report_status_target_idx"),
+        ]
+
     def __str__(self):
         return f"Report {self.object_type}:{self.object_id} ({self.status})"
 
-    # TODO: proteger vistas de moderación con staff
     # TODO: permitir editar/borrar posts del autor
-    # TODO: rate-limit en creación de posts/reviews
+
+
+class MetricsSnapshot(models.Model):
+    """Foto periódica de las métricas del panel (ver `manage.py refresh_metrics`)."""
+    taken_at = models.DateTimeField(db_index=True)
+    beers = models.PositiveIntegerField(default=0)
+    breweries = models.PositiveIntegerField(default=0)
+    reviews = models.PositiveIntegerField(default=0)
+    threads = models.PositiveIntegerField(default=0)
+    posts = models.PositiveIntegerField(default=0)
+    # [{"id", "name", "style", "avg_rating", "review_count"}, ...]
+    top_beers = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ["-taken_at"]
+        get_latest_by = "taken_at"
+
+    def __str__(self):
+        return f"Métricas {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class GroupMetric(models.Model):
+    """Agregados por estilo o por cervecería dentro de una foto de métricas."""
+    DIMENSIONS = (
+        ("style", "estilo"),
+        ("brewery", "cervecería"),
+    )
+
+    snapshot = models.ForeignKey(
+        MetricsSnapshot, on_delete=models.CASCADE, related_name="groups")
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS)
+    label = models.CharField(max_length=120)
+    beers = models.PositiveIntegerField(default=0)
+    reviews = models.PositiveIntegerField(default=0)
+    avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["snapshot", "dimension", "-reviews"],
+                                name="groupmetric_lookup_idx")]
+
+    def __str__(self):
+        return f"{self.dimension}:{self.label}"
+
+
+class DailyActivity(models.Model):
+    """Altas por día (hora local); se recalcula solo desde el último día guardado."""
+    day = models.DateField(unique=True)
+    reviews = models.PositiveIntegerField(default=0)
+    threads = models.PositiveIntegerField(default=0)
+    posts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["day"]
+
+    def __str__(self):
+        return f"Actividad {self.day}"
+
+
+class BeerNeighbor(models.Model):
+    """
+    Cervezas parecidas según quién las puntúa y cómo (ver core.recommendations).
+    Se reescribe entera con `manage.py build_recommendations`.
+    """
+    beer = models.ForeignKey(Beer, on_delete=models.CASCADE, related_name="neighbors")
+    neighbor = models.ForeignKey(Beer, on_delete=models.CASCADE, related_name="+")
+    # 0 = la más parecida
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["beer", "rank"]
+        constraints = [
+            # También es el índice de la lectura: vecinas de una cerveza en orden
+            models.UniqueConstraint(fields=["beer", "rank"], name="beer_neighbor_rank_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.beer_id} -> {self.neighbor_id} ({self.score:.2f})"
+
+
+class FacetCounts(models.Model):
+    """
+    Contadores de una faceta del listado de cervezas (ver core.facets): se
+    mantienen al guardar y borrar cervezas y reseñas, no se agrupa al leer.
+    """
+    beers = models.IntegerField(default=0)
+    reviews = models.IntegerField(default=0)
+    # Suma de aroma + sabor + cuerpo + apariencia de todas las reseñas
+    rating_total = models.BigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def avg_rating(self):
+        return round(self.rating_total / (self.reviews * 4), 2) if self.reviews else 0
+
+
+class StyleFacet(FacetCounts):
+    style = models.CharField(max_length=80, unique=True)
+
+    def __str__(self):
+        return f"{self.style}: {self.beers}"
+
+
+class BreweryFacet(FacetCounts):
+    brewery = models.OneToOneField(Brewery, on_delete=models.CASCADE, primary_key=True,
+                                   related_name="facet")
+
+    def __str__(self):
+        return f"{self.brewery_id}: {self.beers}"
+
+
+class BreweryStyleFacet(FacetCounts):
+    """Cruce cervecería x estilo: facetas de una con la otra ya filtrada."""
+    brewery = models.ForeignKey(Brewery, on_delete=models.CASCADE, related_name="+")
+    style = models.CharField(max_length=80)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["brewery", "style"], name="brewery_style_facet_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["style", "brewery"], name="style_brewery_facet_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.brewery_id}/{self.style}: {self.beers}"
@@ -0,0 +1,118 @@
+"""
+Cola de moderación: denuncias abiertas agrupadas por objeto denunciado.
+
+Los objetos se cargan con una consulta por tipo (`in_bulk`) y las acciones se
+aplican a muchos objetos a la vez con UPDATEs dentro de una transacción, así
+que el coste no depende de cuántas denuncias haya en la página.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from . import caching
+from .models import Post, Report, Review, refresh_thread_counters
+
+QUEUE_SIZE = 100
+REASONS_PER_TARGET = 5
+
+# Tipo de objeto -> queryset con lo que se muestra en la cola
+TARGET_QUERYSETS = {
+    "post": lambda: Post.objects.select_related("thread"),
+    "review": lambda: Review.objects.select_related("beer"),
+}
+
+ACTIONS = ("close", "hide")
+
+
+def target_key(object_type, object_id):
+    return f"{object_type}:{object_id}"
+
+
+def parse_target_keys(keys):
+    """["post:3", "review:7"] -> [("post", 3), ("review", 7)], descartando basura."""
+    targets = []
+    for key in keys:
+        object_type, _, object_id = key.partition(":")
+        if object_type in TARGET_QUERYSETS and object_id.isdigit():
+            targets.append((object_type, int(object_id)))
+    return targets
+
+
+def _targets_filter(targets):
+    ids_by_type = defaultdict(set)
+    for object_type, object_id in targets:
+        ids_by_type[object_type].add(object_id)
+    condition = Q(pk__in=[])
+    for object_type, ids in ids_by_type.items():
+        condition |= Q(object_type=object_type, object_id__in=ids)
+    return condition, ids_by_type
+
+
+def open_report_groups(limit=QUEUE_SIZE):
+    """
+    Grupos de denuncias abiertas (más denunciados primero) con su objeto y los
+    últimos motivos. Número de consultas fijo: grupos, una por tipo y motivos.
+    """
+    groups = list(
+        Report.objects.filter(status="open")
+        .values("object_type", "object_id")
+        .annotate(report_count=Count("id"), last_reported=Max("created_at"),
+                  report_id=Max("id"))
+        .order_by("-report_count", "-last_reported", "object_type", "object_id")[:limit]
+    )
+    if not groups:
+        return groups
+
+    targets = [(g["object_type"], g["object_id"]) for g in groups]
+    condition, ids_by_type = _targets_filter(targets)
+    objects = {
+        object_type: TARGET_QUERYSETS[object_type]().in_bulk(ids)
+        for object_type, ids in ids_by_type.items() if object_type in TARGET_QUERYSETS
+    }
+
+    reasons = defaultdict(list)
+    for object_type, object_id, user_name, reason in (
+            Report.objects.filter(condition, status="open").order_by("-created_at")
+            .values_list("object_type", "object_id", "user_name", "reason")):
+        entries = reasons[(object_type, object_id)]
+        if len(entries) < REASONS_PER_TARGET:
+            entries.append({"user_name": user_name, "reason": reason})
+
+    for group in groups:
+        key = (group["object_type"], group["object_id"])
+        group["key"] = target_key(*key)
+        group["target"] = objects.get(group["object_type"], {}).get(group["object_id"])
+        group["reasons"] = reasons[key]
+    return groups
+
+
+def open_target_count():
+    return (Report.objects.filter(status="open")
+            .values("object_type", "object_id").distinct().count())
+
+
+@transaction.atomic
+def resolve(action, targets):
+    """
+    Aplica `action` ("close" u "hide") a los objetos [(tipo, id)] y cierra sus
+    denuncias abiertas. Devuelve (objetos ocultados, denuncias cerradas).
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Acción desconocida: {action}")
+    if not targets:
+        return 0, 0
+    condition, ids_by_type = _targets_filter(targets)
+
+    hidden = 0
+    if action == "hide" and ids_by_type.get("post"):
+        posts = Post.objects.filter(id__in=ids_by_type["post"], is_hidden=False)
+        thread_ids = set(posts.values_list("thread_id", flat=True))
+        # update() no dispara señales: recalcular contadores y caché a mano
+        hidden = posts.update(is_hidden=True)
+        if hidden:
+            refresh_thread_counters(thread_ids)
+            caching.invalidate(caching.HOME_RECENT_THREADS)
+
+    closed = Report.objects.filter(condition, status="open").update(status="closed")
+    return hidden, closed
@@ -0,0 +1,157 @@
+"""
+Pool de conexiones por proceso para el backend `core.mysqlpool`.
+
+Con ASGI cada petición usa su propio hilo y Django no puede reutilizar las
+conexiones persistentes (CONN_MAX_AGE), así que cada una pagaría el
+handshake de MySQL. Este backend es el de MySQL de Django, salvo que abrir y
+cerrar la conexión la toma y la devuelve a un pool compartido por todos los
+hilos del proceso.
+
+Se configura en la base de datos con la clave POOL (SIZE, TIMEOUT, RECYCLE,
+PING_AFTER) y CONN_MAX_AGE = 0, para que cada petición devuelva la conexión
+al terminar. `all_stats()` da, por alias, las conexiones en uso, libres y
+las esperas; se publican en /profiling/metrics/.
+"""
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+DEFAULTS = {
+    "SIZE": 10,
+    # Segundos que se espera a una conexión libre antes de fallar
+    "TIMEOUT": 5,
+    # Se cierran las conexiones con más de estos segundos de vida
+    "RECYCLE": 1800,
+    # Se hace ping a las que llevan más de estos segundos sin usarse
+    "PING_AFTER": 30,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class Pool:
+    def __init__(self, size, timeout, recycle, ping_after):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._cond = threading.Condition()
+        # (conexión, creada, libre desde); se reutiliza la última devuelta
+        self._idle = deque()
+        self._created_at = {}
+        self._open = 0
+        self.created = 0
+        self.checkouts = 0
+        self.discarded = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def _usable(self, raw, created_at, idle_since):
+        now = time.monotonic()
+        if self.recycle and now - created_at > self.recycle:
+            return False
+        if now - idle_since > self.ping_after:
+            try:
+                raw.ping()
+            except Exception:
+                return False
+        return True
+
+    def acquire(self, connect):
+        """Una conexión libre o, si cabe, una nueva creada con `connect()`."""
+        started = time.monotonic()
+        waited = False
+        while True:
+            raw = None
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f"Sin conexiones libres tras {self.timeout} s (pool de {self.size})")
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    raw, created_at, idle_since = self._idle.pop()
+                else:
+                    self._open += 1
+            if raw is None:
+                try:
+                    raw = connect()
+                except BaseException:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self.created += 1
+                    self._created_at[id(raw)] = time.monotonic()
+            elif not self._usable(raw, created_at, idle_since):
+                self.discard(raw)
+                continue
+            with self._cond:
+                self.checkouts += 1
+                if waited:
+                    elapsed = time.monotonic() - started
+                    self.waits += 1
+                    self.wait_time += elapsed
+                    self.max_wait = max(self.max_wait, elapsed)
+            return raw
+
+    def release(self, raw):
+        with self._cond:
+            created_at = self._created_at[id(raw)]
+            self._idle.append((raw, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created_at.pop(id(raw), None)
+            self._open -= 1
+            self.discarded += 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "in_use": self._open - len(self._idle),
+                "idle": len(self._idle),
+                "checkouts": self.checkouts,
+                "created": self.created,
+                "discarded": self.discarded,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_time, 6),
+                "max_wait_seconds": round(self.max_wait, 6),
+                "timeouts": self.timeouts,
+            }
+
+
+def get_pool(alias, options):
+    """El pool de `alias`; se crea con la primera conexión que se pide."""
+    with _pools_lock:
+        if alias not in _pools:
+            config = {**DEFAULTS, **options}
+            _pools[alias] = Pool(config["SIZE"], config["TIMEOUT"],
+                                 config["RECYCLE"], config["PING_AFTER"])
+        return _pools[alias]
+
+
+def all_stats():
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {alias: pool.stats() for alias, pool in pools}
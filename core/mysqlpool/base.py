@@ -0,0 +1,38 @@
+import weakref
+from functools import partial
+
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from . import get_pool
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    """Backend de MySQL que toma y devuelve las conexiones de un pool."""
+
+    _release_on_collect = None
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, self.settings_dict.get("POOL", {}))
+        raw = self.pool.acquire(partial(super().get_new_connection, conn_params))
+        # Si el hilo termina sin cerrar la conexión, no se pierde su hueco
+        self._release_on_collect = weakref.finalize(self, self.pool.discard, raw)
+        return raw
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self._release_on_collect is not None:
+            self._release_on_collect.detach()
+            self._release_on_collect = None
+        # Solo vuelve al pool una conexión sana y fuera de transacción
+        if self.in_atomic_block or self.errors_occurred:
+            self.pool.discard(self.connection)
+            return
+        try:
+            with self.wrap_database_errors:
+                if not self.get_autocommit():
+                    self.connection.rollback()
+        except Exception:
+            self.pool.discard(self.connection)
+            return
+        self.pool.release(self.connection)
@@ -0,0 +1,158 @@
+"""
+Paginación por cursor (keyset): en lugar de OFFSET, cada página se pide
+"a partir de" los valores de ordenación de la última fila vista, de modo que
+la página 5000 cuesta lo mismo que la primera y no hace falta un COUNT(*).
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({"v": values, "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Devuelve (valores, dirección) o None si el cursor no es válido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = data["v"], data["d"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if direction not in ("next", "prev") or not isinstance(values, list):
+        return None
+    return values, direction
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    `ordering` son nombres de campo (con "-" para descendente) y debe terminar
+    en un campo único (normalmente "id") para que el orden sea total.
+    """
+
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        self.descending = [name.startswith("-") for name in self.ordering]
+
+    def _to_python(self, values):
+        model = self.queryset.model
+        return [
+            model._meta.get_field(name).to_python(value)
+            for name, value in zip(self.fields, values)
+        ]
+
+    def _serialize(self, obj):
+        values = []
+        for name in self.fields:
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            elif not isinstance(value, (int, float, str, type(None))):
+                value = str(value)  # Decimal y similares
+            values.append(value)
+        return values
+
+    def _after(self, values, backwards):
+        """Condición "fila posterior a `values`" en el orden pedido."""
+        condition = Q()
+        for i, name in enumerate(self.fields):
+            # Al retroceder se invierte el sentido de cada comparación
+            lookup = "lt" if self.descending[i] != backwards else "gt"
+            step = Q(**{f"{name}__{lookup}": values[i]})
+            for prev_name, prev_value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    def _page_queryset(self, cursor):
+        """(queryset de la página + 1 fila extra, cursor decodificado, ¿atrás?)"""
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded and len(decoded[0]) != len(self.fields):
+            decoded = None
+        backwards = bool(decoded) and decoded[1] == "prev"
+
+        ordering = self.ordering
+        if backwards:
+            ordering = [name[1:] if name.startswith("-") else f"-{name}"
+                        for name in self.ordering]
+        queryset = self.queryset.order_by(*ordering)
+        if decoded:
+            try:
+                queryset = queryset.filter(
+                    self._after(self._to_python(decoded[0]), backwards))
+            except (ValidationError, ValueError, TypeError):
+                # Cursor manipulado: empezar desde el principio
+                decoded, backwards = None, False
+                queryset = self.queryset.order_by(*self.ordering)
+        return queryset[:self.per_page + 1], decoded, backwards
+
+    def _build_page(self, rows, decoded, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            # Hacia delante: hay siguiente si sobró una fila; hay anterior si
+            # veníamos de un cursor. Al retroceder, al revés.
+            if (has_more and not backwards) or backwards:
+                next_cursor = encode_cursor(self._serialize(rows[-1]), "next")
+            if (has_more and backwards) or (decoded and not backwards):
+                previous_cursor = encode_cursor(self._serialize(rows[0]), "prev")
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        queryset, decoded, backwards = self._page_queryset(cursor)
+        return self._build_page(list(queryset), decoded, backwards)
+
+    async def aget_page(self, cursor=None):
+        queryset, decoded, backwards = self._page_queryset(cursor)
+        return self._build_page([row async for row in queryset], decoded, backwards)
+
+
+def paginate_ids(ids, cursor, per_page=20):
+    """
+    Página de una lista de ids ya ordenada (p. ej. por relevancia), donde no
+    hay columna por la que hacer keyset: el cursor es la posición en la lista.
+    Devuelve (ids de la página, cursor siguiente, cursor anterior).
+    """
+    decoded = decode_cursor(cursor) if cursor else None
+    start = 0
+    if decoded and len(decoded[0]) == 1 and isinstance(decoded[0][0], int):
+        start = max(decoded[0][0], 0)
+    end = start + per_page
+    next_cursor = encode_cursor([end], "next") if end < len(ids) else None
+    previous_cursor = encode_cursor([max(start - per_page, 0)], "prev") if start else None
+    return ids[start:end], next_cursor, previous_cursor
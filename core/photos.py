@@ -0,0 +1,185 @@
+"""
+Procesado en segundo plano de las fotos de reseñas.
+
+Por cada `ReviewPhoto` pendiente se corrige la orientación, se reescribe el
+original sin metadatos EXIF, se generan variantes WebP más pequeñas y se
+guardan sus dimensiones. Hasta entonces la foto no se muestra (el original
+subido aún lleva el EXIF, con la posición GPS si la hay). Según
+`settings.PHOTO_PIPELINE["MODE"]` el trabajo lo hace un pool de hilos del
+propio proceso ("thread"), el comando `manage.py process_photos` ("worker") o
+la propia petición ("inline").
+
+Lo que se queda por el camino (un reinicio con fotos en cola o a medias, fotos
+anteriores al procesado) lo recoge `sweep`: en modo "thread" se lanza con la
+primera petición de cada proceso, y el worker lo hace al arrancar.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import request_started
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# (campo de ReviewPhoto, ancho máximo en px), de menor a mayor
+VARIANTS = (
+    ("thumb_small", 320),
+    ("thumb_medium", 800),
+)
+WEBP_QUALITY = 80
+ORIGINAL_QUALITY = 90
+
+_executor = None
+
+
+def _config():
+    return {"MODE": "thread", "WORKERS": 2, "STALE_AFTER": timedelta(minutes=10),
+            **getattr(settings, "PHOTO_PIPELINE", {})}
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_config()["WORKERS"], thread_name_prefix="photos")
+    return _executor
+
+
+def enqueue(photo_ids):
+    """Programa el procesado de las fotos cuando se confirme la transacción."""
+    photo_ids = list(photo_ids)
+    if not photo_ids:
+        return
+    mode = _config()["MODE"]
+    if mode == "worker":
+        return  # las recoge `manage.py process_photos`
+    if mode == "inline":
+        transaction.on_commit(lambda: process_many(photo_ids))
+        return
+    transaction.on_commit(
+        lambda: _get_executor().submit(_process_in_thread, photo_ids))
+
+
+def _process_in_thread(photo_ids):
+    try:
+        process_many(photo_ids)
+    finally:
+        # Cada hilo del pool tiene su propia conexión: no dejarla colgando
+        connections.close_all()
+
+
+def requeue_stale(older_than=None):
+    """
+    Devuelve a "pending" las fotos que siguen "processing" desde hace más de
+    `older_than` (por defecto STALE_AFTER): su proceso murió a medias.
+    """
+    from core.models import ReviewPhoto
+
+    if older_than is None:
+        older_than = _config()["STALE_AFTER"]
+    stale = Q(claimed_at__isnull=True) | Q(claimed_at__lt=timezone.now() - older_than)
+    return ReviewPhoto.objects.filter(stale, status="processing").update(status="pending")
+
+
+def sweep():
+    """Reencola las fotos a medias y manda al pool todas las pendientes. Devuelve cuántas."""
+    from core.models import ReviewPhoto
+
+    requeue_stale()
+    photo_ids = list(ReviewPhoto.objects.filter(status="pending")
+                     .order_by("id").values_list("id", flat=True))
+    if photo_ids:
+        # Tras confirmar: antes el pool aún vería "processing" las reencoladas
+        transaction.on_commit(lambda: _get_executor().submit(_process_in_thread, photo_ids))
+    return len(photo_ids)
+
+
+def _sweep_on_first_request(sender, **kwargs):
+    request_started.disconnect(dispatch_uid="photos_sweep")
+    if _config()["MODE"] != "thread":
+        return
+    try:
+        # En su propio bloque: si falla no deja rota la transacción de la petición
+        with transaction.atomic():
+            queued = sweep()
+    except DatabaseError:
+        logger.exception("No se pudieron reencolar las fotos pendientes")
+    else:
+        if queued:
+            logger.info("%s fotos pendientes reencoladas", queued)
+
+
+def connect():
+    request_started.connect(_sweep_on_first_request, dispatch_uid="photos_sweep")
+
+
+def process_many(photo_ids):
+    for photo_id in photo_ids:
+        try:
+            process_photo(photo_id)
+        except Exception:
+            logger.exception("Error procesando la foto %s", photo_id)
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _without_alpha(image):
+    return image if image.mode in ("RGB", "L") else image.convert("RGB")
+
+
+def process_photo(photo_id):
+    from core.models import ReviewPhoto
+
+    # Reclamar la foto antes de tocarla: de varios workers (o del pool y un
+    # worker) solo uno pasa de "pending" a "processing"
+    if not ReviewPhoto.objects.filter(pk=photo_id, status="pending").update(
+            status="processing", claimed_at=timezone.now()):
+        return False
+    photo = ReviewPhoto.objects.get(pk=photo_id)
+    try:
+        return _process(photo)
+    except Exception:
+        # Marcarla para que los workers no la reintenten indefinidamente
+        ReviewPhoto.objects.filter(pk=photo.pk).update(status="failed")
+        raise
+
+
+def _process(photo):
+    with photo.photo.open("rb") as original:
+        image = Image.open(original)
+        image.load()
+
+    # Aplicar la orientación EXIF a los píxeles antes de descartar los metadatos
+    image = ImageOps.exif_transpose(image)
+    base, _ = os.path.splitext(os.path.basename(photo.photo.name))
+
+    # Original reescrito sin EXIF (ni GPS): solo píxeles
+    photo.photo.save(f"{base}.jpg", _encode(
+        _without_alpha(image), "JPEG", quality=ORIGINAL_QUALITY, optimize=True),
+        save=False)
+    for field, size in VARIANTS:
+        variant = image.copy()
+        variant.thumbnail((size, size * 4))
+        getattr(photo, field).save(
+            f"{base}_{size}.webp",
+            _encode(variant, "WEBP", quality=WEBP_QUALITY, method=4),
+            save=False)
+
+    photo.width, photo.height = image.size
+    photo.status = "ready"
+    # El original sustituido se libera por recuento de referencias al guardar
+    photo.save(update_fields=[
+        "photo", "width", "height", "status", *[f for f, _ in VARIANTS]])
+    return True
@@ -0,0 +1,355 @@
+"""
+Perfilado de peticiones (se activa con settings.PROFILING["ENABLED"]).
+
+Por cada petición se mide el tiempo total, el tiempo y número de consultas
+(con un execute_wrapper en cada conexión), las consultas repetidas y el tiempo de
+render de plantillas. Con eso:
+
+- se acumulan histogramas por vista en este proceso, visibles en
+  /profiling/ (staff) y en /profiling/metrics/ en formato Prometheus;
+- las consultas lentas van al logger "core.profiling.slow" con la línea del
+  proyecto que las lanzó;
+- una fracción de las peticiones (SAMPLE_RATE) se perfila con cProfile, de
+  una en una, y el resultado se guarda en PROFILE_DIR (o se resume en el log).
+- la respuesta lleva la cabecera Server-Timing.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.template.base import Template
+
+from . import mysqlpool
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("core.profiling.slow")
+
+# Límites superiores (segundos) de los cubos del histograma de duración
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar("profiling_request", default=None)
+
+
+def _config():
+    return {
+        "ENABLED": False,
+        "SAMPLE_RATE": 0.0,
+        "SLOW_QUERY_MS": 200,
+        "PROFILE_DIR": None,
+        "METRICS_TOKEN": None,
+        **getattr(settings, "PROFILING", {}),
+    }
+
+
+class RequestStats:
+    def __init__(self, request, slow_ms):
+        self.request = request
+        self.slow_ms = slow_ms
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.template = None
+        self.seen = Counter()
+
+    @property
+    def duplicates(self):
+        return sum(n - 1 for n in self.seen.values() if n > 1)
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<sin ruta>"
+    return match.url_name or match.view_name
+
+
+def _origin(stats):
+    """
+    Vista, últimas líneas del proyecto en la pila y plantilla en curso. En las
+    vistas async el ORM corre en otro hilo y la pila no llega a la vista.
+    """
+    base = str(settings.BASE_DIR)
+    frames = [frame for frame in traceback.extract_stack()
+              if frame.filename.startswith(base) and frame.filename != __file__
+              and "site-packages" not in frame.filename]
+    origin = " <- ".join([_view_name(stats.request)] + [
+        f"{os.path.relpath(f.filename, base)}:{f.lineno} {f.name}"
+        for f in reversed(frames[-3:])])
+    if stats.template_depth:
+        origin += f" (plantilla {stats.template})"
+    return origin
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    execute_wrapper instalado en todas las conexiones. La petición en curso se
+    toma de una ContextVar, así también se cuentan las consultas de las vistas
+    async, que el ORM lanza desde otro hilo (y otra conexión).
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.db_time += elapsed
+        stats.queries += 1
+        stats.seen[(sql, repr(params))] += 1
+        if elapsed * 1000 >= stats.slow_ms:
+            slow_logger.warning("Consulta lenta (%.1f ms): %s | origen: %s",
+                                elapsed * 1000, sql, _origin(stats))
+
+
+def _install(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    stats = _current.get()
+    # Solo se cronometra la plantilla exterior: las incluidas ya van dentro
+    if stats is None or stats.template_depth:
+        return _original_render(self, context)
+    stats.template_depth += 1
+    stats.template = self.name
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        stats.template_time += time.perf_counter() - started
+        stats.template_depth -= 1
+
+
+class ViewHistogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.db_time = 0.0
+        self.queries = 0
+        self.duplicates = 0
+        self.template_time = 0.0
+        self.max = 0.0
+
+    def observe(self, duration, stats):
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                self.buckets[i] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.db_time += stats.db_time
+        self.queries += stats.queries
+        self.duplicates += stats.duplicates
+        self.template_time += stats.template_time
+
+
+_histograms = {}
+_lock = threading.Lock()
+# cProfile no admite dos perfiles activos a la vez en el mismo proceso
+_profile_lock = threading.Lock()
+
+
+def record(view, duration, stats):
+    with _lock:
+        _histograms.setdefault(view, ViewHistogram()).observe(duration, stats)
+
+
+def snapshot():
+    """{vista: dict con medias y cubos} acumulado en este proceso."""
+    with _lock:
+        items = list(_histograms.items())
+    result = {}
+    for view, h in sorted(items):
+        n = h.count or 1
+        result[view] = {
+            "count": h.count,
+            "avg_ms": round(h.total / n * 1000, 2),
+            "max_ms": round(h.max * 1000, 2),
+            "db_ms": round(h.db_time / n * 1000, 2),
+            "template_ms": round(h.template_time / n * 1000, 2),
+            "queries": round(h.queries / n, 1),
+            "duplicates": round(h.duplicates / n, 1),
+            "buckets": list(zip(BUCKETS, h.buckets)),
+        }
+    return result
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def prometheus_text():
+    with _lock:
+        items = [(view, vars(h).copy()) for view, h in sorted(_histograms.items())]
+    lines = [
+        "# HELP crisol_request_duration_seconds Duración de las peticiones por vista.",
+        "# TYPE crisol_request_duration_seconds histogram",
+    ]
+    for view, h in items:
+        for bound, n in zip(BUCKETS, h["buckets"]):
+            lines.append(f'crisol_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {n}')
+        lines.append(f'crisol_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {h["count"]}')
+        lines.append(f'crisol_request_duration_seconds_sum{{view="{view}"}} {h["total"]:.6f}')
+        lines.append(f'crisol_request_duration_seconds_count{{view="{view}"}} {h["count"]}')
+    for name, key, kind, help_text in (
+            ("crisol_db_seconds_total", "db_time", "counter", "Tiempo en base de datos."),
+            ("crisol_db_queries_total", "queries", "counter", "Consultas ejecutadas."),
+            ("crisol_db_duplicate_queries_total", "duplicates", "counter",
+             "Consultas repetidas dentro de una misma petición."),
+            ("crisol_template_seconds_total", "template_time", "counter",
+             "Tiempo de render de plantillas.")):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for view, h in items:
+            lines.append(f'{name}{{view="{view}"}} {h[key]}')
+    pools = mysqlpool.all_stats()
+    for name, key, kind, help_text in (
+            ("crisol_db_pool_in_use", "in_use", "gauge", "Conexiones prestadas."),
+            ("crisol_db_pool_idle", "idle", "gauge", "Conexiones libres en el pool."),
+            ("crisol_db_pool_checkouts_total", "checkouts", "counter", "Préstamos de conexión."),
+            ("crisol_db_pool_created_total", "created", "counter",
+             "Conexiones abiertas por el pool."),
+            ("crisol_db_pool_waits_total", "waits", "counter",
+             "Préstamos que tuvieron que esperar."),
+            ("crisol_db_pool_wait_seconds_total", "wait_seconds", "counter",
+             "Tiempo total de espera por una conexión."),
+            ("crisol_db_pool_timeouts_total", "timeouts", "counter",
+             "Esperas que agotaron el tiempo.")):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for alias, stats in pools.items():
+            lines.append(f'{name}{{database="{alias}"}} {stats[key]}')
+    return "\n".join(lines) + "\n"
+
+
+class ProfilingMiddleware:
+    """Mide cada petición; no se carga si PROFILING["ENABLED"] es falso."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = _config()
+        if not config["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config["SAMPLE_RATE"]
+        self.slow_ms = config["SLOW_QUERY_MS"]
+        self.profile_dir = config["PROFILE_DIR"]
+        Template.render = _timed_render
+        # Conexiones ya abiertas en este hilo y las que se abran después
+        for alias in connections:
+            _install(connections[alias])
+        connection_created.connect(_install, dispatch_uid="core.profiling")
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        stats = RequestStats(request, self.slow_ms)
+        token = _current.set(stats)
+        profiler = None
+        # Si otra petición se está perfilando, esta no se muestrea
+        if (self.sample_rate and random.random() < self.sample_rate
+                and _profile_lock.acquire(blocking=False)):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except BaseException:
+                _profile_lock.release()
+                raise
+        return stats, token, profiler, time.perf_counter()
+
+    def _stop(self, token, profiler):
+        _current.reset(token)
+        if profiler is not None:
+            try:
+                profiler.disable()
+            finally:
+                _profile_lock.release()
+
+    def _finish(self, request, response, stats, profiler, started):
+        duration = time.perf_counter() - started
+        view = _view_name(request)
+        if profiler is not None:
+            self._save_profile(view, profiler)
+        record(view, duration, stats)
+        response.headers["Server-Timing"] = (
+            f"total;dur={duration * 1000:.1f}, db;dur={stats.db_time * 1000:.1f}, "
+            f"tpl;dur={stats.template_time * 1000:.1f}")
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token, profiler, started = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self._stop(token, profiler)
+        return self._finish(request, response, stats, profiler, started)
+
+    async def __acall__(self, request):
+        stats, token, profiler, started = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._stop(token, profiler)
+        return self._finish(request, response, stats, profiler, started)
+
+    def _save_profile(self, view, profiler):
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{view}-{time.time():.0f}.prof")
+            profiler.dump_stats(path)
+            logger.info("Perfil de %s guardado en %s", view, path)
+        else:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(20)
+            logger.info("Perfil de %s:\n%s", view, out.getvalue())
+
+
+@staff_member_required
+def profiling_dashboard(request):
+    return render(request, "profiling.html", {
+        "views": snapshot(),
+        "buckets": BUCKETS,
+        "pools": mysqlpool.all_stats(),
+        "enabled": _config()["ENABLED"],
+    })
+
+
+def profiling_metrics(request):
+    """Texto para Prometheus: staff o `Authorization: Bearer <METRICS_TOKEN>`."""
+    token = _config()["METRICS_TOKEN"]
+    authorized = request.user.is_active and request.user.is_staff
+    if token and request.headers.get("Authorization") == f"Bearer {token}":
+        authorized = True
+    if not authorized:
+        return HttpResponse(status=403)
+    return HttpResponse(prometheus_text(),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,180 @@
+"""
+Límites de frecuencia para la creación de contenido.
+
+Ventana deslizante aproximada: por cada clave se guardan en la caché los
+contadores de la ventana actual y de la anterior (incrementos atómicos), y la
+anterior pesa según lo que queda de ella. Cuesta dos operaciones de caché por
+límite y no guarda marcas de tiempo por petición.
+
+Los límites se agrupan por ámbito ("review", "post"...). Cada ámbito tiene una
+lista de (tasa, clave), donde la clave es "user" (usuario autenticado, o la IP
+si es anónimo) o "ip". Se aplican con el decorador `ratelimit` en las vistas y
+con `RateLimitMiddleware` para reglas por prefijo de ruta. Todo se puede
+ajustar desde settings (RATE_LIMITS, RATE_LIMIT_RULES, RATE_LIMIT_ENABLED).
+"""
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+DEFAULT_LIMITS = {
+    "review": [("10/h", "user"), ("30/h", "ip")],
+    "post": [("6/m", "user"), ("30/m", "ip")],
+    "thread": [("5/h", "user"), ("20/h", "ip")],
+    "report": [("10/h", "ip")],
+    # Reglas del middleware
+    "api": [("120/m", "ip")],
+    "write": [("60/m", "ip")],
+}
+
+# (prefijo de ruta, ámbito, métodos o None para todos); gana la primera que encaje
+DEFAULT_RULES = [
+    ("/api/", "api", None),
+    ("/", "write", ("POST", "PUT", "PATCH", "DELETE")),
+]
+
+
+def parse_rate(rate):
+    """"10/m" -> (10, 60). Admite también "10/5m"."""
+    count, _, period = rate.partition("/")
+    multiplier = int(period[:-1] or 1)
+    return int(count), multiplier * PERIODS[period[-1]]
+
+
+def get_limits(scope):
+    return getattr(settings, "RATE_LIMITS", {}).get(scope, DEFAULT_LIMITS.get(scope, []))
+
+
+def client_ip(request):
+    header = getattr(settings, "RATE_LIMIT_IP_HEADER", None)
+    if header and request.META.get(header):
+        # p. ej. HTTP_X_FORWARDED_FOR detrás de un proxy de confianza
+        return request.META[header].split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def client_key(request, key):
+    if key == "user":
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"u{user.pk}"
+    return f"ip{client_ip(request)}"
+
+
+def _hit(key, limit, period, now):
+    """Cuenta un intento; devuelve 0 si cabe o los segundos hasta poder reintentar."""
+    window = int(now // period)
+    current_key = f"{key}:{window}"
+    cache.add(current_key, 0, period * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Caducó entre add e incr (o la caché no guarda nada)
+        cache.set(current_key, 1, period * 2)
+        current = 1
+    previous = cache.get(f"{key}:{window - 1}", 0)
+    elapsed = now - window * period
+    if previous * (1 - elapsed / period) + current <= limit:
+        return 0
+
+    # Los intentos rechazados no alargan el bloqueo
+    cache.decr(current_key)
+    current -= 1
+    if current >= limit:
+        wait = period - elapsed + period * (1 - (limit - 1) / current)
+    else:
+        wait = period * (1 - (limit - current - 1) / previous) - elapsed
+    return max(1, math.ceil(wait))
+
+
+def check(request, scope):
+    """Aplica los límites del ámbito; devuelve 0 o el Retry-After en segundos."""
+    if not getattr(settings, "RATE_LIMIT_ENABLED", True):
+        return 0
+    now = time.time()
+    retry_after = 0
+    for rate, key in get_limits(scope):
+        limit, period = parse_rate(rate)
+        cache_key = f"rl:{scope}:{key}:{period}:{client_key(request, key)}"
+        retry_after = max(retry_after, _hit(cache_key, limit, period, now))
+        if retry_after:
+            break
+    return retry_after
+
+
+def too_many_requests(request, retry_after):
+    message = "Demasiadas peticiones. Inténtalo de nuevo más tarde."
+    if request.path.startswith("/api/"):
+        response = JsonResponse({"error": message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type="text/plain; charset=utf-8")
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def ratelimit(scope, methods=("POST",)):
+    """Limita la vista (síncrona o asíncrona) con los límites de `scope`."""
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            async def wrapper(request, *args, **kwargs):
+                if request.method in methods:
+                    retry_after = await sync_to_async(check)(request, scope)
+                    if retry_after:
+                        return too_many_requests(request, retry_after)
+                return await view(request, *args, **kwargs)
+        else:
+            def wrapper(request, *args, **kwargs):
+                if request.method in methods:
+                    retry_after = check(request, scope)
+                    if retry_after:
+                        return too_many_requests(request, retry_after)
+                return view(request, *args, **kwargs)
+        return wraps(view)(wrapper)
+
+    return decorator
+
+
+def match_rule(request):
+    rules = getattr(settings, "RATE_LIMIT_RULES", DEFAULT_RULES)
+    for prefix, scope, methods in rules:
+        if request.path.startswith(prefix) and (methods is None or request.method in methods):
+            return scope
+    return None
+
+
+class RateLimitMiddleware:
+    """Límites por prefijo de ruta (RATE_LIMIT_RULES), en modo síncrono o asíncrono."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        scope = match_rule(request)
+        if scope:
+            retry_after = check(request, scope)
+            if retry_after:
+                return too_many_requests(request, retry_after)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        scope = match_rule(request)
+        if scope:
+            retry_after = await sync_to_async(check)(request, scope)
+            if retry_after:
+                return too_many_requests(request, retry_after)
+        return await self.get_response(request)
@@ -0,0 +1,161 @@
+"""
+Recomendaciones ("también te puede gustar") a partir de las puntuaciones.
+
+`manage.py build_recommendations` monta, con numpy y scipy, la matriz
+dispersa usuario x cerveza con la nota media de cada reseña centrada en la
+media del usuario, y calcula por bloques la similitud coseno entre cervezas.
+Las similitudes con pocos usuarios en común se atenúan (SHRINKAGE). De cada
+cerveza se guardan sus TOP_K vecinas en BeerNeighbor.
+
+La web solo lee esa tabla: la ficha de una cerveza, sus vecinas (una
+consulta por índice); el feed personal, las vecinas de lo último que el
+usuario ha puntuado por encima de su media. numpy y scipy solo hacen falta
+en el proceso que ejecuta el comando.
+"""
+from array import array
+from collections import defaultdict
+
+from django.db import transaction
+
+TOP_K = 20
+# Con n usuarios en común la similitud se multiplica por n / (n + SHRINKAGE)
+SHRINKAGE = 5
+# Quien solo ha puntuado una cerveza no relaciona ninguna con otra
+MIN_USER_REVIEWS = 2
+# Cervezas por bloque del producto de matrices (acota la memoria)
+BLOCK = 2000
+# Reseñas recientes del usuario que se tienen en cuenta en su feed
+FEED_HISTORY = 50
+SIMILAR_LIMIT = 6
+
+
+def _rating(scores):
+    return sum(scores) / len(scores)
+
+
+def rating_matrix():
+    """
+    (matriz CSR usuarios x cervezas centrada por usuario, ids de las
+    columnas). Las reseñas repetidas de un usuario a una cerveza se promedian.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    from .models import RATING_FIELDS, Review
+
+    users, beers = {}, {}
+    rows, cols, values = array("i"), array("i"), array("d")
+    reviews = Review.objects.order_by().values_list("user_name", "beer_id", *RATING_FIELDS)
+    for user_name, beer_id, *scores in reviews.iterator(chunk_size=10000):
+        rows.append(users.setdefault(user_name, len(users)))
+        cols.append(beers.setdefault(beer_id, len(beers)))
+        values.append(_rating(scores))
+    shape = (len(users), len(beers))
+    coords = (np.frombuffer(rows, dtype=np.intc), np.frombuffer(cols, dtype=np.intc))
+    matrix = sparse.csr_matrix((np.frombuffer(values), coords), shape=shape)
+    counts = sparse.csr_matrix((np.ones(len(values)), coords), shape=shape)
+    # Misma estructura en las dos: se suman los duplicados y se dividen
+    matrix.data /= counts.data
+
+    per_user = np.diff(matrix.indptr)
+    means = np.asarray(matrix.sum(axis=1)).ravel() / np.maximum(per_user, 1)
+    matrix.data -= np.repeat(means, per_user)
+    matrix = matrix[per_user >= MIN_USER_REVIEWS]
+    return matrix, np.fromiter(beers, dtype=np.int64, count=len(beers))
+
+
+def neighbors(matrix, beer_ids, top_k=TOP_K, block=BLOCK):
+    """Genera (id de cerveza, [(id de vecina, similitud), ...]) por bloques."""
+    import numpy as np
+    from scipy import sparse
+
+    items = matrix.T.tocsr()
+    rated = items.copy()
+    rated.data[:] = 1
+    norms = np.sqrt(np.asarray(items.multiply(items).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    items = (sparse.diags(1 / norms) @ items).tocsr()
+    items_t, rated_t = items.T.tocsr(), rated.T.tocsr()
+
+    for start in range(0, items.shape[0], block):
+        similarity = (items[start:start + block] @ items_t).tocsr()
+        common = (rated[start:start + block] @ rated_t).tocsr()
+        common.data = common.data / (common.data + SHRINKAGE)
+        similarity = similarity.multiply(common).tocsr()
+        for row in range(similarity.shape[0]):
+            lo, hi = similarity.indptr[row], similarity.indptr[row + 1]
+            cols, values = similarity.indices[lo:hi], similarity.data[lo:hi]
+            keep = (cols != start + row) & (values > 0)
+            cols, values = cols[keep], values[keep]
+            if len(values) > top_k:
+                best = np.argpartition(-values, top_k)[:top_k]
+                cols, values = cols[best], values[best]
+            order = np.argsort(-values, kind="stable")
+            yield int(beer_ids[start + row]), list(zip(
+                beer_ids[cols[order]].tolist(), values[order].tolist()))
+
+
+def store(rows, batch_size=5000):
+    """Sustituye BeerNeighbor en una transacción; devuelve las filas guardadas."""
+    from .models import Beer, BeerNeighbor
+
+    # Se saltan las cervezas borradas mientras se calculaba
+    existing = set(Beer.objects.values_list("id", flat=True).iterator())
+    saved, pending = 0, []
+    with transaction.atomic():
+        BeerNeighbor.objects.all().delete()
+        for beer_id, similar in rows:
+            if beer_id not in existing:
+                continue
+            similar = [pair for pair in similar if pair[0] in existing]
+            pending.extend(BeerNeighbor(beer_id=beer_id, neighbor_id=neighbor_id,
+                                        rank=rank, score=round(score, 4))
+                           for rank, (neighbor_id, score) in enumerate(similar))
+            if len(pending) >= batch_size:
+                BeerNeighbor.objects.bulk_create(pending)
+                saved += len(pending)
+                pending = []
+        BeerNeighbor.objects.bulk_create(pending)
+        saved += len(pending)
+    return saved
+
+
+def build(top_k=TOP_K):
+    matrix, beer_ids = rating_matrix()
+    return store(neighbors(matrix, beer_ids, top_k))
+
+
+def similar_beers(beer_id, limit=SIMILAR_LIMIT):
+    """Consulta de las vecinas de una cerveza, ya con su cervecería."""
+    from .models import BeerNeighbor
+
+    return (BeerNeighbor.objects.filter(beer_id=beer_id)
+            .select_related("neighbor__brewery").order_by("rank")[:limit])
+
+
+def recommended_ids(user_name, limit=20):
+    """
+    Ids de cervezas para el feed de `user_name`, de más a menos recomendada:
+    vecinas de lo que ha puntuado por encima de su media, sin las ya reseñadas.
+    """
+    from .models import RATING_FIELDS, BeerNeighbor, Review
+
+    history = list(Review.objects.filter(user_name=user_name).order_by("-created_at")
+                   .values_list("beer_id", *RATING_FIELDS)[:FEED_HISTORY])
+    if not history:
+        return []
+    ratings = defaultdict(list)
+    for beer_id, *scores in history:
+        ratings[beer_id].append(_rating(scores))
+    mean = sum(_rating(scores) for _, *scores in history) / len(history)
+    weights = {beer_id: sum(values) / len(values) - mean for beer_id, values in ratings.items()}
+    liked = {beer_id: weight for beer_id, weight in weights.items() if weight > 0}
+    # Si todo tiene la misma nota, cuenta todo por igual
+    liked = liked or dict.fromkeys(weights, 1.0)
+
+    scores = defaultdict(float)
+    for beer_id, neighbor_id, score in BeerNeighbor.objects.filter(
+            beer_id__in=liked).values_list("beer_id", "neighbor_id", "score"):
+        if neighbor_id not in weights:
+            scores[neighbor_id] += liked[beer_id] * score
+    return sorted(scores, key=lambda pk: (-scores[pk], pk))[:limit]
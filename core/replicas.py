@@ -0,0 +1,212 @@
+"""
+Lecturas en réplicas y escrituras en la primaria (DATABASE_ROUTERS).
+
+Solo se leen réplicas dentro de una petición que pasa por
+`ReplicaMiddleware`; los comandos, hilos de fondo y transacciones abiertas
+leen siempre de la primaria. Una petición queda "fijada" a la primaria si:
+
+- no es GET/HEAD/OPTIONS,
+- ya ha escrito algo (cualquier `db_for_write`),
+- trae la cookie de fijación, que se pone tras escribir y dura
+  REPLICAS["STICKY_SECONDS"]: así quien acaba de publicar ve su mensaje
+  aunque la réplica vaya con retraso.
+
+Los bloques de la caché (core.caching) se construyen siempre con lecturas
+de la primaria (`primary()`): si no, tras una invalidación la siguiente
+visita anónima guardaría lo que tenga una réplica atrasada durante todo el
+tiempo de vida de la clave.
+
+Cada réplica se comprueba como mucho cada HEALTH_INTERVAL segundos
+(`SELECT 1` y, en MySQL, el retraso de replicación frente a MAX_LAG). Si
+ninguna está sana se lee de la primaria.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_request = ContextVar("replica_request", default=None)
+_force_primary = ContextVar("replica_force_primary", default=False)
+_health = {}
+_health_lock = threading.Lock()
+
+
+def _config():
+    return {
+        "ALIASES": [],
+        "STICKY_SECONDS": 10,
+        "COOKIE_NAME": "crisol_primary",
+        "HEALTH_INTERVAL": 5,
+        "MAX_LAG": 30,
+        **getattr(settings, "REPLICAS", {}),
+    }
+
+
+class RequestRouting:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replication_lag(connection):
+    """Segundos de retraso de una réplica MySQL, o None si no se sabe."""
+    if connection.vendor != "mysql":
+        return None
+    for statement in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(statement)
+                row = cursor.fetchone()
+                columns = [c[0] for c in cursor.description or ()]
+        except DatabaseError:
+            continue
+        if row is None:
+            return None
+        status = dict(zip(columns, row))
+        return status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    return None
+
+
+def check_replica(alias, max_lag):
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except DatabaseError as exc:
+        logger.warning("Réplica %s caída: %s", alias, exc)
+        return False
+    lag = replication_lag(connection)
+    if lag is not None and lag > max_lag:
+        logger.warning("Réplica %s con %s s de retraso", alias, lag)
+        return False
+    return True
+
+
+def is_healthy(alias, config):
+    now = time.monotonic()
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (None, True))
+        due = checked_at is None or now - checked_at >= config["HEALTH_INTERVAL"]
+        if due:
+            # Se apunta ya para que otros hilos no repitan la comprobación
+            _health[alias] = (now, healthy)
+    if not due:
+        return healthy
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        # En el hilo del bucle no se puede usar el ORM: vale el último estado
+        return healthy
+    healthy = check_replica(alias, config["MAX_LAG"])
+    with _health_lock:
+        _health[alias] = (time.monotonic(), healthy)
+    return healthy
+
+
+def healthy_replicas():
+    config = _config()
+    return [alias for alias in config["ALIASES"] if is_healthy(alias, config)]
+
+
+def reset_health():
+    with _health_lock:
+        _health.clear()
+
+
+@contextmanager
+def primary():
+    """Lee de la primaria dentro del bloque (también en sync_to_async y tareas hijas)."""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _request.get()
+        if routing is None or routing.pinned or routing.wrote or _force_primary.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = _request.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *_config()["ALIASES"]}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        if db in _config()["ALIASES"]:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Marca la petición para el router y pone la cookie de fijación tras escribir."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        config = _config()
+        pinned = (request.method not in SAFE_METHODS
+                  or config["COOKIE_NAME"] in request.COOKIES)
+        return _request.set(RequestRouting(pinned)), config
+
+    def _finish(self, response, token, config):
+        routing = _request.get()
+        _request.reset(token)
+        if routing.wrote:
+            response.set_cookie(config["COOKIE_NAME"], "1", max_age=config["STICKY_SECONDS"],
+                                httponly=True, samesite="Lax")
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token, config = self._start(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _request.reset(token)
+            raise
+        return self._finish(response, token, config)
+
+    async def __acall__(self, request):
+        token, config = self._start(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            _request.reset(token)
+            raise
+        return self._finish(response, token, config)
@@ -0,0 +1,98 @@
+"""
+Búsqueda de texto completo sobre cervezas, hilos, mensajes y reseñas.
+
+El motor concreto es intercambiable (`settings.SEARCH_BACKEND`); si no se
+configura se elige según la base de datos: índices FULLTEXT en MySQL y una
+tabla virtual FTS5 en SQLite. Con cualquier otro motor se usa `LIKE`.
+"""
+import re
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+MAX_TERMS = 8
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+DEFAULT_BACKENDS = {
+    "sqlite": "core.search.backends.sqlite.SQLiteFTSBackend",
+    "mysql": "core.search.backends.mysql.MySQLFullTextBackend",
+}
+FALLBACK_BACKEND = "core.search.backends.simple.SimpleBackend"
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    kind: str
+    object_id: int
+    score: float
+
+
+def parse_terms(query):
+    """Palabras de la consulta, en minúsculas y sin operadores del usuario."""
+    return [t.lower() for t in TERM_RE.findall(query or "")][:MAX_TERMS]
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "SEARCH_BACKEND", None) or DEFAULT_BACKENDS.get(
+            connection.vendor, FALLBACK_BACKEND)
+        _backend = import_string(path)()
+    return _backend
+
+
+def search(query, kinds, limit=50):
+    """Devuelve una lista de `SearchHit` ordenada por relevancia."""
+    terms = parse_terms(query)
+    if not terms:
+        return []
+    return get_backend().search(terms, kinds, limit)
+
+
+def ranked_ids(query, kind, limit=50):
+    """Ids de un único tipo de objeto, de más a menos relevante."""
+    return [hit.object_id for hit in search(query, (kind,), limit)]
+
+
+def order_by_ids(queryset, ids):
+    """Filtra `queryset` a `ids` conservando el orden de relevancia."""
+    from django.db.models import Case, IntegerField, When
+
+    if not ids:
+        return queryset.none()
+    ranking = Case(*[When(id=pk, then=pos) for pos, pk in enumerate(ids)],
+                   output_field=IntegerField())
+    return queryset.filter(id__in=ids).order_by(ranking)
+
+
+def _unique(ids):
+    return list(dict.fromkeys(ids))
+
+
+def beer_ids(query, limit=200):
+    """Cervezas por nombre/estilo y, detrás, las que se mencionan en reseñas."""
+    from core.models import Review
+
+    direct = ranked_ids(query, "beer", limit)
+    review_ids = ranked_ids(query, "review", limit)
+    by_review = dict(Review.objects.filter(
+        id__in=review_ids).values_list("id", "beer_id"))
+    via_reviews = [by_review[pk] for pk in review_ids if pk in by_review]
+    return _unique(direct + via_reviews)[:limit]
+
+
+def thread_ids(query, limit=200):
+    """Hilos por título y, detrás, los que tienen mensajes visibles que coinciden."""
+    from core.models import Post
+
+    direct = ranked_ids(query, "thread", limit)
+    post_ids = ranked_ids(query, "post", limit)
+    by_post = dict(Post.objects.filter(
+        id__in=post_ids, is_hidden=False).values_list("id", "thread_id"))
+    via_posts = [by_post[pk] for pk in post_ids if pk in by_post]
+    return _unique(direct + via_posts)[:limit]
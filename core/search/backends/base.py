@@ -0,0 +1,23 @@
+class BaseSearchBackend:
+    """Interfaz común de los motores de búsqueda."""
+
+    # True si el motor necesita que le notifiquemos cada alta/baja/cambio
+    needs_signals = False
+
+    def search(self, terms, kinds, limit):
+        raise NotImplementedError
+
+    def index(self, kind, object_id, title, body):
+        pass
+
+    def index_many(self, kind, documents):
+        """`documents` es un iterable de (id, título, cuerpo)."""
+        for object_id, title, body in documents:
+            self.index(kind, object_id, title, body)
+
+    def remove(self, kind, object_id):
+        pass
+
+    def rebuild(self, batch_size=1000):
+        """Reconstruye el índice completo. Devuelve el nº de documentos."""
+        return 0
@@ -0,0 +1,79 @@
+from django.db import connection
+
+from core.search import SearchHit
+from core.search.backends.base import BaseSearchBackend
+from core.search.documents import DOCUMENTS
+
+# Valores por defecto de InnoDB (innodb_ft_min_token_size y la tabla
+# INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD): MATCH ignora estas palabras
+# y un "+palabra*" con ellas dejaría la búsqueda sin resultados.
+MIN_TOKEN_SIZE = 3
+STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or "
+    "that the this to was what when where who will with und www".split())
+
+
+def split_terms(terms):
+    """Separa los términos que FULLTEXT indexa de los que hay que buscar con LIKE."""
+    fulltext, like = [], []
+    for term in terms:
+        if len(term) < MIN_TOKEN_SIZE or term in STOPWORDS:
+            like.append(term)
+        else:
+            fulltext.append(term)
+    return fulltext, like
+
+
+def _boolean_query(terms):
+    # Todos los términos obligatorios y como prefijo (modo BOOLEAN de MySQL)
+    return " ".join(f"+{term}*" for term in terms)
+
+
+def _like_pattern(term):
+    # Los términos son \w+: sólo "_" es comodín de LIKE
+    return "%" + term.replace("_", r"\_") + "%"
+
+
+def build_query(kind, terms, limit, quote_name=None):
+    """SQL y parámetros de la búsqueda de `terms` en un tipo de objeto."""
+    quote_name = quote_name or connection.ops.quote_name
+    model, title_field, body_field = DOCUMENTS[kind]
+    columns = [quote_name(model._meta.get_field(f).column)
+               for f in (title_field, body_field) if f]
+    table = quote_name(model._meta.db_table)
+    fulltext, like = split_terms(terms)
+
+    conditions, params = [], []
+    if fulltext:
+        match = f"MATCH ({', '.join(columns)}) AGAINST (%s IN BOOLEAN MODE)"
+        score = match
+        conditions.append(match)
+        params += [_boolean_query(fulltext), _boolean_query(fulltext)]
+    else:
+        score = "0"
+    for term in like:
+        # Como icontains: la intercalación por defecto no distingue mayúsculas
+        conditions.append("(" + " OR ".join(f"{c} LIKE %s" for c in columns) + ")")
+        params += [_like_pattern(term)] * len(columns)
+    sql = (f"SELECT id, {score} AS score FROM {table} "
+           f"WHERE {' AND '.join(conditions)} ORDER BY score DESC, id DESC LIMIT %s")
+    return sql, params + [limit]
+
+
+class MySQLFullTextBackend(BaseSearchBackend):
+    """
+    Usa los índices FULLTEXT de InnoDB creados por la migración de búsqueda.
+    InnoDB los mantiene en cada INSERT/UPDATE/DELETE, así que no necesita
+    señales ni reconstrucciones. Las palabras cortas o vacías, que el índice
+    no recoge, se buscan con LIKE.
+    """
+
+    def search(self, terms, kinds, limit):
+        hits = []
+        with connection.cursor() as cursor:
+            for kind in kinds:
+                cursor.execute(*build_query(kind, terms, limit))
+                hits.extend(SearchHit(kind, pk, float(score))
+                            for pk, score in cursor.fetchall())
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+        return hits[:limit]
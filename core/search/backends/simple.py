@@ -0,0 +1,25 @@
+from django.db.models import Q
+
+from core.search import SearchHit
+from core.search.backends.base import BaseSearchBackend
+from core.search.documents import DOCUMENTS
+
+
+class SimpleBackend(BaseSearchBackend):
+    """Búsqueda con `icontains` para motores sin texto completo (sin ranking real)."""
+
+    def search(self, terms, kinds, limit):
+        hits = []
+        for kind in kinds:
+            model, title_field, body_field = DOCUMENTS[kind]
+            condition = Q()
+            for term in terms:
+                term_q = Q()
+                for field in (title_field, body_field):
+                    if field:
+                        term_q |= Q(**{f"{field}__icontains": term})
+                condition &= term_q
+            ids = model.objects.filter(condition).order_by(
+                "-id").values_list("id", flat=True)[:limit]
+            hits.extend(SearchHit(kind, pk, 0.0) for pk in ids)
+        return hits[:limit]
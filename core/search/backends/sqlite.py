@@ -0,0 +1,91 @@
+from django.db import connection
+
+from core.search import SearchHit
+from core.search.backends.base import BaseSearchBackend
+from core.search.documents import DOCUMENTS, document_for
+
+TABLE = "core_search_fts"
+# El rowid de la tabla FTS codifica tipo e id: rowid = id * N + código
+KIND_CODES = {kind: code for code, kind in enumerate(DOCUMENTS)}
+KINDS_BY_CODE = {code: kind for kind, code in KIND_CODES.items()}
+STRIDE = len(KIND_CODES)
+# Pesos bm25 de las columnas (título, cuerpo)
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+
+def _rowid(kind, object_id):
+    return object_id * STRIDE + KIND_CODES[kind]
+
+
+def _match_expression(terms):
+    # Cada término entre comillas (sin sintaxis FTS del usuario) y como prefijo
+    return " ".join('"{}"*'.format(term.replace('"', "")) for term in terms)
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Índice FTS5 propio, mantenido por señales; pensado para desarrollo local."""
+
+    needs_signals = True
+
+    def search(self, terms, kinds, limit):
+        codes = [KIND_CODES[kind] for kind in kinds]
+        placeholders = ", ".join(["%s"] * len(codes))
+        sql = (
+            f"SELECT rowid, bm25({TABLE}, %s, %s) AS score FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s AND rowid %% {STRIDE} IN ({placeholders}) "
+            f"ORDER BY score LIMIT %s"
+        )
+        params = [TITLE_WEIGHT, BODY_WEIGHT, _match_expression(terms), *codes, limit]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        # bm25 devuelve valores negativos: cuanto menor, más relevante
+        return [
+            SearchHit(KINDS_BY_CODE[rowid % STRIDE], rowid // STRIDE, -score)
+            for rowid, score in rows
+        ]
+
+    def index(self, kind, object_id, title, body):
+        rowid = _rowid(kind, object_id)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [rowid])
+            cursor.execute(
+                f"INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                [rowid, title, body])
+
+    def index_many(self, kind, documents):
+        rows = [(_rowid(kind, pk), title, body) for pk, title, body in documents]
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s",
+                               [(row[0],) for row in rows])
+            self._insert_many(cursor, rows)
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s",
+                           [_rowid(kind, object_id)])
+
+    def rebuild(self, batch_size=1000):
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE}")
+            for kind, (model, title_field, body_field) in DOCUMENTS.items():
+                fields = [f for f in ("id", title_field, body_field) if f]
+                batch = []
+                rows = model.objects.order_by().values(*fields).iterator(
+                    chunk_size=batch_size)
+                for row in rows:
+                    batch.append((_rowid(kind, row["id"]), *document_for(kind, row)))
+                    if len(batch) >= batch_size:
+                        self._insert_many(cursor, batch)
+                        total += len(batch)
+                        batch = []
+                if batch:
+                    self._insert_many(cursor, batch)
+                    total += len(batch)
+        return total
+
+    def _insert_many(self, cursor, rows):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)", rows)
@@ -0,0 +1,26 @@
+"""Qué se indexa de cada modelo: un título (más peso) y un cuerpo."""
+from core.models import Beer, Post, Review, Thread
+
+# kind -> (modelo, campo título, campo cuerpo)
+DOCUMENTS = {
+    "beer": (Beer, "name", "style"),
+    "thread": (Thread, "title", None),
+    "post": (Post, None, "body"),
+    "review": (Review, None, "comment"),
+}
+
+KIND_FOR_MODEL = {model: kind for kind, (model, _, _) in DOCUMENTS.items()}
+
+
+def document_for(kind, values):
+    """Extrae (título, cuerpo) de una instancia o de un dict de `.values()`."""
+    _, title_field, body_field = DOCUMENTS[kind]
+
+    def get(field):
+        if field is None:
+            return ""
+        if isinstance(values, dict):
+            return values[field] or ""
+        return getattr(values, field) or ""
+
+    return get(title_field), get(body_field)
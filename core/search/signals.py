@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+
+from core.search import get_backend
+from core.search.documents import DOCUMENTS, KIND_FOR_MODEL, document_for
+
+
+def index_instance(sender, instance, **kwargs):
+    backend = get_backend()
+    if backend.needs_signals:
+        kind = KIND_FOR_MODEL[sender]
+        backend.index(kind, instance.pk, *document_for(kind, instance))
+
+
+def remove_instance(sender, instance, **kwargs):
+    backend = get_backend()
+    if backend.needs_signals:
+        backend.remove(KIND_FOR_MODEL[sender], instance.pk)
+
+
+def connect():
+    for model, _, _ in DOCUMENTS.values():
+        post_save.connect(index_instance, sender=model,
+                          dispatch_uid=f"search_index_{model.__name__}")
+        post_delete.connect(remove_instance, sender=model,
+                            dispatch_uid=f"search_remove_{model.__name__}")
@@ -0,0 +1,33 @@
+// Sugerencias para los campos con data-autocomplete="beer" | "brewery".
+(function () {
+    const url = document.currentScript.dataset.url;
+
+    document.querySelectorAll('input[data-autocomplete]').forEach(function (input, n) {
+        const list = document.createElement('datalist');
+        list.id = 'autocomplete-' + n;
+        input.setAttribute('list', list.id);
+        input.setAttribute('autocomplete', 'off');
+        input.after(list);
+
+        let timer = null;
+        let last = '';
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(async function () {
+                const q = input.value.trim();
+                if (q === last || q.length < 1) return;
+                last = q;
+                const params = new URLSearchParams({q: q, type: input.dataset.autocomplete});
+                const response = await fetch(url + '?' + params);
+                if (!response.ok) return;
+                const data = await response.json();
+                list.replaceChildren(...data.results.map(function (item) {
+                    const option = document.createElement('option');
+                    option.value = item.name;
+                    if (item.brewery) option.label = item.brewery;
+                    return option;
+                }));
+            }, 120);
+        });
+    });
+})();
@@ -0,0 +1,76 @@
+"""
+Almacenamiento direccionado por contenido para las fotos de reseñas.
+
+Cada fichero se guarda como `<prefijo>/ab/cd/<sha256><ext>`: el mismo contenido
+subido dos veces ocupa un único fichero y ningún directorio crece sin límite.
+Los ficheros se escriben por trozos (nunca enteros en memoria) y su borrado lo
+decide el recuento de referencias de `StoredFile` (ver core.models).
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, prefix="", depth=2, width=2, **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix.strip("/")
+        self.depth = depth
+        self.width = width
+
+    def content_name(self, digest, extension):
+        shards = [digest[i * self.width:(i + 1) * self.width]
+                  for i in range(self.depth)]
+        return "/".join(filter(None, [self.prefix, *shards, digest + extension]))
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide el contenido en `_save`; si ya existe
+        # es exactamente el mismo fichero, así que no hay que buscar otro.
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.location, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+            final_name = self.content_name(hasher.hexdigest(), extension)
+            final_path = self.path(final_name)
+            # Aunque ya exista se reemplaza (mismo contenido): así el fichero
+            # vuelve a estar si se borraba a la vez y su fecha indica que se
+            # ha reutilizado (ver core.models._delete_if_unused)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return final_name
+
+    def delete(self, name):
+        super().delete(name)
+        # Podar los directorios de reparto que se hayan quedado vacíos
+        root = os.path.normpath(self.path(self.prefix) if self.prefix else self.location)
+        directory = os.path.dirname(self.path(name))
+        while os.path.normpath(directory).startswith(root) and os.path.normpath(directory) != root:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+def review_photo_storage():
+    return ContentAddressedStorage(prefix="review_photos")
@@ -1,3 +1,1258 @@
-from django.test import TestCase
+import csv
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import (autocomplete, caching, dedup, export, facets, live, metrics, mysqlpool,
+               photos, profiling, recommendations, replicas, search, trending, views)
+from .management.commands import explain_queries
+from .search.backends import mysql as mysql_search
+from .models import (Beer, BeerNeighbor, Brewery, BreweryFacet, BreweryStyleFacet, GroupMetric,
+                     MetricsSnapshot, Post, Report, Review, ReviewPhoto, StoredFile, StyleFacet,
+                     Thread, rebuild_beer_aggregates)
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+class QueryBudgetTestCase(TestCase):
+    """
+    Comprueba que cada vista respeta su presupuesto de consultas y que ese
+    número no crece con la cantidad de filas mostradas (sin N+1). Se mide
+    sin caché: es el coste de un fallo.
+    """
+
+    def setUp(self):
+        self.brewery = Brewery.objects.create(name="Cervecería Base")
+        self.beer = Beer.objects.create(
+            brewery=self.brewery, name="Base Lager", style="Lager")
+        self.thread = Thread.objects.create(
+            beer=self.beer, title="Hilo base", user_name="ana")
+        self.seed(3)
+
+    def seed(self, n):
+        """Añade `n` filas de cada tipo relacionadas con la cerveza/hilo base."""
+        for i in range(n):
+            brewery = Brewery.objects.create(name=f"Cervecería {i}")
+            beer = Beer.objects.create(
+                brewery=brewery, name=f"Cerveza {i}", style=f"Estilo {i}")
+            review = Review.objects.create(
+                beer=self.beer, user_name=f"user{i}", comment="rica",
+                aroma=4, sabor=4, cuerpo=3, apariencia=5)
+            ReviewPhoto.objects.create(review=review, photo=f"review_photos/{i}.jpg")
+            Review.objects.create(
+                beer=beer, user_name=f"user{i}", comment="rica",
+                aroma=3, sabor=3, cuerpo=3, apariencia=3)
+            thread = Thread.objects.create(
+                beer=beer, title=f"Hilo {i}", user_name=f"user{i}")
+            Post.objects.create(thread=thread, user_name="ana", body="hola")
+            Post.objects.create(thread=self.thread, user_name=f"user{i}", body="hola")
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertQueryBudget(self, url, budget):
+        before = self.count_queries(url)
+        self.seed(5)
+        after = self.count_queries(url)
+        self.assertLessEqual(
+            after, budget, f"{url} usa {after} consultas (presupuesto: {budget})")
+        self.assertEqual(
+            before, after, f"{url} pasa de {before} a {after} consultas al crecer los datos")
+
+    def test_home(self):
+        # hilos en tendencia, cervezas destacadas y cervezas en tendencia
+        self.assertQueryBudget(reverse("home"), 3)
+
+    def test_beer_list(self):
+        self.assertQueryBudget(reverse("beer_list"), 3)
+
+    def test_beer_detail(self):
+        # cerveza, reseñas, fotos, número de hilos y cervezas parecidas
+        self.assertQueryBudget(reverse("beer_detail", args=[self.beer.id]), 5)
+
+    def test_threads_list(self):
+        self.assertQueryBudget(reverse("threads_list"), 1)
+
+    def test_thread_detail(self):
+        self.assertQueryBudget(reverse("thread_detail", args=[self.thread.id]), 2)
+
+    def test_authenticated_thread_detail(self):
+        user = User.objects.create_user("bob", password="secreta-123")
+        self.client.force_login(user)
+        # + sesión y usuario
+        self.assertQueryBudget(reverse("thread_detail", args=[self.thread.id]), 4)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.thread = Thread.objects.create(title="Largo", user_name="ana")
+        for i in range(45):
+            Post.objects.create(thread=self.thread, user_name="ana", body=f"p{i}")
+
+    def test_walks_forward_and_back(self):
+        url = reverse("thread_detail", args=[self.thread.id])
+        seen, pages, cursor = [], [], None
+        while True:
+            page = self.client.get(url, {"cursor": cursor} if cursor else {}).context["page_obj"]
+            pages.append(page)
+            seen += [post.body for post in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, [f"p{i}" for i in range(45)])
+        self.assertEqual(len(pages), 3)
+        back = self.client.get(url, {"cursor": pages[2].previous_cursor}).context["page_obj"]
+        self.assertEqual([p.id for p in back], [p.id for p in pages[1]])
+
+    def test_counters_follow_hidden_posts(self):
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.post_count, 45)
+        post = self.thread.posts.last()
+        post.is_hidden = True
+        post.save()
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.post_count, 44)
+        self.assertLess(self.thread.last_post_at, post.created_at)
+
+        stale = Thread.objects.get(pk=self.thread.pk)
+        Post.objects.create(thread=self.thread, user_name="eva", body="nueva")
+        stale.title = "Largo (editado)"
+        stale.save()
+        self.thread.refresh_from_db()
+        self.assertEqual((self.thread.title, self.thread.post_count), ("Largo (editado)", 45))
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_search_results_are_paginated(self):
+        Thread.objects.bulk_create([Thread(title=f"Lager {i}", user_name="ana") for i in range(25)])
+        self.assertFalse(Thread.objects.filter(last_post_at__isnull=True).exists())
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        url = reverse("threads_list")
+        first = self.client.get(url, {"q": "lager"})
+        self.assertEqual(len(first.context["page_obj"]), 20)
+        self.assertContains(first, "&q=lager")
+        cursor = first.context["page_obj"].next_cursor
+        second = self.client.get(url, {"q": "lager", "cursor": cursor}).context["page_obj"]
+        self.assertEqual(len(second), 5)
+        self.assertFalse(second.has_next)
+        titles = {t.title for t in first.context["page_obj"]} | {t.title for t in second}
+        self.assertEqual(len(titles), 25)
+
+
+@skipUnless(connection.vendor == "sqlite", "índice FTS5 de SQLite")
+class SearchBackendTests(TestCase):
+    def setUp(self):
+        self.brewery = Brewery.objects.create(name="Mahou")
+
+    def test_title_matches_rank_first(self):
+        by_style = Beer.objects.create(brewery=self.brewery, name="Oscura", style="Porter")
+        by_name = Beer.objects.create(brewery=self.brewery, name="Porter Negra", style="Stout")
+        Beer.objects.create(brewery=self.brewery, name="Rubia", style="Lager")
+        self.assertEqual(search.ranked_ids("porter", "beer"), [by_name.id, by_style.id])
+        # Prefijos, todos los términos obligatorios y sin sintaxis FTS del usuario
+        self.assertEqual(search.ranked_ids("port neg", "beer"), [by_name.id])
+        self.assertEqual(search.ranked_ids('"porter* NOT', "beer"), [])
+        self.assertEqual(search.ranked_ids('porter"', "beer"), [by_name.id, by_style.id])
+
+    def test_hidden_posts_do_not_surface_threads(self):
+        visible = Thread.objects.create(title="Cervezas de trigo", user_name="ana")
+        hidden = Thread.objects.create(title="Otro tema", user_name="ana")
+        Post.objects.create(thread=hidden, user_name="eva", body="weizen", is_hidden=True)
+        Post.objects.create(thread=visible, user_name="eva", body="una weizen fría")
+        self.assertEqual(search.thread_ids("weizen"), [visible.id])
+
+    def test_index_follows_saves_and_deletes(self):
+        thread = Thread.objects.create(title="Rubias de abadía", user_name="ana")
+        self.assertEqual(search.ranked_ids("abadía", "thread"), [thread.id])
+        thread.title = "Tostadas"
+        thread.save()
+        self.assertEqual(search.ranked_ids("abadía", "thread"), [])
+        self.assertEqual(search.ranked_ids("tostadas", "thread"), [thread.id])
+        thread.delete()
+        self.assertEqual(search.ranked_ids("tostadas", "thread"), [])
+
+
+class MySQLQueryTests(SimpleTestCase):
+    def build(self, kind, terms):
+        return mysql_search.build_query(kind, terms, 20, quote_name=lambda name: f"`{name}`")
+
+    def test_fulltext_terms_use_match(self):
+        sql, params = self.build("beer", ["porter", "negra"])
+        match = "MATCH (`name`, `style`) AGAINST (%s IN BOOLEAN MODE)"
+        self.assertEqual(sql, f"SELECT id, {match} AS score FROM `core_beer` WHERE {match} "
+                              "ORDER BY score DESC, id DESC LIMIT %s")
+        self.assertEqual(params, ["+porter* +negra*", "+porter* +negra*", 20])
+
+    def test_short_terms_and_stopwords_fall_back_to_like(self):
+        sql, params = self.build("beer", ["ipa", "de", "the", "a_"])
+        self.assertIn("WHERE MATCH (`name`, `style`) AGAINST (%s IN BOOLEAN MODE) AND "
+                      "(`name` LIKE %s OR `style` LIKE %s) AND "
+                      "(`name` LIKE %s OR `style` LIKE %s) AND "
+                      "(`name` LIKE %s OR `style` LIKE %s) ORDER BY", sql)
+        self.assertEqual(params, ["+ipa*", "+ipa*", "%de%", "%de%", "%the%", "%the%",
+                                  r"%a\_%", r"%a\_%", 20])
+
+    def test_only_like_terms_skip_match(self):
+        sql, params = self.build("thread", ["la", "tu"])
+        self.assertEqual(sql, "SELECT id, 0 AS score FROM `core_thread` "
+                              "WHERE (`title` LIKE %s) AND (`title` LIKE %s) "
+                              "ORDER BY score DESC, id DESC LIMIT %s")
+        self.assertEqual(params, ["%la%", "%tu%", 20])
+
+
+class BeerAggregateTests(TestCase):
+    def setUp(self):
+        self.beer = Beer.objects.create(brewery=Brewery.objects.create(name="Mahou"), name="Clásica")
+
+    def review(self, score, **kwargs):
+        return Review.objects.create(beer=self.beer, user_name="ana", comment="-", aroma=score,
+                                     sabor=score, cuerpo=score, apariencia=score, **kwargs)
+
+    def aggregates(self):
+        return Beer.objects.filter(pk=self.beer.pk).values_list(
+            "review_count", "aroma_sum", "avg_rating").get()
+
+    def test_create_edit_and_delete_update_aggregates(self):
+        first = self.review(4)
+        self.review(2)
+        self.assertEqual(self.aggregates(), (2, 6, Decimal("3.00")))
+        first.aroma = first.sabor = first.cuerpo = first.apariencia = 5
+        first.save()
+        self.assertEqual(self.aggregates(), (2, 7, Decimal("3.50")))
+        first.delete()
+        self.assertEqual(self.aggregates(), (1, 2, Decimal("2.00")))
+        self.assertEqual(rebuild_beer_aggregates(fix=False), [])
+
+    def test_stale_save_keeps_concurrent_increments(self):
+        stale = Beer.objects.get(pk=self.beer.pk)
+        self.review(4)  # otra petición suma con F() entretanto
+        stale.name = "Clásica 2"
+        stale.save()
+        self.assertEqual(self.aggregates(), (1, 4, Decimal("4.00")))
+        self.assertEqual(Beer.objects.get(pk=self.beer.pk).normalized_name, "clasica 2")
+
+    def test_rebuild_detects_drifted_averages(self):
+        self.review(4)
+        Beer.objects.filter(pk=self.beer.pk).update(avg_rating=1)
+        self.assertEqual(rebuild_beer_aggregates(), [self.beer.pk])
+        self.assertEqual(self.aggregates(), (1, 4, Decimal("4.00")))
+        Beer.objects.filter(pk=self.beer.pk).update(bayes_rating=5)
+        self.assertEqual(rebuild_beer_aggregates(), [self.beer.pk])
+        self.assertEqual(rebuild_beer_aggregates(fix=False), [])
+
+
+def jpeg_bytes(size=(40, 20), **exif_tags):
+    exif = Image.Exif()
+    for tag, value in exif_tags.items():
+        exif[int(tag)] = value
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "orange").save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@override_settings(PHOTO_PIPELINE={"MODE": "worker"})
+class PhotoPipelineTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.beer = Beer.objects.create(brewery=Brewery.objects.create(name="Mahou"), name="Clásica")
+        review = Review.objects.create(beer=self.beer, user_name="ana", comment="-",
+                                       aroma=3, sabor=3, cuerpo=3, apariencia=3)
+        # Orientación 6 (girada 90°) y marca de la cámara en el EXIF
+        self.photo = ReviewPhoto(review=review)
+        self.photo.photo.save("movil.jpg", ContentFile(jpeg_bytes(**{"274": 6, "271": "Cam"})))
+
+    def test_processing_strips_exif_and_rotates(self):
+        self.assertEqual(self.photo.display_url, "")
+        self.assertTrue(photos.process_photo(self.photo.id))
+        self.photo.refresh_from_db()
+        self.assertEqual((self.photo.status, self.photo.width, self.photo.height), ("ready", 20, 40))
+        with self.photo.photo.open("rb") as original:
+            self.assertEqual(dict(Image.open(original).getexif()), {})
+        self.assertTrue(self.photo.display_url.endswith(".webp"))
+        # Ya no está pendiente: no se procesa otra vez
+        self.assertFalse(photos.process_photo(self.photo.id))
+
+    def test_claimed_photo_is_skipped_by_other_workers(self):
+        ReviewPhoto.objects.filter(pk=self.photo.pk).update(status="processing")
+        self.assertFalse(photos.process_photo(self.photo.id))
+        self.photo.refresh_from_db()
+        self.assertEqual((self.photo.status, self.photo.width), ("processing", None))
+
+    def test_first_request_sweeps_stale_and_pending_photos(self):
+        busy = ReviewPhoto.objects.create(review=self.photo.review, photo=self.photo.photo.name,
+                                          status="processing", claimed_at=timezone.now())
+        ReviewPhoto.objects.filter(pk=self.photo.pk).update(
+            status="processing", claimed_at=timezone.now() - timedelta(hours=1))
+        executor = mock.Mock()
+        with override_settings(PHOTO_PIPELINE={"MODE": "thread"}), \
+                mock.patch.object(photos, "_get_executor", return_value=executor):
+            photos.connect()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get(reverse("home"))
+                self.client.get(reverse("home"))
+        executor.submit.assert_called_once_with(photos._process_in_thread, [self.photo.id])
+        busy.refresh_from_db()
+        self.assertEqual(busy.status, "processing")
+
+    def test_requeue_stale_photos(self):
+        claimed = ReviewPhoto.objects.filter(pk=self.photo.pk)
+        claimed.update(status="processing", claimed_at=timezone.now())
+        self.assertEqual(photos.requeue_stale(), 0)
+        self.assertEqual(photos.requeue_stale(timedelta(0)), 1)
+        # Sin fecha de reclamación (anteriores a claimed_at): a medias
+        claimed.update(status="processing", claimed_at=None)
+        self.assertEqual(photos.requeue_stale(), 1)
+        self.assertTrue(photos.process_photo(self.photo.id))
+
+    @override_settings(CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+    def test_unprocessed_photo_is_not_shown(self):
+        url = reverse("beer_detail", args=[self.beer.id])
+        self.assertNotContains(self.client.get(url), "review_photos/")
+        photos.process_photo(self.photo.id)
+        self.assertContains(self.client.get(url), "review_photos/")
+
+
+@override_settings(PHOTO_PIPELINE={"MODE": "worker"})
+class StoredFileTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        beer = Beer.objects.create(brewery=Brewery.objects.create(name="Mahou"), name="Clásica")
+        self.review = Review.objects.create(beer=beer, user_name="ana", comment="-",
+                                            aroma=3, sabor=3, cuerpo=3, apariencia=3)
+        self.content = jpeg_bytes()
+
+    def upload(self, name):
+        photo = ReviewPhoto(review=self.review)
+        photo.photo.save(name, ContentFile(self.content))
+        return photo
+
+    def refcount(self, name):
+        return StoredFile.objects.filter(name=name).values_list("refcount", flat=True).first()
+
+    def test_same_content_is_stored_once_and_released_by_refcount(self):
+        first, second = self.upload("a.JPG"), self.upload("b.jpg")
+        digest = hashlib.sha256(self.content).hexdigest()
+        name = f"review_photos/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+        self.assertEqual((first.photo.name, second.photo.name), (name, name))
+        self.assertEqual(self.refcount(name), 2)
+        storage = first.photo.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(storage.exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertIsNone(self.refcount(name))
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(os.path.exists(os.path.dirname(storage.path(name))))
+
+    def test_reupload_during_release_keeps_the_file(self):
+        photo = self.upload("a.jpg")
+        name, storage = photo.photo.name, photo.photo.storage
+        with self.captureOnCommitCallbacks() as callbacks:
+            photo.delete()
+        # Otra petición sube el mismo contenido antes de que se borre
+        time.sleep(0.01)
+        again = ReviewPhoto(review=self.review)
+        again.photo.save("b.jpg", ContentFile(self.content), save=False)
+        for callback in callbacks:
+            callback()
+        again.save()
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+    def test_acquired_before_delete_keeps_the_file(self):
+        photo = self.upload("a.jpg")
+        name, storage = photo.photo.name, photo.photo.storage
+        with self.captureOnCommitCallbacks() as callbacks:
+            photo.delete()
+        self.upload("b.jpg")
+        for callback in callbacks:
+            callback()
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+
+class CachingTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        # Los ids se reutilizan entre tests: que no hereden bloques de este
+        self.addCleanup(cache.clear)
+        brewery = Brewery.objects.create(name="B")
+        self.beer = Beer.objects.create(brewery=brewery, name="Negra", style="Stout")
+
+    def test_beer_reviews_are_cached_and_invalidated(self):
+        url = reverse("beer_detail", args=[self.beer.id])
+        self.client.get(url)
+        with self.assertNumQueries(1):  # solo la cerveza
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(beer=self.beer, user_name="eva", comment="muy buena",
+                                  aroma=5, sabor=5, cuerpo=5, apariencia=5)
+        self.assertContains(self.client.get(url), "muy buena")
+
+    def test_moving_a_thread_invalidates_both_beers(self):
+        from django.core.cache import cache
+        other = Beer.objects.create(brewery=self.beer.brewery, name="Rubia", style="Lager")
+        thread = Thread.objects.create(title="Cata", user_name="ana", beer=self.beer)
+        keys = [caching.beer_reviews_key(beer.id) for beer in (self.beer, other)]
+        cache.set_many(dict.fromkeys(keys, "x"))
+        with self.captureOnCommitCallbacks(execute=True):
+            thread.beer = other
+            thread.save()
+        self.assertEqual(cache.get_many(keys), {})
+
+        cache.set_many(dict.fromkeys(keys, "x"))
+        with self.captureOnCommitCallbacks(execute=True):
+            thread.save(update_fields=["title"])
+        self.assertEqual(cache.get_many(keys), {keys[0]: "x"})
+
+
+class LiveUpdatesTests(TestCase):
+    def setUp(self):
+        self.thread = Thread.objects.create(title="En directo", user_name="ana")
+        self.first = Post.objects.create(thread=self.thread, user_name="ana", body="primera")
+
+    def test_stream_sends_backlog_then_published_posts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            second = Post.objects.create(thread=self.thread, user_name="eva", body="segunda")
+            Post.objects.create(thread=self.thread, user_name="eva", body="oculta", is_hidden=True)
+
+        async def scenario():
+            stream = live.thread_event_stream(self.thread.id, last_event_id=0)
+            events = [await anext(stream) for _ in range(3)]  # retry + 2 atrasadas
+            channel = live.thread_channel(self.thread.id)
+            # Lo ya enviado no se repite
+            live.get_broker().publish(channel, live.post_payload(second))
+            live.get_broker().publish(channel, {"id": second.id + 1, "body": "nueva"})
+            events.append(await anext(stream))
+            await stream.aclose()
+            return events
+
+        events = async_to_sync(scenario)()
+        self.assertTrue(events[0].startswith("retry:"))
+        self.assertIn(f"id: {self.first.id}\n", events[1])
+        self.assertIn(f"id: {second.id}\n", events[2])
+        self.assertNotIn("oculta", "".join(events))
+        data = json.loads(events[3].split("data: ", 1)[1])
+        self.assertEqual(data, {"id": second.id + 1, "body": "nueva"})
+        self.assertEqual(live.get_broker().connection_count(), 0)
+
+    def test_idle_stream_holds_no_connection(self):
+        def open_connections():
+            return sum(c.connection is not None for c in connections.all(initialized_only=True))
+
+        async def scenario():
+            # Como la consulta de la vista (las tablas del test están bloqueadas
+            # para otras conexiones hasta el rollback)
+            await sync_to_async(lambda: connections["default"].ensure_connection())()
+            self.assertEqual(await sync_to_async(open_connections)(), 1)
+            stream = live.thread_event_stream(self.thread.id)
+            self.assertTrue((await anext(stream)).startswith("retry:"))
+            self.assertEqual(await anext(stream), ": ping\n\n")
+            idle = await sync_to_async(open_connections)()
+            await stream.aclose()
+            return idle
+
+        def worker():
+            # Hilo propio, como cada petición ASGI; SQLite en memoria ignora
+            # close() y aquí la base sigue abierta por la conexión del test
+            with mock.patch.object(type(connections["default"]), "is_in_memory_db",
+                                   return_value=False):
+                try:
+                    result.append(async_to_sync(scenario)())
+                finally:
+                    connections.close_all()
+
+        result = []
+        with mock.patch.object(live, "HEARTBEAT", 0.01):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        self.assertEqual(result, [0])
+
+    @override_settings(LIVE_UPDATES={"BROKER": "redis"})
+    def test_redis_broker_without_package_is_a_configuration_error(self):
+        self.addCleanup(setattr, live, "_broker", live._broker)
+        live._broker = None
+        with mock.patch.dict(sys.modules, {"redis": None}), \
+                self.assertRaisesMessage(ImproperlyConfigured, "pip install redis"):
+            live.get_broker()
+
+    @skipUnless(importlib.util.find_spec("redis") is None, "redis instalado")
+    def test_redis_options_without_package_fail_at_startup(self):
+        for variable in ("CERVEZAS_CACHE", "LIVE_BROKER"):
+            result = subprocess.run(
+                [sys.executable, "-c", "import cervezas.settings"], cwd=settings.BASE_DIR,
+                env={**os.environ, variable: "redis"}, capture_output=True, text=True)
+            self.assertNotEqual(result.returncode, 0)
+            self.assertIn(f"ImproperlyConfigured: {variable}=redis necesita", result.stderr)
+
+    def test_stream_only_under_asgi(self):
+        url = reverse("thread_detail", args=[self.thread.id])
+        self.assertNotContains(self.client.get(url), "data-stream")
+        events = reverse("thread_events", args=[self.thread.id])
+        self.assertEqual(self.client.get(events).status_code, 204)
+
+        async def page():
+            return await self.async_client.get(url)
+
+        self.assertContains(async_to_sync(page)(), "data-stream")
+
+    def test_new_visible_post_is_published_on_commit(self):
+        with mock.patch.object(live.get_broker(), "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                Post.objects.create(thread=self.thread, user_name="eva", body="visible")
+                Post.objects.create(thread=self.thread, user_name="eva", body="no", is_hidden=True)
+        self.assertEqual([c.args[1]["body"] for c in publish.call_args_list], ["visible"])
+
+
+@override_settings(RATE_LIMITS={"post": [("2/m", "user")], "report": [("1/h", "ip")]})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.thread = Thread.objects.create(title="Limitado", user_name="ana")
+        self.client.force_login(User.objects.create_user("ana"))
+
+    def test_replies_over_the_limit_get_429(self):
+        url = reverse("thread_detail", args=[self.thread.id])
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {"body": "hola"}).status_code, 302)
+        response = self.client.post(url, {"body": "hola"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+        self.assertEqual(self.thread.posts.count(), 2)
+        # Leer no cuenta
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_sync_view_is_limited_per_ip(self):
+        url = reverse("report_create", args=["post", 1])
+        data = {"object_type": "post", "object_id": 1, "user_name": "ana", "reason": "spam"}
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertEqual(self.client.post(url, data).status_code, 429)
+
+
+class ModerationQueueTests(TestCase):
+    def setUp(self):
+        self.thread = Thread.objects.create(title="Denunciado", user_name="ana")
+        self.posts = [Post.objects.create(thread=self.thread, user_name="eva", body=f"spam {i}")
+                      for i in range(3)]
+        beer = Beer.objects.create(brewery=Brewery.objects.create(name="B"), name="Rubia")
+        self.review = Review.objects.create(beer=beer, user_name="eva", comment="reseña mala",
+                                            aroma=1, sabor=1, cuerpo=1, apariencia=1)
+        for post in self.posts:
+            for n in range(2):
+                Report.objects.create(object_type="post", object_id=post.id,
+                                      user_name=f"u{n}", reason="spam")
+        Report.objects.create(object_type="review", object_id=self.review.id,
+                              user_name="u0", reason="ofensiva")
+        self.staff = User.objects.create_user("mod", password="x", is_staff=True)
+
+    def test_requires_staff(self):
+        url = reverse("moderation_list")
+        targets = [f"post:{p.id}" for p in self.posts]
+        self.client.force_login(User.objects.create_user("eva", password="x"))
+        for response in (self.client.get(url),
+                         self.client.post(url, {"action": "hide", "targets": targets})):
+            self.assertRedirects(response, f"{reverse('admin:login')}?next={url}",
+                                 fetch_redirect_response=False)
+        self.assertFalse(Post.objects.filter(is_hidden=True).exists())
+        self.assertEqual(Report.objects.filter(status="open").count(), 7)
+
+    def test_single_target_action_is_a_staff_post(self):
+        report = Report.objects.filter(object_type="post", object_id=self.posts[0].id).first()
+        url = reverse("moderation_action", args=[report.id, "hide"])
+        self.assertEqual(self.client.post(url).status_code, 302)
+        self.assertFalse(Post.objects.filter(is_hidden=True).exists())
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertRedirects(self.client.post(url), reverse("moderation_list"),
+                             fetch_redirect_response=False)
+        self.assertEqual(list(Post.objects.filter(is_hidden=True)), [self.posts[0]])
+        self.assertEqual(Report.objects.filter(status="open").count(), 5)
+        # Los botones de cada fila envían el formulario a esta vista
+        last = Report.objects.filter(object_type="post", object_id=self.posts[1].id).latest("id")
+        button = reverse("moderation_action", args=[last.id, "close"])
+        self.assertContains(self.client.get(reverse("moderation_list")), f'formaction="{button}"')
+
+    def test_reporting_returns_to_the_reported_content(self):
+        data = {"object_type": "review", "object_id": self.review.id,
+                "user_name": "ana", "reason": "spam"}
+        response = self.client.post(reverse("report_create", args=["review", self.review.id]),
+                                    data, follow=True)
+        self.assertRedirects(response, reverse("beer_detail", args=[self.review.beer_id]))
+        self.assertContains(response, "tu denuncia se ha enviado")
+        data.update(object_type="post", object_id=self.posts[0].id)
+        response = self.client.post(reverse("report_create", args=["post", self.posts[0].id]),
+                                    data)
+        self.assertRedirects(response, reverse("thread_detail", args=[self.thread.id]),
+                             fetch_redirect_response=False)
+
+    def test_queue_groups_reports_with_constant_queries(self):
+        self.client.force_login(self.staff)
+        # sesión, usuario, grupos, posts, reseñas, motivos, total
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse("moderation_list"))
+        self.assertEqual(len(response.context["groups"]), 4)
+        self.assertEqual(response.context["groups"][0]["report_count"], 2)
+        self.assertContains(response, "reseña mala")
+
+    def test_bulk_hide_closes_reports_and_updates_counters(self):
+        self.client.force_login(self.staff)
+        targets = [f"post:{p.id}" for p in self.posts[:2]] + [f"review:{self.review.id}"]
+        self.client.post(reverse("moderation_list"), {"action": "hide", "targets": targets})
+        self.assertEqual(Post.objects.filter(is_hidden=True).count(), 2)
+        self.assertEqual(Report.objects.filter(status="open").count(), 2)
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.post_count, 1)
+
+
+class MetricsSnapshotTests(TestCase):
+    def test_dashboard_reads_only_snapshots(self):
+        beer = Beer.objects.create(brewery=Brewery.objects.create(name="B"), name="Tostada",
+                                   style="Ale")
+        Review.objects.create(beer=beer, user_name="eva", comment="bien",
+                              aroma=4, sabor=4, cuerpo=4, apariencia=4)
+        Thread.objects.create(title="Hola", user_name="eva")
+        self.assertEqual(metrics.refresh_daily_activity(), 1)
+        # Incremental: vuelve a contar solo el último día
+        self.assertEqual(metrics.refresh_daily_activity(), 1)
+        snapshot = metrics.take_snapshot()
+        self.assertEqual((snapshot.reviews, snapshot.threads), (1, 1))
+        self.assertEqual(snapshot.top_beers[0]["name"], "Tostada")
+        self.assertEqual(snapshot.groups.get(dimension="style").avg_rating, 4)
+
+        url = reverse("admin_metrics")
+        self.assertEqual(url, "/metrics/")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        # sesión, usuario, foto, histórico, grupos, actividad
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertContains(response, "Tostada")
+
+    def test_old_snapshots_are_pruned(self):
+        Beer.objects.create(brewery=Brewery.objects.create(name="B"), name="Tostada", style="Ale")
+        for _ in range(4):
+            metrics.take_snapshot()
+        kept = list(MetricsSnapshot.objects.values_list("id", flat=True)[:2])
+        out = io.StringIO()
+        call_command("refresh_metrics", "--keep", "3", stdout=out)
+        self.assertIn("2 fotos antiguas borradas", out.getvalue())
+        self.assertEqual(list(MetricsSnapshot.objects.values_list("id", flat=True)[1:]), kept)
+        self.assertEqual(GroupMetric.objects.values("snapshot").distinct().count(), 3)
+        self.assertEqual(metrics.prune_snapshots(3), 0)
+
+
+class BeerNameLookupTests(TestCase):
+    def test_matching_compares_normalized_names(self):
+        beer = Beer.objects.create(brewery=Brewery.objects.create(name="B"), name="Mahou 5★")
+        self.assertEqual(Beer.matching("  MAHOU 5 ").get(), beer)
+        self.assertFalse(Beer.matching("★").exists())
+
+
+class DedupTests(TestCase):
+    def review(self, beer):
+        return Review.objects.create(beer=beer, user_name="ana", comment="ok",
+                                     aroma=4, sabor=4, cuerpo=4, apariencia=4)
+
+    def test_similarity_tolerates_typos_but_not_other_words(self):
+        def score(a, b):
+            return dedup.similarity(dedup.name_tokens(a), dedup.name_tokens(b))
+        self.assertEqual(score("Mahou Cinco Estrellas", "mahou 5★"), 1.0)
+        self.assertGreater(score("Mahou 5 Estrellas", "Mahou 5 Estrelas"), dedup.THRESHOLD)
+        self.assertLess(score("Alhambra Reserva 1925", "Alhambra Reserva Roja"), dedup.THRESHOLD)
+        self.assertLess(score("Mahou 5 Estrellas", "Mahou 7 Estrellas"), dedup.THRESHOLD)
+
+    def test_merge_moves_reviews_and_threads_to_the_canonical_beer(self):
+        mahou = Brewery.objects.create(name="Mahou")
+        Brewery.objects.create(name="Cervecería Mahou")
+        unknown = Brewery.objects.create(name="Desconocida")
+        other = Brewery.objects.create(name="Otra")
+        canonical = Beer.objects.create(brewery=mahou, name="Mahou 5 Estrellas", style="Lager")
+        typo = Beer.objects.create(brewery=unknown, name="mahou cinco estrelas", style="?")
+        namesake = Beer.objects.create(brewery=other, name="Mahou 5 Estrellas", style="Lager")
+        for beer in (canonical, canonical, typo, namesake):
+            self.review(beer)
+        thread = Thread.objects.create(beer=typo, title="¿Qué tal?", user_name="ana")
+
+        call_command("dedup_catalog", apply=True, stdout=io.StringIO())
+
+        self.assertFalse(Brewery.objects.filter(name="Cervecería Mahou").exists())
+        self.assertFalse(Beer.objects.filter(pk=typo.pk).exists())
+        canonical.refresh_from_db()
+        self.assertEqual(canonical.review_count, 3)
+        self.assertEqual(Review.objects.filter(beer=canonical).count(), 3)
+        thread.refresh_from_db()
+        self.assertEqual(thread.beer, canonical)
+        # Mismo nombre en otra cervecería: es otra cerveza
+        self.assertTrue(Beer.objects.filter(pk=namesake.pk).exists())
+        self.assertEqual(rebuild_beer_aggregates(fix=False), [])
+
+
+class ExplainQueriesTests(TestCase):
+    def test_every_default_path_is_explained_as_staff(self):
+        beer = Beer.objects.create(brewery=Brewery.objects.create(name="B"), name="Negra",
+                                   style="Stout")
+        thread = Thread.objects.create(title="Hola", user_name="ana", beer=beer)
+        post = Post.objects.create(thread=thread, user_name="eva", body="spam")
+        Report.objects.create(object_type="post", object_id=post.id, user_name="u", reason="spam")
+        out = io.StringIO()
+        call_command("explain_queries", stdout=out)
+        output = out.getvalue()
+        paths = explain_queries.default_paths()
+        self.assertIn(reverse("moderation_list"), paths)
+        self.assertIn(reverse("thread_detail", args=[thread.id]), paths)
+        for path in paths:
+            self.assertRegex(output, rf"{re.escape(path)} -> 200, [1-9]\d* consultas")
+        self.assertNotIn("RESPUESTA", output)
+        self.assertFalse(User.objects.exists())
+
+    def test_non_200_paths_are_reported(self):
+        out = io.StringIO()
+        call_command("explain_queries", "/no-existe/", stdout=out)
+        self.assertIn("RESPUESTA 404", out.getvalue())
+        with self.assertRaisesMessage(CommandError, "1 rutas no respondieron 200"):
+            call_command("explain_queries", "/no-existe/", "--fail-on-scan", stdout=io.StringIO())
+
+
+class BenchmarkCommandTests(LiveServerTestCase):
+    def setUp(self):
+        beer = Beer.objects.create(brewery=Brewery.objects.create(name="B"), name="Negra")
+        Review.objects.create(beer=beer, user_name="ana", comment="rica",
+                              aroma=4, sabor=4, cuerpo=4, apariencia=4)
+        thread = Thread.objects.create(title="Hola", user_name="ana", beer=beer)
+        Post.objects.create(thread=thread, user_name="eva", body="hola")
+
+    def test_benchmark_measures_protected_views_as_staff(self):
+        path = os.path.join(tempfile.mkdtemp(), "bench.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        out = io.StringIO()
+        call_command("benchmark", "--repeat", "1", "--staff", "--output", path, stdout=out)
+        with open(path) as f:
+            report = json.load(f)
+        for name in ("export_table", "moderation_list", "admin_metrics", "api_list:beers"):
+            self.assertEqual(report["views"][name]["status"], 200, name)
+        self.assertIn("thread_events", report["skipped"])
+        self.assertIn("Sin medir: ", out.getvalue())
+        self.assertFalse(User.objects.exists())
+
+        out = io.StringIO()
+        call_command("benchmark", "--repeat", "1", "--only", "moderation_list", stdout=out)
+        self.assertIn("moderation_list (302)", out.getvalue())
+
+    def test_loadtest_smoke(self):
+        out = io.StringIO()
+        call_command("loadtest", "--target", f"local={self.live_server_url}", "-n", "3",
+                     "-c", "1", "--warmup", "0", "--path", "/beers/", stdout=out)
+        self.assertIn("total: 3 peticiones, 0 errores", out.getvalue())
+
+
+class ImportCatalogTests(TestCase):
+    def write(self, name, content):
+        path = os.path.join(tempfile.mkdtemp(), name)
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out = io.StringIO()
+        call_command("import_catalog", path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv_deduplicates_by_normalized_name(self):
+        path = self.write("catalogo.csv", "brewery,country,name,style,abv\n"
+                                          "Mahou,ES,Clásica,Lager,\"4,8\"\n"
+                                          "MAHOU,ES,clasica,Lager,5\n"
+                                          "Damm,ES,Estrella,Lager,5.4\n"
+                                          "Damm,ES,,Lager,5\n")
+        self.run_import(path, "--dry-run")
+        self.assertFalse(Beer.objects.exists())
+        output = self.run_import(path)
+        self.assertIn("2 insertadas, 1 duplicadas, 1 inválidas, 2 cervecerías nuevas", output)
+        self.assertEqual(Beer.objects.get(name="Clásica").abv, Decimal("4.8"))
+        self.assertEqual(StyleFacet.objects.get(style="Lager").beers, 2)
+
+    def test_jsonl_non_objects_are_invalid_and_long_names_fit(self):
+        # "ﬀ" se convierte en "ff" al normalizar: el nombre normalizado crece
+        long_name = "ﬀ" * 120
+        path = self.write("catalogo.jsonl", "\n".join([
+            "[]", '"x"', "3", "null",
+            json.dumps({"brewery": "Mahou", "name": long_name, "style": "IPA"}),
+        ]))
+        output = self.run_import(path)
+        self.assertIn("1 insertadas, 0 duplicadas, 4 inválidas", output)
+        beer = Beer.objects.get()
+        self.assertEqual(len(beer.normalized_name), 120)
+        self.assertEqual(Beer.matching(long_name).get(), beer)
+        self.assertIn("0 insertadas, 1 duplicadas", self.run_import(path))
+
+
+class SeedForumTests(TestCase):
+    def test_seeded_data_keeps_denormalized_counters_consistent(self):
+        call_command("seed_forum", breweries=3, beers=10, users=5, reviews=80,
+                     threads=6, posts=60, reports=10, photo_ratio=0, stdout=io.StringIO())
+        self.assertEqual(Review.objects.count(), 80)
+        self.assertEqual(rebuild_beer_aggregates(fix=False), [])
+        for thread in Thread.objects.all():
+            self.assertEqual(thread.post_count, thread.posts.filter(is_hidden=False).count())
+        self.assertTrue(Review.objects.filter(created_at__lt=timezone.now() - timedelta(days=1)).exists())
+
+
+@override_settings(PROFILING={"ENABLED": True}, RATE_LIMIT_ENABLED=False)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        profiling.reset()
+        self.thread = Thread.objects.create(title="Medido", user_name="ana")
+
+    @override_settings(PROFILING={"ENABLED": True, "SLOW_QUERY_MS": 0})
+    def test_requests_are_measured_per_view(self):
+        url = reverse("thread_detail", args=[self.thread.id])
+        with self.assertLogs("core.profiling.slow", "WARNING") as logs:
+            response = self.client.get(url)
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("origen: thread_detail", logs.output[0])
+        stats = profiling.snapshot()["thread_detail"]
+        self.assertEqual(stats["count"], 1)
+        self.assertGreater(stats["queries"], 0)
+        self.assertGreater(stats["template_ms"], 0)
+
+    @override_settings(PROFILING={"ENABLED": True, "SAMPLE_RATE": 1.0})
+    def test_one_sampled_profile_at_a_time(self):
+        url = reverse("thread_detail", args=[self.thread.id])
+        with self.assertLogs("core.profiling", "INFO") as logs:
+            self.client.get(url)
+        self.assertIn("Perfil de thread_detail", logs.output[0])
+
+        with profiling._profile_lock, self.assertNoLogs("core.profiling", "INFO"):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        middleware = profiling.ProfilingMiddleware(mock.Mock(side_effect=RuntimeError))
+        with self.assertRaises(RuntimeError):
+            middleware(RequestFactory().get(url))
+        self.assertFalse(profiling._profile_lock.locked())
+        self.assertIsNone(profiling._current.get())
+
+    def test_prometheus_text_is_staff_only(self):
+        self.client.get(reverse("threads_list"))
+        url = reverse("profiling_metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        body = self.client.get(url).content.decode()
+        self.assertIn('crisol_request_duration_seconds_count{view="threads_list"} 1', body)
+        self.assertEqual(self.client.get(reverse("profiling_dashboard")).status_code, 200)
+
+
+@override_settings(REPLICAS={"ALIASES": ["replica1"], "HEALTH_INTERVAL": 60})
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        replicas.reset_health()
+        self.router = replicas.ReplicaRouter()
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def view(self, request):
+        self.seen.append(self.router.db_for_read(Beer))
+        if "write" in request.GET:
+            self.router.db_for_write(Beer)
+            self.seen.append(self.router.db_for_read(Beer))
+        return HttpResponse()
+
+    @mock.patch.object(replicas, "check_replica", return_value=True)
+    def test_reads_stick_to_primary_after_a_write(self, check):
+        middleware = replicas.ReplicaMiddleware(self.view)
+        self.assertEqual(self.router.db_for_read(Beer), "default")  # fuera de una petición
+        response = middleware(self.factory.get("/", {"write": 1}))
+        self.assertEqual(self.seen, ["replica1", "default"])
+        self.assertEqual(response.cookies["crisol_primary"]["max-age"], 10)
+
+        request = self.factory.get("/")
+        request.COOKIES["crisol_primary"] = "1"
+        middleware(request)
+        middleware(self.factory.post("/"))
+        self.assertEqual(self.seen[2:], ["default", "default"])
+        check.assert_called_once_with("replica1", 30)
+
+    @mock.patch.object(replicas, "check_replica", return_value=True)
+    def test_cache_builders_read_from_primary(self, check):
+        def view(request):
+            caching.get_or_build("replica-test", lambda: self.router.db_for_read(Beer))
+
+            async def build():
+                return await sync_to_async(self.router.db_for_read)(Beer)
+
+            self.seen.append(async_to_sync(caching.aget_or_build)("replica-test-async", build))
+            self.seen.append(self.router.db_for_read(Beer))
+            return HttpResponse()
+
+        with mock.patch.object(caching, "cache") as cache:
+            cache.get.return_value = None
+            cache.aget = mock.AsyncMock(return_value=None)
+            cache.aset = mock.AsyncMock()
+            replicas.ReplicaMiddleware(view)(self.factory.get("/"))
+        self.assertEqual(cache.set.call_args.args, ("replica-test", "default"))
+        self.assertEqual(self.seen, ["default", "replica1"])
+
+    @mock.patch.object(replicas, "check_replica", return_value=False)
+    def test_unhealthy_replica_falls_back_to_primary(self, check):
+        replicas.ReplicaMiddleware(self.view)(self.factory.get("/"))
+        self.assertEqual(self.seen, ["default"])
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_connections_are_reused_and_broken_ones_replaced(self):
+        pool = mysqlpool.Pool(size=2, timeout=0.05, recycle=0, ping_after=0)
+        connect = mock.Mock(side_effect=lambda: mock.Mock())
+        first = pool.acquire(connect)
+        pool.release(first)
+        self.assertIs(pool.acquire(connect), first)
+        second = pool.acquire(connect)
+        with self.assertRaises(mysqlpool.PoolTimeout):
+            pool.acquire(connect)
+        self.assertEqual(pool.stats()["in_use"], 2)
+
+        second.ping.side_effect = OSError("gone away")
+        pool.release(second)
+        third = pool.acquire(connect)
+        self.assertIsNot(third, second)
+        second.close.assert_called_once()
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["discarded"], stats["timeouts"]), (3, 1, 1))
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        autocomplete.reset()
+        self.brewery = Brewery.objects.create(name="Mahou")
+        Beer.objects.create(brewery=self.brewery, name="Mahou 5 Estrellas",
+                            style="Lager", review_count=10)
+        Beer.objects.create(brewery=self.brewery, name="Mahou Clásica",
+                            style="Lager", review_count=2)
+
+    def tearDown(self):
+        autocomplete.reset()
+
+    def test_suggestions_come_from_memory_ranked_by_reviews(self):
+        url = reverse("beer_autocomplete")
+        self.client.get(url, {"q": "x"})  # carga el índice
+        with self.assertNumQueries(0):
+            results = self.client.get(url, {"q": "MAHOU", "type": "beer"}).json()["results"]
+        self.assertEqual([r["name"] for r in results], ["Mahou 5 Estrellas", "Mahou Clásica"])
+        self.assertEqual(autocomplete.suggest("estrellas")[0]["name"], "Mahou 5 Estrellas")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Beer.objects.create(brewery=self.brewery, name="Mahou Maestra",
+                                style="Dunkel", review_count=50)
+        self.assertEqual(autocomplete.suggest("maho", ("beer",))[0]["name"], "Mahou Maestra")
+
+    @mock.patch.object(autocomplete, "HEAVY_PREFIX", 2)
+    def test_heavy_prefixes_match_a_full_scan(self):
+        index = autocomplete.PrefixIndex()
+        for pk, name in enumerate(["Mar Vieja", "Marea Alta", "Mar del Norte", "Luna de Mar"]):
+            index.load(autocomplete.Entry("beer", pk, name, weight=pk))
+        index.finish()
+        self.assertIn(("beer", "mar"), index.top)
+        self.assertEqual([r["id"] for r in index.search("mar")], [3, 2, 1, 0])
+        self.assertEqual([r["id"] for r in index.search("mar d")], [2])
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        brewery = Brewery.objects.create(name="B")
+        self.beers = {name: Beer.objects.create(brewery=brewery, name=name, style="Lager")
+                      for name in ("Rubia", "Dorada", "Negra", "Tostada")}
+
+    def review(self, user_name, name, score):
+        Review.objects.create(beer=self.beers[name], user_name=user_name, comment="-",
+                              aroma=score, sabor=score, cuerpo=score, apariencia=score)
+
+    @skipUnless(importlib.util.find_spec("numpy") and importlib.util.find_spec("scipy"),
+                "requiere numpy y scipy")
+    def test_build_stores_neighbors_of_similarly_rated_beers(self):
+        for user_name, scores in {"ana": (5, 5, 1), "eva": (5, 4, 2),
+                                  "leo": (1, 1, 5), "max": (2, 1, 5)}.items():
+            for name, score in zip(("Rubia", "Dorada", "Negra"), scores):
+                self.review(user_name, name, score)
+        call_command("build_recommendations", stdout=io.StringIO())
+        similar = [row.neighbor.name for row in recommendations.similar_beers(self.beers["Rubia"].id)]
+        self.assertEqual(similar, ["Dorada"])
+
+    def test_feed_follows_neighbors_of_liked_beers(self):
+        self.review("ana", "Rubia", 5)
+        self.review("ana", "Negra", 1)
+        for beer, neighbor, rank, score in (("Rubia", "Dorada", 0, 0.9), ("Rubia", "Negra", 1, 0.5),
+                                            ("Negra", "Tostada", 0, 0.8)):
+            BeerNeighbor.objects.create(beer=self.beers[beer], neighbor=self.beers[neighbor],
+                                        rank=rank, score=score)
+        self.assertEqual(recommendations.recommended_ids("ana"), [self.beers["Dorada"].id])
+
+        user = User.objects.create_user("ana", password="x")
+        self.client.force_login(user)
+        response = self.client.get(reverse("recommended_beers"))
+        self.assertContains(response, "Dorada")
+        self.assertNotContains(response, "Tostada")
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        trending.flush()  # visitas pendientes de otras pruebas
+        self.brewery = Brewery.objects.create(name="B")
+
+    def review(self, beer, score):
+        Review.objects.create(beer=beer, user_name="ana", comment="-",
+                              aroma=score, sabor=score, cuerpo=score, apariencia=score)
+
+    def test_bayes_rating_needs_reviews_to_beat_established_beers(self):
+        favourite = Beer.objects.create(brewery=self.brewery, name="Clásica", style="Lager")
+        newcomer = Beer.objects.create(brewery=self.brewery, name="Nueva", style="Lager")
+        for _ in range(30):
+            self.review(favourite, 4)
+        self.review(newcomer, 5)
+        favourite.refresh_from_db()
+        newcomer.refresh_from_db()
+        self.assertGreater(newcomer.avg_rating, favourite.avg_rating)
+        self.assertGreater(favourite.bayes_rating, newcomer.bayes_rating)
+        self.assertEqual(rebuild_beer_aggregates(fix=False), [])
+
+    def test_activity_scores_decay_and_are_updated_on_write(self):
+        user = User.objects.create_user("ana", password="x")
+        active = Thread.objects.create(title="Activo", user_name="ana")
+        for _ in range(3):
+            Post.objects.create(thread=active, user=user, user_name="ana", body="+1")
+        empty = Thread.objects.create(title="Vacío", user_name="ana")
+        ranked = list(Thread.objects.order_by("-trending_score", "-id"))
+        self.assertEqual(ranked, [active, empty])
+
+        active.refresh_from_db()
+        weights = trending.WEIGHTS["thread"] + 3 * trending.WEIGHTS["post"]
+        self.assertAlmostEqual(trending.current(active.trending_score), weights, places=3)
+        later = timezone.now() + trending.HALF_LIFE
+        self.assertAlmostEqual(trending.current(active.trending_score, later), weights / 2, places=3)
+
+        trending.record_view(Thread, empty.pk)
+        self.assertEqual(trending.flush(), 1)
+        empty.refresh_from_db()
+        self.assertAlmostEqual(trending.current(empty.trending_score),
+                               trending.WEIGHTS["thread"] + trending.WEIGHTS["view"], places=3)
+
+        # Reconstruir desde la historia da lo mismo que ir sumando
+        trending.rebuild_all()
+        self.assertAlmostEqual(trending.current(Thread.objects.get(pk=active.pk).trending_score),
+                               weights, places=3)
+
+
+class FacetTests(TestCase):
+    def snapshot(self):
+        return {model.__name__: sorted(model.objects.filter(beers__gt=0).values_list(
+                    *fields, "beers", "reviews", "rating_total"))
+                for model, fields in ((StyleFacet, ("style",)), (BreweryFacet, ("brewery_id",)),
+                                      (BreweryStyleFacet, ("brewery_id", "style")))}
+
+    def test_counts_follow_writes_and_match_a_rebuild(self):
+        mahou, damm = Brewery.objects.create(name="Mahou"), Brewery.objects.create(name="Damm")
+        lager = Beer.objects.create(brewery=mahou, name="Clásica", style="Lager")
+        ipa = Beer.objects.create(brewery=mahou, name="IPA", style="IPA")
+        Beer.objects.create(brewery=damm, name="Estrella", style="Lager")
+        for beer, score in ((lager, 4), (lager, 2), (ipa, 5)):
+            Review.objects.create(beer=beer, user_name="ana", comment="-",
+                                  aroma=score, sabor=score, cuerpo=score, apariencia=score)
+        self.assertEqual(StyleFacet.objects.get(style="Lager").avg_rating, 3)
+
+        ipa.style = "Lager"  # instancia sin las reseñas: save() no toca los agregados
+        ipa.save()
+        lager.delete()
+        incremental = self.snapshot()
+        facets.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertEqual(incremental["StyleFacet"], [("Lager", 2, 1, 20)])
+
+        damm.delete()
+        self.assertEqual(StyleFacet.objects.get(style="Lager").beers, 1)
+
+    def test_beer_list_counts_reflect_the_other_filter(self):
+        mahou, damm = Brewery.objects.create(name="Mahou"), Brewery.objects.create(name="Damm")
+        Beer.objects.create(brewery=mahou, name="Clásica", style="Lager")
+        Beer.objects.create(brewery=mahou, name="IPA", style="IPA")
+        Beer.objects.create(brewery=damm, name="Estrella", style="Lager")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("beer_list"), {"style": "IPA"})
+        self.assertNotIn("GROUP BY", " ".join(q["sql"] for q in ctx.captured_queries))
+        self.assertEqual([(b.brewery.name, b.beers) for b in response.context["breweries"]],
+                         [("Mahou", 1)])
+        self.assertEqual([(s.style, s.beers) for s in response.context["styles"]],
+                         [("IPA", 1), ("Lager", 2)])
+        self.assertContains(response, "Lager (2)")
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.brewery = Brewery.objects.create(name="Mahou")
+        self.beers = [Beer.objects.create(brewery=self.brewery, name=f"Cerveza {i}", style="Lager")
+                      for i in range(3)]
+
+    def test_list_paginates_with_cursor_and_selected_fields(self):
+        url = reverse("api_list", args=["beers"])
+        first = self.client.get(url, {"limit": 2, "fields": "name"}).json()
+        self.assertEqual([row["name"] for row in first["data"]], ["Cerveza 0", "Cerveza 1"])
+        self.assertEqual(set(first["data"][0]), {"id", "name"})
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([row["id"] for row in second["data"]], [self.beers[2].id])
+        self.assertIsNone(second["next"])
+
+    def test_detail_and_filters(self):
+        detail = self.client.get(reverse("api_detail", args=["beers", self.beers[1].id]))
+        self.assertEqual(detail.json()["data"]["name"], "Cerveza 1")
+        self.assertEqual(self.client.get(
+            reverse("api_detail", args=["beers", 999999])).status_code, 404)
+        filtered = self.client.get(reverse("api_list", args=["beers"]),
+                                   {"brewery": self.brewery.id, "style": "Lager"})
+        self.assertEqual(len(filtered.json()["data"]), 3)
+        for resource, param in (("beers", "brewery"), ("reviews", "beer"), ("posts", "thread")):
+            response = self.client.get(reverse("api_list", args=[resource]), {param: "abc"})
+            self.assertEqual(response.status_code, 400)
+
+    def test_etag_304_until_a_row_is_hidden(self):
+        thread = Thread.objects.create(title="Hilo", user_name="ana")
+        post = Post.objects.create(thread=thread, user_name="ana", body="hola")
+        Post.objects.create(thread=thread, user_name="eva", body="adiós")
+        url = reverse("api_list", args=["posts"])
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response.headers)
+        etag = response.headers["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Post.objects.filter(pk=post.pk).update(is_hidden=True)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["body"] for row in response.json()["data"]], ["adiós"])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        beer = Beer.objects.create(brewery=Brewery.objects.create(name="Mahou"), name="Clásica")
+        start = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            review = Review.objects.create(beer=beer, user_name=f"u{i}", comment="a, \"b\"\nc",
+                                           aroma=3, sabor=3, cuerpo=3, apariencia=3)
+            # Dos reseñas en el mismo instante: el cursor desempata por id
+            Review.objects.filter(pk=review.pk).update(created_at=start + timedelta(hours=i // 2))
+        self.reviews = list(Review.objects.order_by("created_at", "id"))
+
+    def test_formats_round_trip_in_chunks(self):
+        with CaptureQueriesContext(connection) as ctx:
+            csv_data = b"".join(export.export("reviews", "csv", size=2))
+        self.assertEqual(len(ctx.captured_queries), 3)
+        rows = list(csv.DictReader(io.StringIO(csv_data.decode())))
+        self.assertEqual([row["id"] for row in rows], [str(r.id) for r in self.reviews])
+        self.assertEqual(rows[0]["comment"], 'a, "b"\nc')
+
+        lines = b"".join(export.export("reviews", "jsonl", size=2)).decode().splitlines()
+        self.assertEqual(json.loads(lines[-1])["beer_name"], "Clásica")
+
+        blocks = list(export.read_columnar(io.BytesIO(
+            b"".join(export.export("reviews", "col", size=2)))))
+        self.assertEqual([len(block["id"]) for _, block in blocks], [2, 2, 1])
+        self.assertEqual(blocks[0][1]["created_at"][0], self.reviews[0].created_at)
+        self.assertEqual(blocks[2][1]["comment"], ['a, "b"\nc'])
+
+    def test_columnar_round_trip_at_chunk_boundaries(self):
+        expected = [(r.id, r.created_at) for r in self.reviews]
+        for size in (1, 2, 4, 5, 6):
+            blocks = [block for _, block in export.read_columnar(io.BytesIO(
+                b"".join(export.export("reviews", "col", size=size))))]
+            sizes = [size] * (5 // size) + ([5 % size] if 5 % size else [])
+            self.assertEqual([len(block["id"]) for block in blocks], sizes)
+            self.assertEqual([pair for block in blocks
+                              for pair in zip(block["id"], block["created_at"])], expected)
+
+    def export_ids(self, *args):
+        path = os.path.join(tempfile.mkdtemp(), "reviews.jsonl")
+        stderr = io.StringIO()
+        call_command("export_forum", "reviews", "--format", "jsonl", "--output", path,
+                     *args, stderr=stderr)
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line)["id"] for line in f], stderr.getvalue()
+
+    def test_command_exports_since_watermark(self):
+        # La marca cae entre dos reseñas con el mismo created_at
+        first = self.reviews[2]
+        exported, output = self.export_ids(
+            "--since", first.created_at.isoformat(), "--since-id", str(first.id))
+        self.assertEqual(exported, [r.id for r in self.reviews[3:]])
+        last = self.reviews[-1]
+        self.assertIn(f"--since {last.created_at.isoformat()} --since-id {last.id}", output)
+
+        # Lo creado en el último minuto espera a la siguiente exportación
+        late = Review.objects.create(beer=last.beer, user_name="eva", comment="-",
+                                     aroma=3, sabor=3, cuerpo=3, apariencia=3)
+        exported, _ = self.export_ids(
+            "--since", last.created_at.isoformat(), "--since-id", str(last.id))
+        self.assertEqual(exported, [])
+        with mock.patch.object(export, "SETTLE", timedelta(0)):
+            exported, _ = self.export_ids(
+                "--since", last.created_at.isoformat(), "--since-id", str(last.id))
+        self.assertEqual(exported, [late.id])
+
+    def test_endpoint_is_staff_only_and_streams(self):
+        url = reverse("export_table", args=["posts"])
+        user = User.objects.create_user("ana", password="x")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        # WSGI: generador síncrono, no uno asíncrono volcado en una lista
+        response = self.client.get(reverse("export_table", args=["reviews"]))
+        self.assertFalse(response.is_async)
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 1 + 5)
+
+        async def fetch():
+            await self.async_client.aforce_login(user)
+            response = await self.async_client.get(
+                reverse("export_table", args=["reviews"]), {"format": "col"})
+            return response, b"".join([chunk async for chunk in response.streaming_content])
+
+        response, body = async_to_sync(fetch)()
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        self.assertIn("reviews.col", response["Content-Disposition"])
+        _, block = next(export.read_columnar(io.BytesIO(body)))
+        self.assertEqual(len(block["id"]), 5)
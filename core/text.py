@@ -0,0 +1,20 @@
+"""Utilidades de texto compartidas (normalización de nombres)."""
+import re
+import unicodedata
+
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name, max_length=None):
+    """
+    Forma canónica de un nombre para comparar: sin acentos ni signos, en
+    minúsculas y con los espacios colapsados ("Mahou  5★" -> "mahou 5").
+    NFKD puede alargar el texto ("ﬀ" -> "ff"): con `max_length` se recorta
+    después de normalizar, para que quepa en la columna.
+    """
+    if not name:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", name)
+    ascii_only = "".join(c for c in decomposed if not unicodedata.combining(c))
+    normalized = _NON_ALNUM_RE.sub(" ", ascii_only.lower()).strip()
+    return normalized[:max_length].rstrip() if max_length else normalized
@@ -0,0 +1,181 @@
+"""
+Tendencias: actividad reciente de cervezas e hilos con decaimiento exponencial.
+
+Cada reseña, mensaje, hilo nuevo o visita suma un peso (WEIGHTS) que se
+reduce a la mitad cada HALF_LIFE. En vez de rebajar periódicamente todas las
+filas, se guarda en `trending_score` el logaritmo de la suma de los pesos
+"adelantados" a la fecha en que ocurrieron:
+
+    log(Σ peso · 2^((t - EPOCH) / HALF_LIFE))
+
+Como todas las puntuaciones decaen al mismo ritmo, su orden no cambia con el
+tiempo: la columna se indexa, la portada lee el top-N con ORDER BY ... LIMIT
+y sumar una actividad es un UPDATE de una fila (`add_expression`). Al estar
+en escala logarítmica no se desborda nunca. `current()` da el valor ya
+decaído, en "pesos de hoy".
+
+Las visitas no escriben en cada petición: se acumulan en memoria y se vuelcan
+cada FLUSH_SECONDS en un hilo de fondo (se pierden las de los últimos
+segundos si el proceso muere).
+"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE = timedelta(days=2)
+WEIGHTS = {"review": 3.0, "post": 1.0, "thread": 1.0, "view": 0.1}
+FLUSH_SECONDS = 30
+# Más allá de tantas vidas medias una actividad pesa menos de 1e-9
+HORIZON = 30
+
+_RATE = math.log(2) / HALF_LIFE.total_seconds()
+
+
+def log_weight(weight, when=None):
+    """Peso de una actividad de `when` (ahora por defecto) en la escala de la columna."""
+    when = when or timezone.now()
+    return math.log(weight) + (when - EPOCH).total_seconds() * _RATE
+
+
+def log_add(a, b):
+    """log(e^a + e^b) sin desbordar."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def add_expression(value, field="trending_score"):
+    """Expresión para un UPDATE: `field` pasa a log(e^field + e^value)."""
+    high = Greatest(F(field), Value(value))
+    low = Least(F(field), Value(value))
+    return high + Ln(Value(1.0) + Exp(low - high))
+
+
+def current(score, now=None):
+    """Puntuación decaída a `now`: la suma de pesos tal y como valen hoy."""
+    if not score:
+        return 0.0
+    return math.exp(score - log_weight(1.0, now))
+
+
+def bump(model, pk, kind, when=None):
+    model.objects.filter(pk=pk).update(
+        trending_score=add_expression(log_weight(WEIGHTS[kind], when)))
+
+
+# --- Visitas --------------------------------------------------------------
+
+_views = {}
+_views_lock = threading.Lock()
+_last_flush = time.monotonic()
+_flushing = False
+
+
+def record_view(model, pk):
+    """Apunta una visita; no toca la base de datos (se puede llamar desde async)."""
+    global _flushing
+    value = log_weight(WEIGHTS["view"])
+    with _views_lock:
+        key = (model, pk)
+        _views[key] = log_add(_views[key], value) if key in _views else value
+        if _flushing or time.monotonic() - _last_flush < FLUSH_SECONDS:
+            return
+        _flushing = True
+    threading.Thread(target=_flush_in_background, name="trending-flush", daemon=True).start()
+
+
+def flush():
+    """Vuelca las visitas acumuladas: un UPDATE por objeto, en una transacción."""
+    global _views, _last_flush
+    with _views_lock:
+        pending, _views = _views, {}
+        _last_flush = time.monotonic()
+    if pending:
+        with transaction.atomic():
+            for (model, pk), value in pending.items():
+                model.objects.filter(pk=pk).update(trending_score=add_expression(value))
+    return len(pending)
+
+
+def _flush_in_background():
+    global _flushing
+    try:
+        flush()
+    except Exception:
+        logger.exception("No se pudieron guardar las visitas de tendencias")
+    finally:
+        connections.close_all()
+        _flushing = False
+
+
+# --- Reconstrucción -------------------------------------------------------
+
+def rebuild(model, activity, now=None):
+    """
+    Recalcula `trending_score` de todo `model` desde la historia reciente.
+    `activity` son tuplas (kind, queryset, campo con el id de `model`); lo
+    anterior a HORIZON vidas medias se ignora y su puntuación queda a 0.
+    """
+    since = (now or timezone.now()) - HORIZON * HALF_LIFE
+    scores = {}
+    for kind, queryset, field in activity:
+        rows = queryset.filter(created_at__gte=since).values_list(field, "created_at")
+        for pk, when in rows.iterator():
+            value = log_weight(WEIGHTS[kind], when)
+            scores[pk] = log_add(scores[pk], value) if pk in scores else value
+    with transaction.atomic():
+        model.objects.update(trending_score=0)
+        for pk, score in scores.items():
+            model.objects.filter(pk=pk).update(trending_score=score)
+    return len(scores)
+
+
+def rebuild_all(now=None):
+    """Reconstruye cervezas e hilos; devuelve cuántos tienen actividad reciente."""
+    from .models import Beer, Post, Review, Thread
+
+    beers = rebuild(Beer, [("review", Review.objects.all(), "beer_id")], now)
+    threads = rebuild(Thread, [
+        ("thread", Thread.objects.all(), "id"),
+        ("post", Post.objects.filter(is_hidden=False), "thread_id"),
+    ], now)
+    return beers, threads
+
+
+# --- Señales --------------------------------------------------------------
+
+def _review_created(sender, instance, created, **kwargs):
+    from .models import Beer
+
+    if created:
+        bump(Beer, instance.beer_id, "review", instance.created_at)
+
+
+def _thread_created(sender, instance, created, **kwargs):
+    if created:
+        bump(type(instance), instance.pk, "thread", instance.created_at)
+
+
+def _post_created(sender, instance, created, **kwargs):
+    from .models import Thread
+
+    if created and not instance.is_hidden:
+        bump(Thread, instance.thread_id, "post", instance.created_at)
+
+
+def connect():
+    from .models import Post, Review, Thread
+
+    post_save.connect(_review_created, sender=Review, dispatch_uid="trending_review_created")
+    post_save.connect(_thread_created, sender=Thread, dispatch_uid="trending_thread_created")
+    post_save.connect(_post_created, sender=Post, dispatch_uid="trending_post_created")
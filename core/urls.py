@@ -1,10 +1,12 @@
 from django.urls import path
-from . import views
+from . import api, profiling, views
 
 urlpatterns = [
     path("", views.home, name="home"),
     path("beers/", views.beer_list, name="beer_list"),
     path("beers/<int:beer_id>/", views.beer_detail, name="beer_detail"),
+    path("beers/autocomplete/", views.beer_autocomplete, name="beer_autocomplete"),
+    path("beers/recommended/", views.recommended_beers, name="recommended_beers"),
     path("beers/<int:beer_id>/review/create/",
          views.create_review, name="create_review"),
     # Ruta para crear reseña sin elegir una cerveza preexistente (entrada libre)
@@ -16,6 +18,8 @@ urlpatterns = [
     path("threads/", views.threads_list_create, name="threads_list"),
     path("threads/<int:thread_id>/",
          views.thread_detail_reply, name="thread_detail"),
+    path("threads/<int:thread_id>/events/",
+         views.thread_events, name="thread_events"),
     path("threads/<int:thread_id>/delete/",
          views.thread_delete, name="thread_delete"),
 
@@ -29,5 +33,13 @@ urlpatterns = [
     path("moderation/<int:report_id>/<str:action>/",
          views.moderation_action, name="moderation_action"),
 
-    path("admin/metrics/", views.admin_metrics, name="admin_metrics"),
+    path("metrics/", views.admin_metrics, name="admin_metrics"),
+    path("export/<str:table>/", views.export_table, name="export_table"),
+    path("profiling/", profiling.profiling_dashboard, name="profiling_dashboard"),
+    path("profiling/metrics/", profiling.profiling_metrics, name="profiling_metrics"),
+
+    # API JSON de solo lectura
+    path("api/v1/<str:resource_name>/", api.api_list, name="api_list"),
+    path("api/v1/<str:resource_name>/<int:object_id>/",
+         api.api_detail, name="api_detail"),
 ]
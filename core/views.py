@@ -1,12 +1,36 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
-from django.db.models import Count, Q
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import login, logout
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_POST
 from django.contrib import messages
+from django.db.models import Prefetch
 from django.urls import reverse
-from .models import Beer, Thread, Post, Report, Review, Brewery, ReviewPhoto
+from .models import (Beer, Thread, Post, Report, Review, Brewery, ReviewPhoto,
+                     DailyActivity, MetricsSnapshot)
 from .forms import ThreadForm, PostForm, ReportForm, CustomUserCreationForm, ReviewForm, LoginForm, SignupForm
+from . import (autocomplete, caching, export, facets, live, moderation, recommendations, search,
+               trending)
+from . import photos as photo_pipeline
+from .pagination import KeysetPage, KeysetPaginator, paginate_ids
+from .ratelimit import ratelimit
+
+THREADS_PER_PAGE = 20
+METRICS_HISTORY = 30
+METRICS_GROUPS = 10
+POSTS_PER_PAGE = 20
+# Ordenaciones del listado de hilos (todas terminan en id para el cursor)
+THREAD_ORDERINGS = {
+    "recent": ("-created_at", "-id"),
+    "activity": ("-last_post_at", "-id"),
+    "trending": ("-trending_score", "-id"),
+}
 
 
 def root_redirect(request):
@@ -14,40 +38,93 @@ def root_redirect(request):
     return redirect('home')
 
 
-def home(request):
+async def _load_user(request):
+    """
+    Resuelve el usuario (y con él la sesión) de forma asíncrona para que la
+    plantilla no dispare consultas síncronas dentro del bucle de eventos.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+def _is_asgi(request):
+    """Bajo WSGI Django vuelca los iteradores asíncronos en una lista antes de enviarlos."""
+    return isinstance(request, ASGIRequest)
+
+
+async def _render_fragment(template_name, queryset, name):
+    return render_to_string(template_name, {name: [obj async for obj in queryset]})
+
+
+async def home(request):
     """Home pública: muestra hilos recientes y cervezas destacadas"""
+    await _load_user(request)
     q = request.GET.get("q", "").strip()
 
-    # Hilos recientes (5)
-    threads = Thread.objects.all()[:5]
-
-    # Cervezas destacadas (5 con mejor rating)
-    beers = Beer.objects.filter(avg_rating__gt=0).order_by('-avg_rating')[:5]
+    # Top-N ya calculados: cada bloque es un ORDER BY ... LIMIT sobre un índice
+    # (ver core.trending y Beer.bayes_rating)
+    threads = Thread.objects.select_related("beer").order_by("-trending_score", "-id")[:5]
+    beers = Beer.objects.select_related("brewery").filter(
+        review_count__gt=0).order_by("-bayes_rating", "-id")[:5]
+    trending_beers = Beer.objects.select_related("brewery").filter(
+        trending_score__gt=0).order_by("-trending_score", "-id")[:5]
+    trending_html = ""
 
-    # Si hay búsqueda, buscar en threads y beers
     if q:
-        threads = Thread.objects.filter(title__icontains=q)[:5]
-        beers = Beer.objects.filter(
-            Q(name__icontains=q) | Q(style__icontains=q)
-        )[:5]
+        # Búsqueda: ambos bloques ordenados por relevancia y sin caché
+        thread_ids, beer_ids = await asyncio.gather(
+            sync_to_async(search.thread_ids)(q, limit=5),
+            sync_to_async(search.beer_ids)(q, limit=5),
+        )
+        threads_html, beers_html = await asyncio.gather(
+            _render_fragment("home_recent_threads.html", search.order_by_ids(
+                Thread.objects.select_related("beer"), thread_ids), "threads"),
+            _render_fragment("home_top_beers.html", search.order_by_ids(
+                Beer.objects.select_related("brewery"), beer_ids), "beers"),
+        )
+    else:
+        # Los dos bloques son independientes: se piden a la vez y cada uno se
+        # cachea ya renderizado
+        threads_html, beers_html, trending_html = await asyncio.gather(
+            caching.aget_or_build(caching.HOME_RECENT_THREADS, lambda: _render_fragment(
+                "home_recent_threads.html", threads, "threads")),
+            caching.aget_or_build(caching.HOME_TOP_BEERS, lambda: _render_fragment(
+                "home_top_beers.html", beers, "beers")),
+            caching.aget_or_build(caching.HOME_TRENDING_BEERS, lambda: _render_fragment(
+                "home_top_beers.html", trending_beers, "beers")),
+        )
 
     return render(request, "home.html", {
-        "threads": threads,
-        "beers": beers,
+        "threads_html": threads_html,
+        "beers_html": beers_html,
+        "trending_html": trending_html,
         "q": q,
     })
 
 
-def beer_list(request):
+async def _beer_list_filters(style="", brewery_id=None):
+    # Desplegables con recuentos, leídos de las tablas de facetas (core.facets)
+    styles, breweries = facets.for_filters(style, brewery_id)
+    styles, breweries = await asyncio.gather(_alist(styles), _alist(breweries))
+    return {"breweries": breweries, "styles": styles}
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+async def beer_list(request):
     """Lista de cervezas - pública"""
-    beers = Beer.objects.all()
+    await _load_user(request)
+    beers = Beer.objects.select_related("brewery")
     q = request.GET.get("q", "").strip()
     style = request.GET.get("style", "").strip()
     brewery_id = request.GET.get("brewery", "").strip()
     min_rating = request.GET.get("min_rating", "").strip()
 
     if q:
-        beers = beers.filter(name__icontains=q)
+        beers = search.order_by_ids(
+            beers, await sync_to_async(search.beer_ids)(q))
     if style:
         beers = beers.filter(style=style)
     if brewery_id:
@@ -58,31 +135,72 @@ def beer_list(request):
         except ValueError:
             pass
 
-    breweries = Brewery.objects.all()
-    styles = Beer.objects.values_list('style', flat=True).distinct()
+    # Con estilo o cervecería elegidos, los recuentos de la otra faceta se
+    # restringen a ese filtro; sin ellos, las facetas completas están en caché
+    facet_brewery = int(brewery_id) if brewery_id.isdigit() else None
+    if style or facet_brewery:
+        filters = _beer_list_filters(style, facet_brewery)
+    else:
+        filters = caching.aget_or_build(caching.BEER_LIST_FILTERS, _beer_list_filters)
+    beers, filters = await asyncio.gather(_alist(beers), filters)
 
     return render(request, "beer_list.html", {
         "beers": beers,
         "q": q,
         "style": style,
-        "styles": styles,
+        "styles": filters["styles"],
         "brewery": brewery_id,
-        "breweries": breweries,
+        "breweries": filters["breweries"],
         "min_rating": min_rating,
     })
 
 
-def beer_detail(request, beer_id):
-    beer = get_object_or_404(Beer, id=beer_id)
-    reviews = beer.reviews.order_by("-created_at")
-    threads_count = beer.threads.count()
-    # Obtener las fotos para cada reseña
-    for review in reviews:
-        review.photos_list = review.photos.all()
-    return render(request, "beer_detail.html", {"beer": beer, "reviews": reviews, "threads_count": threads_count})
+async def beer_detail(request, beer_id):
+    await _load_user(request)
+    beer = await aget_object_or_404(Beer.objects.select_related("brewery"), id=beer_id)
+    trending.record_view(Beer, beer.id)
+
+    async def build_reviews():
+        # Las fotos de todas las reseñas se cargan en una sola consulta (solo
+        # las procesadas: el original subido aún lleva el EXIF); las
+        # cervezas parecidas son una lectura por índice de BeerNeighbor
+        reviews, threads_count, similar = await asyncio.gather(
+            _alist(beer.reviews.order_by("-created_at").prefetch_related(Prefetch(
+                "photos", queryset=ReviewPhoto.objects.filter(status="ready")))),
+            beer.threads.acount(),
+            _alist(recommendations.similar_beers(beer.id)),
+        )
+        return {"reviews": reviews, "threads_count": threads_count,
+                "similar": [row.neighbor for row in similar]}
+
+    cached = await caching.aget_or_build(
+        caching.beer_reviews_key(beer.id), build_reviews)
+    return render(request, "beer_detail.html", {"beer": beer, **cached})
+
+
+async def beer_autocomplete(request):
+    """Sugerencias para los campos de nombre libre; sale del índice en memoria."""
+    kinds = {"beer": ("beer",), "brewery": ("brewery",)}.get(
+        request.GET.get("type"), autocomplete.KINDS)
+    try:
+        limit = max(1, min(int(request.GET.get("limit", autocomplete.LIMIT)), 20))
+    except ValueError:
+        limit = autocomplete.LIMIT
+    # Solo la primera petición del proceso carga el índice desde la base de datos
+    index = autocomplete.current_index() or await sync_to_async(autocomplete.get_index)()
+    return JsonResponse({"results": index.search(request.GET.get("q", ""), kinds, limit)})
+
+
+@login_required
+def recommended_beers(request):
+    """Feed personal: cervezas parecidas a las que el usuario ha puntuado mejor."""
+    ids = recommendations.recommended_ids(request.user.username)
+    beers = list(search.order_by_ids(Beer.objects.select_related("brewery"), ids))
+    return render(request, "recommendations.html", {"beers": beers})
 
 
 @login_required
+@ratelimit("review")
 def create_review(request, beer_id=None):
     """
     Crear reseña. Si se proporciona `beer_id` se crea la reseña para esa cerveza.
@@ -105,19 +223,13 @@ def create_review(request, beer_id=None):
 
             target_beer = None
             if beer_name:
-                # Buscar cerveza por nombre (insensible mayúsc/minúsc)
-                target_beer = Beer.objects.filter(
-                    name__iexact=beer_name).first()
+                # Buscar cerveza por nombre normalizado (sin acentos, signos ni mayúsculas)
+                target_beer = Beer.matching(beer_name).first()
                 if not target_beer:
-                    # Crear brewery si se proporcionó nombre
-                    brewery = None
-                    if brewery_name:
-                        brewery, _ = Brewery.objects.get_or_create(
-                            name=brewery_name)
-                    else:
-                        # Crear o usar una cervecería 'Desconocida' para permitir la creación
-                        brewery, _ = Brewery.objects.get_or_create(
-                            name="Desconocida")
+                    # Usar la cervecería indicada o, si no hay, una 'Desconocida'
+                    brewery_name = brewery_name or "Desconocida"
+                    brewery = (Brewery.matching(brewery_name).first()
+                               or Brewery.objects.create(name=brewery_name))
 
                     target_beer = Beer.objects.create(
                         brewery=brewery,
@@ -152,9 +264,12 @@ def create_review(request, beer_id=None):
                     form.cleaned_data.get("photo3"),
                 ]
 
-                for photo in photos:
-                    if photo:
-                        ReviewPhoto.objects.create(review=review, photo=photo)
+                # Miniaturas, EXIF y dimensiones se procesan en segundo plano
+                photo_ids = [
+                    ReviewPhoto.objects.create(review=review, photo=photo).id
+                    for photo in photos if photo
+                ]
+                photo_pipeline.enqueue(photo_ids)
 
                 messages.success(request, "¡Reseña creada exitosamente!")
                 return redirect("beer_detail", beer_id=(target_beer.id if target_beer else beer.id))
@@ -173,76 +288,116 @@ def create_review(request, beer_id=None):
     })
 
 
-def threads_list_create(request):
+@ratelimit("thread")
+async def threads_list_create(request):
     """Lista todos los hilos y permite crear uno nuevo (solo autenticados)"""
-    threads = Thread.objects.all()
+    user = await _load_user(request)
+    threads = Thread.objects.select_related("beer")
 
-    # Filtrar por búsqueda si existe
     q = request.GET.get("q", "").strip()
-    if q:
-        threads = threads.filter(title__icontains=q)
+    sort = request.GET.get("sort", "")
+    if sort not in THREAD_ORDERINGS:
+        sort = "recent"
 
-    if request.method == "POST" and request.user.is_authenticated:
+    if request.method == "POST" and user.is_authenticated:
         form = ThreadForm(request.POST)
         if form.is_valid():
             beer_name = form.cleaned_data.get("beer_name", "").strip()
             beer_obj = None
             if beer_name:
-                beer_obj = Beer.objects.filter(name__iexact=beer_name).first()
+                beer_obj = await Beer.matching(beer_name).afirst()
 
-            thread = Thread.objects.create(
+            thread = await Thread.objects.acreate(
                 beer=beer_obj,
                 beer_name=beer_name,
                 title=form.cleaned_data["title"],
-                user=request.user,
-                user_name=request.user.username,
+                user=user,
+                user_name=user.username,
             )
             messages.success(request, "¡Hilo creado exitosamente!")
             return redirect("thread_detail", thread_id=thread.id)
     else:
-        form = ThreadForm() if request.user.is_authenticated else None
+        form = ThreadForm() if user.is_authenticated else None
 
-    paginator = Paginator(threads, 20)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    if q:
+        # Búsqueda: los mejores resultados por relevancia, paginados por posición
+        ids, next_cursor, previous_cursor = paginate_ids(
+            await sync_to_async(search.thread_ids)(q), request.GET.get("cursor"),
+            THREADS_PER_PAGE)
+        page_obj = KeysetPage(await _alist(search.order_by_ids(threads, ids)),
+                              next_cursor, previous_cursor)
+    else:
+        paginator = KeysetPaginator(
+            threads, THREAD_ORDERINGS[sort], per_page=THREADS_PER_PAGE)
+        page_obj = await paginator.aget_page(request.GET.get("cursor"))
 
     return render(request, "threads.html", {
         "page_obj": page_obj,
         "form": form,
         "q": q,
+        "sort": sort,
     })
 
 
-def thread_detail_reply(request, thread_id):
+@ratelimit("post")
+async def thread_detail_reply(request, thread_id):
     """Detalle de hilo - público, pero solo autenticados pueden responder"""
-    thread = get_object_or_404(Thread, id=thread_id)
-    posts_qs = thread.posts.filter(is_hidden=False).order_by("created_at")
+    user = await _load_user(request)
+    thread = await aget_object_or_404(Thread.objects.select_related("beer"), id=thread_id)
+    posts_qs = thread.posts.filter(is_hidden=False)
+    if request.method == "GET":
+        trending.record_view(Thread, thread.id)
 
-    if request.method == "POST" and request.user.is_authenticated:
+    if request.method == "POST" and user.is_authenticated:
         form = PostForm(request.POST)
         if form.is_valid():
-            Post.objects.create(
+            await Post.objects.acreate(
                 thread=thread,
-                user=request.user,
-                user_name=request.user.username,
+                user=user,
+                user_name=user.username,
                 body=form.cleaned_data["body"],
             )
             messages.success(request, "¡Respuesta publicada!")
             return redirect("thread_detail", thread_id=thread.id)
     else:
-        form = PostForm() if request.user.is_authenticated else None
+        form = PostForm() if user.is_authenticated else None
 
-    paginator = Paginator(posts_qs, 20)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    paginator = KeysetPaginator(
+        posts_qs, ("created_at", "id"), per_page=POSTS_PER_PAGE)
+    page_obj = await paginator.aget_page(request.GET.get("cursor"))
+
+    # Solo la última página recibe respuestas nuevas en directo (y solo por ASGI)
+    live_after = None
+    if not page_obj.has_next and _is_asgi(request):
+        live_after = page_obj.object_list[-1].id if page_obj.object_list else 0
 
     return render(request, "thread_detail.html", {
         "thread": thread,
         "page_obj": page_obj,
         "form": form,
+        "live_after": live_after,
     })
 
 
+async def thread_events(request, thread_id):
+    """Respuestas nuevas del hilo como Server-Sent Events (solo por ASGI)"""
+    if not _is_asgi(request):
+        # 204 hace que EventSource deje de reconectar; la página se recarga a mano
+        return HttpResponse(status=204)
+    if not await Thread.objects.filter(id=thread_id).aexists():
+        raise Http404
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("after")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    return StreamingHttpResponse(
+        live.thread_event_stream(thread_id, last_event_id),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @login_required
 def thread_delete(request, thread_id):
     """Eliminar un hilo. Solo el autor del hilo o staff pueden eliminarlo."""
@@ -293,6 +448,20 @@ def review_delete(request, review_id):
     return render(request, "confirm_delete.html", {"object_type": "reseña", "object": review})
 
 
+def _reported_object_url(object_type, object_id):
+    """Página donde se ve lo denunciado (la portada si ya no existe)."""
+    if object_type == "post":
+        thread_id = Post.objects.filter(id=object_id).values_list("thread_id", flat=True).first()
+        if thread_id:
+            return reverse("thread_detail", args=[thread_id])
+    elif object_type == "review":
+        beer_id = Review.objects.filter(id=object_id).values_list("beer_id", flat=True).first()
+        if beer_id:
+            return reverse("beer_detail", args=[beer_id])
+    return reverse("home")
+
+
+@ratelimit("report")
 def report_create(request, object_type, object_id):
     if request.method == "POST":
         form = ReportForm(request.POST)
@@ -303,7 +472,9 @@ def report_create(request, object_type, object_id):
                 user_name=form.cleaned_data["user_name"],
                 reason=form.cleaned_data["reason"],
             )
-            return redirect("moderation_list")
+            messages.success(request, "Gracias, tu denuncia se ha enviado a moderación.")
+            return redirect(_reported_object_url(
+                form.cleaned_data["object_type"], form.cleaned_data["object_id"]))
     else:
         form = ReportForm(
             initial={"object_type": object_type, "object_id": object_id})
@@ -311,43 +482,85 @@ def report_create(request, object_type, object_id):
     return render(request, "report_form.html", {"form": form})
 
 
+@staff_member_required
 def moderation_list(request):
-    # TODO: proteger vistas de moderación con staff
-    reports = Report.objects.filter(status="open").order_by("-created_at")
-    return render(request, "moderation_list.html", {"reports": reports})
+    if request.method == "POST":
+        action = request.POST.get("action")
+        targets = moderation.parse_target_keys(request.POST.getlist("targets"))
+        if action in moderation.ACTIONS and targets:
+            hidden, closed = moderation.resolve(action, targets)
+            messages.success(
+                request, f"{closed} denuncias cerradas, {hidden} mensajes ocultados.")
+        return redirect("moderation_list")
 
+    return render(request, "moderation_list.html", {
+        "groups": moderation.open_report_groups(),
+        "total_targets": moderation.open_target_count(),
+    })
 
+
+@staff_member_required
+@require_POST
 def moderation_action(request, report_id, action):
-    # TODO: proteger vistas de moderación con staff
     report = get_object_or_404(Report, id=report_id)
-    if action == "hide" and report.object_type == "post":
-        try:
-            post = Post.objects.get(id=report.object_id)
-            post.is_hidden = True
-            post.save()
-        except Post.DoesNotExist:
-            pass
-    if action == "close":
-        report.status = "closed"
-        report.save()
+    if action in moderation.ACTIONS:
+        hidden, closed = moderation.resolve(action, [(report.object_type, report.object_id)])
+        messages.success(
+            request, f"{closed} denuncias cerradas, {hidden} mensajes ocultados.")
     return redirect("moderation_list")
 
 
+@staff_member_required
 def admin_metrics(request):
-    # TODO: proteger vistas de moderación con staff
-    totals = {
-        "reviews": Review.objects.count(),
-        "threads": Thread.objects.count(),
-        "posts": Post.objects.count(),
-    }
-    beers_with_counts = Beer.objects.annotate(
-        num_reviews=Count("reviews")).filter(num_reviews__gte=5)
-    top5 = beers_with_counts.order_by("-avg_rating")[:5]
-    if top5.count() < 5:
-        top5 = Beer.objects.annotate(num_reviews=Count(
-            "reviews")).order_by("-avg_rating")[:5]
-
-    return render(request, "admin_metrics.html", {"totals": totals, "top5": top5})
+    # Solo lee las fotos que guarda `manage.py refresh_metrics`
+    snapshot = MetricsSnapshot.objects.first()
+    history = list(MetricsSnapshot.objects.values(
+        "taken_at", "beers", "breweries", "reviews", "threads", "posts")[:METRICS_HISTORY])
+    history.reverse()
+    groups = {"style": [], "brewery": []}
+    if snapshot is not None:
+        for group in snapshot.groups.order_by("dimension", "-reviews"):
+            if len(groups[group.dimension]) < METRICS_GROUPS:
+                groups[group.dimension].append(group)
+    activity = list(DailyActivity.objects.order_by("-day")[:METRICS_HISTORY])
+    activity.reverse()
+    peak = max((a.reviews + a.threads + a.posts for a in activity), default=0)
+    for day in activity:
+        day.total = day.reviews + day.threads + day.posts
+        day.width = round(100 * day.total / peak) if peak else 0
+
+    return render(request, "admin_metrics.html", {
+        "snapshot": snapshot,
+        "top5": snapshot.top_beers if snapshot else [],
+        "history": history,
+        "styles": groups["style"],
+        "breweries": groups["brewery"],
+        "activity": activity,
+        "cache_stats": caching.stats(),
+    })
+
+
+async def export_table(request, table):
+    """Descarga staff de una tabla (?format=csv|jsonl|col&since=ISO&since_id=N), por bloques."""
+    user = await _load_user(request)
+    if not (user.is_active and user.is_staff):
+        return HttpResponse(status=403)
+    fmt = request.GET.get("format", "csv")
+    if table not in export.TABLES or fmt not in export.ENCODERS:
+        raise Http404
+    try:
+        since = export.parse_since(request.GET.get("since"), request.GET.get("since_id"))
+    except ValueError:
+        return HttpResponse("Parámetro since no válido", status=400)
+    encoder = export.ENCODERS[fmt]
+    # Bajo WSGI el generador síncrono es el que se envía bloque a bloque
+    stream = export.aexport if _is_asgi(request) else export.export
+    return StreamingHttpResponse(
+        stream(table, fmt, since),
+        content_type=encoder.content_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{encoder.extension}"',
+                 "X-Accel-Buffering": "no"},
+    )
 
 
 def signup_view(request):